@@ -0,0 +1,43 @@
+"""
+Compares cleaning a page of tweets with clean_batch against cleaning each
+tweet on its own, as fetch_interval did before clean_batch
+
+Run with python benchmarks/bench_clean_tweets.py from the twitsent directory
+"""
+
+import re
+import sys
+import os
+import timeit
+from cleantext import clean
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import twitsent.clean_tweets as ct
+
+#a page of 100 tweets in which every fifth tweet is the same retweet
+PAGE = [
+    "RT @user: Tweet about the market 📈 https://t.co/x1"
+    if i % 5 == 0 else
+    f"Tweet {i}, what a day!!! Prices up $3.50 #stocks @someone{i}"
+    for i in range(100)
+]
+
+
+def clean_each(texts):
+    tweets = []
+    for text in texts:
+        text = clean(text, **ct.CLEAN_OPTIONS)
+        text = re.sub(r"\brt\b", "", text)
+        tweets.append(
+            str(bytes(text, 'utf-8').decode('utf-8', 'ignore')).strip())
+    return tweets
+
+
+if __name__ == "__main__":
+    assert ct.clean_batch(PAGE) == clean_each(PAGE)
+    for name, function in (("per tweet", clean_each), ("clean_batch",
+                                                       ct.clean_batch)):
+        seconds = min(
+            timeit.repeat(lambda: function(PAGE), number=20, repeat=5)) / 20
+        print(f"{name}: {seconds * 1000:.2f} ms per page of {len(PAGE)}, "
+              f"{len(PAGE) / seconds:.0f} tweets per second")
@@ -0,0 +1,94 @@
+"""
+Compares the aggregates, medians, quartiles and time axis of 100,000
+intervals computed with RaggedArray against per-interval loops
+
+Run with python benchmarks/bench_ragged.py from the twitsent directory
+"""
+
+import math
+import statistics
+import sys
+import os
+import timeit
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import twitsent.aggregates as agg
+import twitsent.ragged as ra
+
+NUM_INTERVALS = 100000
+INTERVAL_LEN = 15
+
+#intervals of up to 20 scores, some of which are empty
+rng = np.random.default_rng(0)
+INTERVALS = [
+    list(rng.uniform(-1, 1, size=count))
+    for count in rng.integers(0, 21, size=NUM_INTERVALS)
+]
+
+
+def stats_loop(interval_lists):
+    stats = np.full((len(interval_lists), len(agg.COLUMNS)), np.nan)
+    for i, interval in enumerate(interval_lists):
+        scores = np.asarray(interval, dtype=np.float64)
+        stats[i, 0] = len(scores)
+        stats[i, 1] = scores.sum()
+        stats[i, 2] = np.dot(scores, scores)
+        if len(scores):
+            stats[i, 3] = scores.min()
+            stats[i, 4] = scores.max()
+            stats[i, 5:] = np.percentile(scores, agg.PERCENTILES)
+    return stats
+
+
+def medians_loop(interval_lists):
+    return [
+        statistics.median(interval) if interval else math.nan
+        for interval in interval_lists
+    ]
+
+
+def time_axis_loop(totaltime, interval_len):
+    time_list = []
+    time_elapsed = 0
+    for i in range(math.ceil(totaltime / interval_len)):
+        time_list.append(min(time_elapsed, totaltime))
+        time_elapsed += interval_len
+    return time_list
+
+
+def best(function, number=3):
+    return min(timeit.repeat(function, number=number, repeat=3)) / number
+
+
+if __name__ == "__main__":
+    totaltime = NUM_INTERVALS * INTERVAL_LEN - 7
+    np.testing.assert_allclose(agg.interval_stats(INTERVALS),
+                               stats_loop(INTERVALS))
+    scores = ra.RaggedArray.from_lists(INTERVALS)
+    np.testing.assert_allclose(scores.medians(), medians_loop(INTERVALS))
+    np.testing.assert_array_equal(
+        scores.percentiles([25, 75]),
+        np.array([
+            np.percentile(interval, [25, 75])
+            if interval else [math.nan, math.nan] for interval in INTERVALS
+        ]).T)
+    assert list(ra.time_axis(totaltime,
+                             INTERVAL_LEN)) == time_axis_loop(
+                                 totaltime, INTERVAL_LEN)
+
+    print(f"aggregates of {NUM_INTERVALS} intervals")
+    print(f"  per interval: {best(lambda: stats_loop(INTERVALS)):.3f} s")
+    print(f"  RaggedArray: {best(lambda: agg.interval_stats(INTERVALS)):.3f} s")
+    print(f"medians of {NUM_INTERVALS} intervals")
+    print(f"  statistics.median: {best(lambda: medians_loop(INTERVALS)):.3f} s")
+    print(
+        f"  RaggedArray: {best(lambda: ra.RaggedArray.from_lists(INTERVALS).medians()):.3f} s"
+    )
+    print(f"time axis of {NUM_INTERVALS} intervals")
+    print(
+        f"  per interval: {best(lambda: time_axis_loop(totaltime, INTERVAL_LEN)) * 1000:.2f} ms"
+    )
+    print(
+        f"  time_axis: {best(lambda: ra.time_axis(totaltime, INTERVAL_LEN)) * 1000:.2f} ms"
+    )
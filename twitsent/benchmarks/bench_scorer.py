@@ -0,0 +1,56 @@
+"""
+Compares scoring tweets with SentimentScorer against the per-call scoring
+that parse did before it, which built the sentiment analysis tool and the
+stopword list on every call and checked each token against that list
+
+Needs the NLTK resources, see python -m twitsent prepare-resources. Run with
+python benchmarks/bench_scorer.py from the twitsent directory
+"""
+
+import sys
+import os
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import twitsent.parse_sentiment as pars
+import twitsent.resources as res
+
+#ten intervals of 100 cleaned tweets
+INTERVALS = [[
+    f"tweet {i} says the market had a great day and nothing went wrong"
+    if i % 2 else f"tweet {i} says this is the worst news i have read all week"
+    for i in range(100)
+] for _ in range(10)]
+
+
+def parse_loop(interval_lists):
+    import nltk
+    from nltk.sentiment import SentimentIntensityAnalyzer
+    from nltk.tokenize import word_tokenize
+
+    sia = SentimentIntensityAnalyzer()
+    stopwords = nltk.corpus.stopwords.words("english")
+    all_sentiment = []
+    for interval in interval_lists:
+        sent_list = []
+        for tweet in interval:
+            words = [
+                w + " " for w in word_tokenize(tweet) if w not in stopwords
+            ]
+            sent_list.append(sia.polarity_scores("".join(words))['compound'])
+        all_sentiment.append(sent_list)
+    return all_sentiment
+
+
+if __name__ == "__main__":
+    try:
+        res.ensure_resources(download=False)
+    except res.MissingResourceError as e:
+        sys.exit(str(e))
+
+    assert pars.parse(INTERVALS) == parse_loop(INTERVALS)
+    for name, function in (("per call", parse_loop), ("SentimentScorer",
+                                                      pars.parse)):
+        seconds = min(
+            timeit.repeat(lambda: function(INTERVALS), number=3, repeat=3)) / 3
+        print(f"{name}: {seconds * 1000:.1f} ms for 1000 tweets")
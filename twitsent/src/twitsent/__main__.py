@@ -3,23 +3,41 @@ import json
 import datetime as dt
 import math
 import pickle
-from cleantext import clean
-import re
-import time
 import twitsent.plot_sent as ps
 import twitsent.parse_sentiment as pars
 import twitsent.twitterquery as tq
 import sys
 import os
+import argparse
+import contextlib
+import contextvars
+import functools
+import itertools
+import threading
+import collections
 import twitsent.store_data as sd
-import twitsent.dateselect as ds
 import twitsent.makescript as ms
-from os import listdir
-from os.path import isfile, join
-import datetime as dt
+import twitsent.twitterclient as tc
+import twitsent.ratelimit as rl
+import twitsent.baseline_cache as bc
+import twitsent.clean_tweets as ct
+import twitsent.resources as res
+import twitsent.manifest as mf
+import twitsent.stream_writer as sw
+import twitsent.checkpoint as cp
+import twitsent.trend as tr
+import twitsent.batch as bt
+import twitsent.queryplan as qp
+from concurrent.futures import ThreadPoolExecutor
 
 bearer_token = ''
 
+#shared rate limiter for requests that are not sent through a TwitterClient
+rate_limiter = rl.RateLimiter()
+
+#number of times a request is retried after the rate limit window resets
+RATE_LIMIT_RETRIES = 3
+
 
 class RateLimitError(Exception):
 
@@ -39,6 +57,12 @@ class CalendarError(Exception):
         super().__init__(message)
 
 
+class CollectionCancelled(Exception):
+
+    def __init__(self, message):
+        super().__init__(message)
+
+
 def bearer_oauth(r):
     """
     Method required by bearer token authentication.
@@ -60,7 +84,7 @@ def bearer_oauth(r):
     return r
 
 
-def connect_to_endpoint(acad_access, params, exceeds_rl):
+def connect_to_endpoint(acad_access, params, client=None, stream=None):
     """
     Make http connection to Twitter Search API v2.
 
@@ -70,8 +94,12 @@ def connect_to_endpoint(acad_access, params, exceeds_rl):
         A string 'y'/'n' that represents whether the user has academic acces and wants to perform a full archive search
     params: dictionary
         contains the specific details of the request to the API
-    exceeds_rl :
-	whether the given query will likely exceed the Twitter Search API v2 rate limit
+    client : tc.TwitterClient
+        pooled HTTP client to send the request with, or None to open a new
+        connection for this request only
+    stream : string
+        name of the collection this request belongs to, used to split the rate
+        limit budget between collections running at the same time
 
     Returns
     --------
@@ -85,45 +113,351 @@ def connect_to_endpoint(acad_access, params, exceeds_rl):
         
     """
 
-    url = ""
-    if acad_access == 'n':
-        url = "https://api.twitter.com/2/tweets/search/recent"
-    else:
-        url = "https://api.twitter.com/2/tweets/search/all"
+    #requests are paced by a token bucket for each endpoint instead of fixed sleeps
+    limiter = client.limiter if client is not None else rate_limiter
 
-    response = requests.get(url, auth=bearer_oauth, params=params)
-    print(response.status_code)
-    # if rate limit response code is received, wait 15 minutes until limit is reset
-    if response.status_code == 429:
-        print("Rate limit exceeded, waiting until request can be satisfied")
-        time.sleep(900)
-        print("Restarting query")
-        response = requests.get(url, auth=bearer_oauth, params=params)
+    def send():
+        if client is not None:
+            return client.get(acad_access, params)
+        url = ""
+        if acad_access == 'n':
+            url = tc.RECENT_URL
+        else:
+            url = tc.ARCHIVE_URL
+        return requests.get(url, auth=bearer_oauth, params=params)
+
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        limiter.acquire(acad_access, stream)
+        response = send()
         print(response.status_code)
+        limiter.update(acad_access, response.headers)
+        if response.status_code != 429:
+            break
+        # if rate limit response code is received, wait until the rate limit window resets
+        wait = limiter.exhaust(acad_access, response.headers)
+        print(
+            f"Rate limit exceeded, waiting {math.ceil(wait)} seconds until the rate limit window resets"
+        )
     if response.status_code == 429:
         raise RateLimitError(
-            "Rate limit was not reset after 15 minutes as expected, quitting")
+            f"Rate limit was not reset after {RATE_LIMIT_RETRIES} retries, quitting"
+        )
     if response.status_code != 200:
         raise Exception(response.status_code, response.text)
 
-    #full archive search rate limits searches to 300 per 15 minutes, while recent search is limited to 450 per 15 minutes
-    if exceeds_rl == True:
-        if acad_access == 'y':
-            time.sleep(3)
-        else:
-            time.sleep(2)
-
     return response.json()
 
 
+def fetch_interval(query_params,
+                   json_max,
+                   end_time_raw,
+                   request_delta,
+                   acad_access,
+                   client=None,
+                   stream=None,
+                   created_times=None,
+                   checkpoint=None,
+                   index=None,
+                   tweet_budget=None):
+    """
+    Retrieves and cleans the tweets for a single time interval. Each interval
+    is independent of the others, so this method can be run for several
+    intervals at once.
+
+    Parameters
+    --------
+    query_params : dictionary
+        serves as instructions for the twitter search api, copied before use
+        so that concurrent intervals do not share pagination state
+    json_max : int
+        max number of tweets to store as cleaned text for this interval
+    end_time_raw : dt.datetime()
+        end time of this interval
+    request_delta : dt.timedelta()
+        length of the time window searched by each request
+    acad_access : string
+        A string 'y'/'n' that represents whether the user has academic acces and wants to perform a full archive search
+    client : tc.TwitterClient
+        pooled HTTP client shared by every request made for this timeseries
+    stream : string
+        name of the collection this interval belongs to
+    created_times : list
+        if given, the creation time of every tweet kept is requested and
+        appended to it as a timezone-aware dt.datetime
+    checkpoint : cp.Checkpoint
+        if given, the progress of this interval is recorded after every page
+        and an interval interrupted by a previous run continues from its
+        recorded pagination token
+    index : int
+        position of this interval in the timeseries, used as its checkpoint key
+    tweet_budget : rl.TweetBudget
+        if given, the tweets retrieved are counted against it, and no further
+        request is made once it is used up
+
+    Returns
+    --------
+    json_interval : list of strings
+        cleaned tweet text from within this time interval
+
+    Raises
+    --------
+    rl.BudgetExceededError
+        if a request is needed after the budget is used up
+
+    """
+
+    query_params = dict(query_params)
+    if created_times is not None:
+        query_params['tweet.fields'] = 'created_at'
+
+    # number of queries within each interval likely needed to retrieve adequate data
+    requests = math.ceil(json_max / 100)
+
+    json_interval = []  #stores json tweet data for this time interval
+    json_count = 0  #stores number of tweets retrieved for this time interval so far
+    first_request = 0
+    next_token = None
+
+    #continue an interval interrupted by a previous run from the last page it retrieved
+    state = checkpoint.resume(stream, index) if checkpoint is not None else None
+    if state is not None:
+        json_interval = list(state["tweets"])
+        json_count = len(json_interval)
+        first_request = state["request"]
+        next_token = state["next_token"]
+
+    def record(request):
+        #a request without a next page is finished, so the interval continues with the request after it
+        if checkpoint is not None:
+            checkpoint.update(stream, index,
+                              request if next_token is not None else request + 1,
+                              next_token, json_interval)
+
+    #multiple requests are made per time interval due to twitter's limit (100) to the quantity of tweets retrieved per request
+    for request in range(first_request, requests):
+        #if the max number of tweets per interval has not yet been reached
+        if json_count < json_max:
+            #calculate start and endpoints for one request
+            start_time_raw = end_time_raw - request_delta
+            #convert to the timedate format that the twitter api needs
+            start_time = start_time_raw.isoformat()
+            end_time = end_time_raw.isoformat()
+
+            query_params['start_time'] = start_time
+            query_params['end_time'] = end_time
+
+        #a request resumed from a checkpoint continues with its recorded pagination token
+        if json_count < json_max and next_token is None:
+            #the pagination token of a previous request does not belong to this one
+            query_params.pop('next_token', None)
+
+            query_params['max_results'], keep = page_size(
+                json_max, json_count, tweet_budget)
+
+            json_response = connect_to_endpoint(acad_access, query_params,
+                                                client, stream)
+            '''
+            extract and clean useful data from tweet, then store it in a time-delimited array
+            '''
+            if 'data' in json_response:
+                #extract tweet data fron json response line
+                data = json_response["data"]
+                #twitter returns more than one tweet per request, so the whole page is cleaned at once
+                page = [tweet_inst["text"] for tweet_inst in data[:keep]]
+                _record_created(data[:keep], created_times)
+                #store data retrieved and paginate if necessary
+                json_interval.extend(ct.clean_batch(page))
+                json_count += len(page)
+            else:
+                page = []
+                print("No matching tweets for time interval starting at " +
+                      start_time)
+            #the part of the reservation that the page did not fill is returned to the budget
+            if tweet_budget is not None:
+                tweet_budget.release(keep - len(page))
+            #twitter returns the pagination token within the meta object of the response
+            next_token = json_response.get("meta", {}).get("next_token")
+            record(request)
+        elif json_count >= json_max:
+            break
+        #twitter requires you to interate through page requests if more tweets were found than fit in one response(up to a limit of 100 tweets total)
+        while (next_token is not None):
+            if json_count < json_max:
+                # construct a ruleset from all rules
+                query_params['next_token'] = next_token
+                query_params['max_results'], keep = page_size(
+                    json_max, json_count, tweet_budget)
+                json_response = connect_to_endpoint(
+                    acad_access, query_params, client, stream)
+                '''
+                extract and clean useful data from tweet, then store it in a time-delimited array
+                '''
+                #extract tweet data fron json response line
+                data = json_response.get("data", [])
+                page = [tweet_inst["text"] for tweet_inst in data[:keep]]
+                _record_created(data[:keep], created_times)
+                if tweet_budget is not None:
+                    tweet_budget.release(keep - len(page))
+                json_interval.extend(ct.clean_batch(page))
+                json_count += len(page)
+
+                next_token = json_response.get("meta", {}).get("next_token")
+            else:
+                next_token = None
+            record(request)
+
+    return json_interval
+
+
+def _record_created(tweets, created_times):
+    #twitter writes creation times in UTC with a trailing Z, which older versions of fromisoformat do not accept
+    if created_times is None:
+        return
+    for tweet_inst in tweets:
+        if "created_at" in tweet_inst:
+            created_times.append(
+                dt.datetime.fromisoformat(tweet_inst["created_at"].replace(
+                    "Z", "+00:00")))
+
+
+def page_size(json_max, json_count, tweet_budget=None):
+    """
+    Returns the number of tweets to request in the next page of an interval
+    and how many of them may be kept, reserving them from the tweet budget
+    of the collection
+
+    Parameters
+    --------
+    json_max : int
+        max number of tweets to store as cleaned text for an interval
+    json_count : int
+        number of tweets stored for the interval so far
+    tweet_budget : rl.TweetBudget
+        tweets the collection may still retrieve, or None if it is unlimited
+
+    Returns
+    --------
+    (results, keep) : Tuple
+        value of the max_results request parameter, and the number of tweets
+        of the page that may be kept
+
+    Raises
+    --------
+    rl.BudgetExceededError
+        if the budget is used up
+
+    """
+
+    #twitter search api v2 limits search results to 100 per request
+    results = min(json_max, 100)
+    keep = json_max - json_count
+    if tweet_budget is not None:
+        keep = tweet_budget.reserve(min(results, keep))
+        #the search api returns at least 10 results per page, any beyond the reservation are dropped
+        results = min(results, max(keep, 10))
+    return results, keep
+
+
+def warn_density(tweet_count, created_times, json_max, interval_len):
+    """
+    Warns the user if the tweets of a collected interval suggest that
+    intervals are too short to collect json_max tweets each. Twitter returns
+    the most recent tweets first, so the time between the newest and the
+    oldest tweet retrieved is how long it took for the tweets to be posted.
+
+    Parameters
+    --------
+    tweet_count : int
+        number of tweets collected for the interval
+    created_times : list of dt.datetime
+        creation time of the tweets retrieved for the interval
+    json_max : int
+        max number of tweets to store as cleaned text per time interval
+    interval_len : int
+        length of each distinct time interval for tweet retrieval in minutes
+
+    Returns
+    --------
+    None
+
+    Raises
+    --------
+
+    """
+
+    #an interval that ran out of tweets before json_max were collected is already incomplete
+    if tweet_count >= json_max:
+        #the frequency of tweets cannot be estimated from fewer than two of them
+        if len(created_times) < 2:
+            return
+        span = (max(created_times) -
+                min(created_times)) / dt.timedelta(minutes=1)
+        #intervals with half as many matching tweets as this one are still expected to be complete
+        if span * 2 <= interval_len:
+            return
+    print(
+        "Warning: data collection will likely be incomplete due to short time intervals allotted for tweet collection or low tweet quantity"
+    )
+
+
+def interval_end_times(totaltime, interval_len, end_time_raw):
+    """
+    Calculates the end time of each interval of a timeseries
+
+    Parameters
+    --------
+    totaltime : int
+        length of time in minutes between earliest and latest possible tweets retrieved in API requests
+    interval_len : int
+        length of each distinct time interval for tweet retrieval in minutes
+    end_time_raw : dt.datetime()
+        non-adjusted end time of tweet range
+
+    Returns
+    --------
+    interval_ends : list of dt.datetime()
+        end time of each interval in reverse chronological order
+
+    Raises
+    --------
+
+    """
+
+    #Twitter API request needs to be historical by at least 10 seconds
+    offset_delta = dt.timedelta(seconds=30)
+    end_time_raw -= offset_delta
+
+    #how many intervals need to be queried
+    interval_num = math.ceil(totaltime / interval_len)
+
+    #each interval ends exactly one undivided delta before the previous one so that every interval has a uniform length
+    delta = dt.timedelta(minutes=interval_len)
+    interval_ends = [
+        end_time_raw - delta * time_int for time_int in range(interval_num)
+    ]
+
+    return interval_ends
+
+
 def create_timeseries(query_params,
                       json_max,
                       totaltime,
                       interval_len,
                       acad_access,
-                      end_time_raw=dt.datetime.now(dt.timezone.utc)):
+                      end_time_raw=dt.datetime.now(dt.timezone.utc),
+                      client=None,
+                      concurrent=False,
+                      max_workers=8,
+                      stream=None,
+                      cache=None,
+                      on_interval=None,
+                      skip=0,
+                      checkpoint=None,
+                      tweet_budget=None,
+                      cancel=None):
     """
-    
+    Retrieves the cleaned tweets of every time interval of a search, most
+    recent interval first
 
     Parameters
     --------
@@ -139,117 +473,94 @@ def create_timeseries(query_params,
         non-adjusted end time of tweet range
     acad_access : string
         A string 'y'/'n' that represents whether the user has academic acces and wants to perform a full archive search
+    client : tc.TwitterClient
+        pooled HTTP client shared by every request made for this timeseries
+    concurrent : boolean
+        whether to fetch several time intervals in parallel instead of one
+        after another
+    max_workers : int
+        maximum number of intervals fetched at once in concurrent mode, further
+        capped by the rate budget of the user's access level
+    stream : string
+        name of this collection, so that timeseries collected at the same time
+        through one client split the rate limit budget evenly
+    cache : bc.BaselineCache
+        previously collected intervals of the same search, which are reused
+        instead of requested again, or the member of a qp.CombinedQuery that
+        supplies every interval of this search
+    on_interval : function
+        if given, called with the index, end time and cleaned tweets of each
+        interval as soon as it and every interval before it are collected,
+        instead of keeping every interval in memory
+    skip : int
+        number of most recent intervals that were already stored by an
+        interrupted run and are not collected again
+    checkpoint : cp.Checkpoint
+        if given, the pagination progress of every interval is recorded so
+        that an interrupted run does not request any page twice
+    tweet_budget : rl.TweetBudget
+        if given, the number of tweets that may be retrieved for this
+        timeseries
+    cancel : threading.Event
+        if given, no further interval is retrieved once it is set
         
     Returns
     --------
     json_response_list : 2D list
         each entry is a string containing cleaned tweet text from within the
         time interval represented by the sub-list within which it is contained.
+        None if on_interval is given.
         
     Raises
     --------
+    rl.BudgetExceededError
+        if the tweet budget is used up before every interval is collected
+    CollectionCancelled
+        if cancel is set before every interval is collected
     
     """
 
     #calculate number of API requests needed
     req_num = int((totaltime / interval_len) * math.ceil(json_max / 100))
 
+    limiter = client.limiter if client is not None else rate_limiter
+    budget = limiter.bucket(acad_access).capacity
+
     #calculate if rate limit would be exceeded when requests are made
-    exceeds_rl = False
-    if acad_access == 'n':
-        if req_num > 450:
-            exceeds_rl = True
-    else:
-        if req_num > 300:
-            exceeds_rl = True
+    exceeds_rl = req_num > budget
 
-    #calculate likely time needed to complete search
+    #calculate likely time needed to complete search, requests beyond the first window's budget are sent at the rate the window refills
     time_req = -1
     if exceeds_rl:
-        time_req = req_num / 20
+        time_req = math.ceil((req_num - budget) / budget * rl.WINDOW / 60)
     else:
-        time_req = req_num / 60
-        time_req = math.ceil(time_req)
+        time_req = math.ceil(req_num / 60)
 
     print(
         f"{req_num} requests must be made to the API to satisfy your chosen parameters, which could take up to {time_req} minutes"
     )
 
-    #Twitter API request needs to be historical by at least 10 seconds
-    offset_delta = dt.timedelta(seconds=30)
-    end_time_raw -= offset_delta
-
-    test_delta = dt.timedelta(minutes=1)
-
-    json_count = 0  #stores number of tweets retrieved for each tine interval so far
-    json_count_list = [
-    ]  #stores final number of tweets collected per each time interval
-    '''
-    run test to see how many requests are likely needed to fulfill json_max requirement for a given historical period
-    '''
-    #calculate start and endpoints for one interval
-    start_time_raw = end_time_raw - test_delta
-    #convert to the timedate format that the twitter api needs
-    start_time = start_time_raw.isoformat()
-    end_time = end_time_raw.isoformat()
-
-    #TODO retrieve twitter api search results for time interval
-    query_params['start_time'] = start_time
-    query_params['end_time'] = end_time
-
-    #twitter search api v2 limits search results to 100 per request
-    if json_max < 100:
-        query_params['max_results'] = json_max
-    else:
-        query_params['max_results'] = 100
-
-    json_response = connect_to_endpoint(acad_access, query_params, exceeds_rl)
-    '''
-    count number of tweets found within the last minute 
-    '''
-    if 'data' in json_response:
-        #extract tweet data fron json response line
-        data = json_response["data"]
-        #extract text from tweet list
-        for tweet_inst in data:
-            json_count += 1
-
-        if 'next_token' in json_response:
-            next_token = json_response["meta"]["next_token"]
-        else:
-            next_token = None
-
-        while (next_token is not None):
-            # construct a ruleset from all rules
-            query_params['next_token'] = next_token
-            query_params['max_results'] = 100
-            json_response = connect_to_endpoint(acad_access, query_params,
-                                                exceeds_rl)
+    #end times of every interval, most recent first
+    interval_ends = interval_end_times(totaltime, interval_len, end_time_raw)
+    interval_num = len(interval_ends)
 
-            json_count += 1
+    if cache is not None:
+        cached_num = sum(1 for interval_end in interval_ends
+                         if cache.tweets(interval_end) is not None)
+        print(
+            f"{cached_num} of {len(interval_ends)} intervals will be reused from previous data collection"
+        )
 
-            if 'next_token' in json_response:
-                next_token = json_response["meta"]["next_token"]
-            else:
-                next_token = None
-    #no tweets were found in the last minute, assume that tweets about subject are rare
-    else:
-        json_count = 1
-    '''
-    retrieve actual data for historical period
-    '''
-    #how many intervals need to be queried
-    interval_num = math.ceil(totaltime / interval_len)
-    if totaltime % interval_len != 0:
+    #intervals stored by an interrupted run are not collected again
+    pending_ends = interval_ends[skip:]
+    if skip:
         print(
-            "Warning: One time interval is of unequal length to the others and will likely not have complete data. Please ensure that total time is divisible by interval length"
+            f"Resuming after {skip} of {interval_num} intervals that were already stored"
         )
 
-    #estimate how many minutes interval_len needs to be to ensure adequate data is collected
-    mins = json_max / json_count * 2
-    if mins > interval_len:
+    if totaltime % interval_len != 0:
         print(
-            "Warning: data collection will likely be incomplete due to short time intervals allotted for tweet collection or low tweet quantity"
+            "Warning: One time interval is of unequal length to the others and will likely not have complete data. Please ensure that total time is divisible by interval length"
         )
 
     # number of queries within each interval likely needed to retrieve adequate data
@@ -259,175 +570,104 @@ def create_timeseries(query_params,
     delta = dt.timedelta(minutes=interval_len)
     request_delta = delta / requests
 
-    json_interval = []  #stores json tweet data for each time interval
-    json_response_list = []  #stores all json interval data
-    json_count = 0  #reset json_count variable after test
-    end_copy = end_time_raw
-
     print("HTTP Status codes: ")
 
-    #for each interval
-    for time_int in range(interval_num):
-        #multiple requests are made per time interval due to twitter's limit (100) to the quantity of tweets retrieved per request
-        for request in range(requests):
-            #if the max number of tweets per interval has not yet been reached
-            if json_count < json_max:
-                #calculate start and endpoints for one request
-                start_time_raw = end_time_raw - request_delta
-                #convert to the timedate format that the twitter api needs
-                start_time = start_time_raw.isoformat()
-                end_time = end_time_raw.isoformat()
-
-                query_params['start_time'] = start_time
-                query_params['end_time'] = end_time
-
-                #twitter search api v2 limits search results to 100 per request
-                if json_max < 100:
-                    query_params['max_results'] = json_max
-                else:
-                    query_params['max_results'] = 100
-
-                json_response = connect_to_endpoint(acad_access, query_params,
-                                                    exceeds_rl)
-                '''
-                extract and clean useful data from tweet, then store it in a time-delimited array
-                '''
-                if 'data' in json_response:
-                    #extract tweet data fron json response line
-                    data = json_response["data"]
-                    #extract text from tweet list
-                    #twitter returns more than one tweet per request
-                    for tweet_inst in data:
-                        if json_count < json_max:
-                            text = tweet_inst["text"]
-                            #remove emojis and other symbols from tweet text
-                            text = clean(
-                                text,
-                                fix_unicode=True,  # fix various unicode errors
-                                to_ascii=
-                                True,  # transliterate to closest ASCII representation
-                                lower=True,  # lowercase text
-                                no_line_breaks=
-                                True,  # fully strip line breaks as opposed to only normalizing them
-                                no_urls=
-                                True,  # replace all URLs with a special token
-                                no_emails=
-                                True,  # replace all email addresses with a special token
-                                no_phone_numbers=
-                                True,  # replace all phone numbers with a special token
-                                no_numbers=
-                                True,  # replace all numbers with a special token
-                                no_digits=
-                                True,  # replace all digits with a special token
-                                no_currency_symbols=
-                                True,  # replace all currency symbols with a special token
-                                no_punct=True,  # remove punctuations
-                                replace_with_url="",
-                                replace_with_email="",
-                                replace_with_phone_number="",
-                                replace_with_number="",
-                                replace_with_digit="",
-                                replace_with_currency_symbol="",
-                                no_emoji=True,
-                                lang=
-                                "en"  # set to 'de' for German special handling
-                            )
-                            #remove retweet characters and end of line characters from tweet text
-                            text = re.sub(r"\brt\b", "", text)
-                            #remove non-utf-8 characters from string
-                            tweet = bytes(text,
-                                          'utf-8').decode('utf-8', 'ignore')
-
-                            tweet = str(tweet)
-                            tweet = tweet.strip()
-
-                            #store data retrieved and paginate if necessary
-                            json_interval.append(tweet)
-                            json_count += 1
-                else:
-                    print("No matching tweets for time interval starting at " +
-                          start_time)
-                if 'next_token' in json_response:
-                    next_token = json_response["meta"]["next_token"]
-                else:
-                    next_token = None
-            else:
-                break
-            #twitter requires you to interate through page requests if more tweets were found than fit in one response(up to a limit of 100 tweets total)
-            while (next_token is not None):
-                if json_count < json_max:
-                    # construct a ruleset from all rules
-                    query_params['next_token'] = next_token
-                    #twitter search api v2 limits search results to 100 per request
-                    if json_max < 100:
-                        query_params['max_results'] = json_max
-                    else:
-                        query_params['max_results'] = 100
-                    json_response = connect_to_endpoint(
-                        acad_access, query_params, exceeds_rl)
-                    '''
-                    extract and clean useful data from tweet, then store it in a time-delimited array
-                    '''
-                    #extract tweet data fron json response line
-                    data = json_response["data"]
-                    #extract text from tweet data
-                    text = data["text"]
-                    #remove emojis from tweet text
-                    text = clean(
-                        text,
-                        fix_unicode=True,  # fix various unicode errors
-                        to_ascii=
-                        True,  # transliterate to closest ASCII representation
-                        lower=True,  # lowercase text
-                        no_line_breaks=
-                        True,  # fully strip line breaks as opposed to only normalizing them
-                        no_urls=True,  # replace all URLs with a special token
-                        no_emails=
-                        True,  # replace all email addresses with a special token
-                        no_phone_numbers=
-                        True,  # replace all phone numbers with a special token
-                        no_numbers=
-                        True,  # replace all numbers with a special token
-                        no_digits=
-                        True,  # replace all digits with a special token
-                        no_currency_symbols=
-                        True,  # replace all currency symbols with a special token
-                        no_punct=True,  # remove punctuations
-                        replace_with_url="",
-                        replace_with_email="",
-                        replace_with_phone_number="",
-                        replace_with_number="",
-                        replace_with_digit="",
-                        replace_with_currency_symbol="",
-                        no_emoji=True,
-                        lang="en"  # set to 'de' for German special handling
-                    )
-                    #remove retweet characters and end of line characters from tweet text
-                    text = re.sub(r"\brt\b", "", text)
-                    #remove non-utf-8 characters from string
-                    tweet = bytes(text, 'utf-8').decode('utf-8', 'ignore')
-
-                    tweet = str(tweet)
-                    tweet = tweet.strip()
-                    json_interval.append(tweet)
-                    json_count += 1
-
-                    if 'next_token' in json_response:
-                        next_token = json_response["meta"]["next_token"]
-                    else:
-                        next_token = None
-                else:
-                    next_token = None
-        #update datetime endpoints with original undivided delta to ensure uniformity of each interval length is maintained(I am uncertain how the datetime python package rounds values when you perform operations on a timedelta object)
-        end_time_raw = end_copy - delta
-        end_copy = end_time_raw
-
-        json_response_list.append(json_interval.copy())
-        json_count_list.append(json_count)
-        json_count = 0
-        json_interval.clear()
-
-    return json_response_list
+    def fetch(interval_end, index):
+        if cancel is not None and cancel.is_set():
+            raise CollectionCancelled(
+                f"Collection of {stream} was cancelled before the interval ending at {interval_end.isoformat()}"
+            )
+        #intervals that were already collected by a previous run, or are being collected by another run at the same time, are reused instead of requested again
+        if cache is not None:
+            return cache.fetch(interval_end,
+                               lambda: retrieve(interval_end, index))
+        return retrieve(interval_end, index)
+
+    def retrieve(interval_end, index):
+        if interval_end != pending_ends[0]:
+            return fetch_interval(query_params, json_max, interval_end,
+                                  request_delta, acad_access, client, stream,
+                                  checkpoint=checkpoint,
+                                  index=index,
+                                  tweet_budget=tweet_budget)
+
+        #the most recent collected interval doubles as the estimate of how frequently matching tweets are posted
+        created_times = []
+        json_interval = fetch_interval(query_params, json_max, interval_end,
+                                       request_delta, acad_access, client,
+                                       stream, created_times, checkpoint,
+                                       index, tweet_budget)
+        warn_density(len(json_interval), created_times, json_max,
+                     interval_len)
+        return json_interval
+
+    def deliver(json_intervals):
+        if on_interval is None:
+            return list(json_intervals)
+        #each interval is handed over as soon as it is collected, so it does not have to be kept until the whole timeseries is complete
+        for index, (interval_end, json_interval) in enumerate(
+                zip(pending_ends, json_intervals), skip):
+            on_interval(index, interval_end, json_interval)
+        return None
+
+    if not pending_ends:
+        return deliver([])
+
+    indices = range(skip, interval_num)
+    if not concurrent:
+        return deliver(map(fetch, pending_ends, indices))
+
+    #the shared rate limiter paces requests across all workers, so in-flight requests only need to be capped by the endpoint's budget
+    workers = min(max_workers, budget, len(pending_ends))
+
+    #results are returned in submission order, so intervals stay in reverse chronological order
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return deliver(
+            bounded_map(executor, fetch, 2 * workers, pending_ends, indices))
+
+
+def bounded_map(executor, fn, window, *iterables):
+    """
+    Calls a function for every set of arguments in an executor, like
+    executor.map, but only submits a call once fewer than window calls are
+    waiting to be returned. Intervals are handed over as they are collected,
+    so at most window of them are held at any time instead of every interval
+    of a long timeseries being queued at once.
+
+    Parameters
+    --------
+    executor : concurrent.futures.Executor
+        executor the calls are submitted to
+    fn : function
+        function to call
+    window : int
+        max number of calls submitted but not yet returned
+    iterables : iterables
+        arguments of each call, as for map
+
+    Returns
+    --------
+     : generator
+        result of each call, in the order of the arguments
+
+    Raises
+    --------
+    Exception
+        any exception raised by a call, when its result is reached, in which
+        case the calls that have not started are cancelled
+    """
+
+    futures = collections.deque()
+    try:
+        for args in zip(*iterables):
+            if len(futures) >= window:
+                yield futures.popleft().result()
+            futures.append(executor.submit(fn, *args))
+        while futures:
+            yield futures.popleft().result()
+    finally:
+        for future in futures:
+            future.cancel()
 
 
 '''
@@ -462,45 +702,14 @@ def main():
     # Optional params: start_time,end_time,since_id,until_id,max_results,next_token,
     # expansions,tweet.fields,media.fields,poll.fields,place.fields,user.fields
     rule = None
-    rule2 = [['the'], ['i'], ['to'], ['a'], ['and'], ['is'], ['in'], ['it'],
-             ['you'], ['of'], ['for'], ['on'], ['my'], ['that'], ['at'],
-             ['with'], ['me'], ['do'], ['have'], ['just'], ['this'], ['be'],
-             ['so'], ['are'], ['not']]  #list of 25 most common english words
-
     lang = ["en"]
-    #construct the query for Twitter's search API v2
-    #query_params = tq.make_query(rule, lang)
-    query_params2 = tq.make_query(rule2, lang)
 
     #set default search and storage parameters
-    start_dt = None
-    end_dt = None
-    datestr = ""
-    datestr2 = ""
-    newdatestr2 = ""
     academic_access = ""
     use_default = ""
     start_fresh = ""
-    past_file = ""
     json_max = 10  #2500 tweets retrieved per hour maxes out 2M tweet per month limit
     interval_len = 240
-    totaltime = 0
-    exists_prevdata = True
-    has_academic = False
-
-    #get path to parent directory of this file
-    rel_path = os.path.dirname(os.path.realpath(__file__))
-
-    #construct the full path to store collected tweet data
-    datadir = "storedqueries"
-    mypath = os.path.join(rel_path, datadir)
-
-    #make the data storage directory if it doesn't already exist
-    os.makedirs(os.path.abspath(mypath), mode=0o666, exist_ok=True)
-
-    onlyfiles = [f for f in listdir(mypath) if isfile(join(mypath, f))]
-
-    date_c = []
 
     print(
         "Do you want to use your academic access to the Twitter Search API (if applicable)? Y/N or Q to quit"
@@ -530,122 +739,139 @@ def main():
     if search_terms == 'q':
         return
     if search_terms == 'd':
-        rule = [["corona virus"], ['coronavirus'], ["corona", "-beer"],
-                ["covid"], ['covid 19'], ['covid19'], ['covid-19'],
-                ['sarscov2'], ['sars cov 2'], ['sars-cov-2'], ['#coronavirus'],
-                ['#corona'], ['#covid'], ['#covid19'], ['#sarscov2']]
+        rule = tq.DEFAULT_RULE
     else:
         #Create a rule array from user input
         terms = search_terms.split(
             ",")  # TODO watch out for malicious input here
         rule = [sub_term.split(" ") for sub_term in terms]
 
+    #terms that make_query would drop are rejected, as they are for jobs run without prompts
+    dropped = tq.forbidden_terms(rule)
+    if dropped:
+        print(
+            f"Search terms cannot contain '\\' or ':', received {', '.join(dropped)}"
+        )
+        return
+
+    #construct the query for Twitter's search API v2, which is divided into several queries if it is too long
     query_params = tq.make_query(rule, lang)
+    try:
+        tq.split_rule(rule, lang, tq.QUERY_LIMITS[academic_access.lower()])
+    except tq.QueryLengthError as e:
+        print(e)
+        return
 
-    if (use_default.lower() == 'y'):
-        if start_fresh.lower() == 'y':
-            ci = ds.Cal_Impl(False)
-            ci.run_cal()
-
-            if (
-                    not ci.has_values
-            ):  #check if parameters were chosen from the calendar, or if it was closed prematurely
-                raise CalendarError(
-                    "Calendar did not select values before quitting")
-            #retrieve start and end dates from calendar
-            datestr = ci.datestr
-            datestr2 = ci.datestr2
-            newdatestr2 = datestr2
+    #tkinter is only imported when the calendar is shown, so non-interactive runs never load it
+    import twitsent.dateselect as ds
 
-            #construct datetime dates for query limits calculation
-            date2_r = datestr2.split("/")
-            date2 = dt.date(
-                int(date2_r[2]) + 2000, int(date2_r[0]), int(date2_r[1]))
+    #the calendar only offers the non-date parameters if the default settings are not used
+    enabled = use_default.lower() == 'n'
+    if start_fresh.lower() == 'y':
+        ci = ds.Cal_Impl(enabled)
+    else:
+        ci = ds.Cal_End(enabled)
+    ci.run_cal()
+
+    if (
+            not ci.has_values
+    ):  #check if parameters were chosen from the calendar, or if it was closed prematurely
+        raise CalendarError("Calendar did not select values before quitting")
+
+    #a new data collection starts at the selected start date, otherwise the previous one is continued from its end date
+    start_date = None
+    if start_fresh.lower() == 'y':
+        start_date = calendar_date(ci.datestr)
+    if start_fresh.lower() == 'y' or enabled:
+        #retrieve query params from calendar
+        json_max = int(ci.json_max)
+        interval_len = int(ci.interval_len)
+
+    try:
+        job = build_job(query_params, json_max, interval_len,
+                        academic_access.lower(), calendar_date(ci.datestr2),
+                        start_date, rule=rule, lang=lang)
+    except sd.FileMatchException:
+        print("No previous tweet data found")
+        return
+    run_collection(job)
 
-            #retrieve timezone-aware time at exactly midnight
-            ti = dt.time(tzinfo=dt.timezone.utc)
 
-            end_dt = dt.datetime.combine(date2, ti)
+def calendar_date(datestr):
+    #the calendar returns dates in month/day/year format with a two digit year
+    date_r = datestr.split("/")
+    return dt.date(int(date_r[2]) + 2000, int(date_r[0]), int(date_r[1]))
 
-            #retrieve query params from calendar
-            json_max = int(ci.json_max)
-            interval_len = int(ci.interval_len)
-            totaltime = ci.totaltime
 
-            #calculate the time in minutes between the current time and the time of the first request
-            delta_first_request = (dt.datetime.now(dt.timezone.utc) -
-                                   end_dt) / dt.timedelta(minutes=1)
+def build_job(query_params,
+              json_max,
+              interval_len,
+              academic_access,
+              end_date,
+              start_date=None,
+              dataset=None,
+              rule=None,
+              lang=None,
+              storage=None):
+    """
+    Calculates the parameters of a data collection job that is passed to
+    run_collection, checking them against the limits of the Twitter Search API
+    v2. A new data collection archives the stored data with the same
+    json_max and interval_len, unless an interrupted collection of the same
+    job can be resumed.
 
-            #ensure that users follow API request time limitations
-            if totaltime + delta_first_request >= 10080 and academic_access != 'y':  #if user does not have academic access, they cannot request tweets more than a week in the past
-                raise TwitterAPIArgumentError(
-                    "Academic access to Twitter's API is required to search for tweets more than a week in the past"
-                )
-            '''
-            If starting fresh, delete past data
-            '''
-            #find past data storage files with matching search parameters
-            file_matches = []
-            for file in onlyfiles:
-                file_data = file.split("_")
-                file_prefix = file_data[0]
-                file_json_max = int(file_data[3])
-                file_interval_len = int(file_data[4])
-                if ((file_prefix == 'tweet' or file_prefix == 'senti'
-                     or 'archived' in file_prefix)
-                        and file_json_max == json_max
-                        and file_interval_len == interval_len):
-                    file_matches.append(file)
-
-            #if previous data storage file exists, delete it
-            for file in file_matches:
-                filepath = os.path.join(mypath, file)
-                if "archived" in file:
-                    os.remove(filepath)
-                if os.path.exists(filepath):
-                    os.rename(filepath, os.path.join(mypath,
-                                                     "archived" + file))
-
-        elif start_fresh.lower() == 'n':
-            ci = ds.Cal_End(False)
-            ci.run_cal()
-
-            if (
-                    not ci.has_values
-            ):  #check if parameters were chosen from the calendar, or if it was closed prematurely
-                raise CalendarError(
-                    "Calendar did not select values before quitting")
-            #search in specified directory for file that matches default data storage file values (which are contained within the file name)
-            for file in onlyfiles:
-                file_data = file.split("_")
-                file_prefix = file_data[0]
-                if file_prefix == "":
-                    continue
-                file_startdate = file_data[1]
-                datestr = file_startdate
-                file_enddate = file_data[2]
-                datestr2 = file_enddate
-                date_c = file_enddate.split(".")
-                file_json_max = int(file_data[3])
-                file_interval_len = int(file_data[4])
-                if ((file_prefix == 'tweet' or file_prefix == 'senti')
-                        and file_json_max == json_max
-                        and file_interval_len == interval_len):
-                    past_file = file
-                    break
-            if past_file == "":
-                print("No previous tweet data found")
-                return
+    Parameters
+    --------
+    query_params : dictionary
+        keyword query created by make_query
+    json_max : int
+        number of tweets collected per interval
+    interval_len : int
+        number of minutes per interval
+    academic_access : string
+        A string 'y'/'n' that represents whether the user has academic acces and wants to perform a full archive search
+    end_date : dt.date
+        date that data collection ends at midnight UTC of
+    start_date : dt.date
+        date that a new data collection starts at, or None to continue the
+        stored data collection with matching parameters up to end_date
+    dataset : str
+        name of the dataset that the data is stored in, or None for the
+        storedqueries directory itself
+    rule : list of lists
+        rule that query_params was created from, which is divided into
+        several queries if the query is too long for the access level
+    lang : list
+        language abbreviations that query_params was created with
+    storage : str
+        name of the storage backend the data is stored with, or None for
+        sd.DEFAULT_BACKEND
+
+    Returns
+    --------
+    job : dictionary
+        parameters of the job, see run_collection
 
-            newdatestr2 = ci.datestr2
+    Raises
+    --------
+    TwitterAPIArgumentError
+        if illegal arguments to the Twitter Search API v2 are selected
+    sd.FileMatchException
+        if a data collection is continued, but no stored data with matching
+        parameters is found
+    """
 
-            #construct datetime date for query end
-            date2_r = newdatestr2.split("/")
-            end_date = dt.date(
-                int(date2_r[2]) + 2000, int(date2_r[0]), int(date2_r[1]))
+    #retrieve timezone-aware time at exactly midnight
+    ti = dt.time(tzinfo=dt.timezone.utc)
+    end_dt = dt.datetime.combine(end_date, ti)
 
-            #retrieve timezone-aware time at exactly midnight
-            ti = dt.time(tzinfo=dt.timezone.utc)
+    with sd.use_dataset(dataset):
+        if start_date is None:
+            #look up the file that matches the data storage file values in the storedqueries index
+            _, datestr, datestr2, _ = sd.find_file(
+                mf.Manifest(sd.storage_path()), 'tweet', json_max,
+                interval_len, False)
+            date_c = datestr2.split(".")
 
             #date of last recorded entry in csv file
             prev_end_date = dt.date(
@@ -653,215 +879,775 @@ def main():
             )  #prev_end_date date of data collection will be end date of last data collection period
 
             #string representation of query end date for use in csv filenames
-            newdatestr2 = str(end_date.month).lstrip("0") + "." + str(
-                end_date.day).lstrip("0") + "." + str(end_date.year)[-2:]
-
-            #set query time constraints
-            start_dt = dt.datetime.combine(
-                prev_end_date, ti
-            )  #Note that start_dt does NOT correspond to the datetime when data collection first started, but the most recent data collection starting point!
-            end_dt = dt.datetime.combine(end_date, ti)
-            totaltime = int((end_dt - start_dt) / dt.timedelta(minutes=1))
-
-            #calculate the time in minutes between the current time and the time of the first request
-            delta_first_request = (dt.datetime.now(dt.timezone.utc) -
-                                   end_dt) / dt.timedelta(minutes=1)
-
-            #ensure that users follow API request time limitations
-            if totaltime + delta_first_request >= 10080 and academic_access != 'y':  #if user does not have academic access, they cannot request tweets more than a week in the past
-                raise TwitterAPIArgumentError(
-                    "Academic access to Twitter's API is required to search for tweets more than a week in the past"
-                )
-
-    elif (use_default.lower() == 'n'):
-        if start_fresh.lower() == 'y':
-            ci = ds.Cal_Impl(True)
-            ci.run_cal()
-
-            if (
-                    not ci.has_values
-            ):  #check if parameters were chosen from the calendar, or if it was closed prematurely
-                raise CalendarError(
-                    "Calendar did not select values before quitting")
-            #retrieve start and end dates from calendar
-            datestr = ci.datestr
-            datestr2 = ci.datestr2
-            newdatestr2 = datestr2
+            newdatestr2 = str(end_date.month) + "." + str(
+                end_date.day) + "." + str(end_date.year)[-2:]
 
-            #construct datetime dates for query limits calculation
-            date2_r = datestr2.split("/")
-            date2 = dt.date(
-                int(date2_r[2]) + 2000, int(date2_r[0]), int(date2_r[1]))
+            #Note that start_dt does NOT correspond to the datetime when data collection first started, but the most recent data collection starting point!
+            start_dt = dt.datetime.combine(prev_end_date, ti)
+        else:
+            #dates of a new data collection are written the same way as the calendar writes them
+            datestr = str(start_date.month) + "/" + str(
+                start_date.day) + "/" + str(start_date.year)[-2:]
+            datestr2 = str(end_date.month) + "/" + str(
+                end_date.day) + "/" + str(end_date.year)[-2:]
+            newdatestr2 = datestr2
+            start_dt = dt.datetime.combine(start_date, ti)
+        totaltime = int((end_dt - start_dt) / dt.timedelta(minutes=1))
+
+        #calculate the time in minutes between the current time and the time of the first request
+        delta_first_request = (dt.datetime.now(dt.timezone.utc) -
+                               end_dt) / dt.timedelta(minutes=1)
+
+        #ensure that users follow API request time limitations
+        if totaltime + delta_first_request >= 10080 and academic_access != 'y':  #if user does not have academic access, they cannot request tweets more than a week in the past
+            raise TwitterAPIArgumentError(
+                "Academic access to Twitter's API is required to search for tweets more than a week in the past"
+            )
+
+        #check for illegal arguments
+        if interval_len < 1:
+            raise TwitterAPIArgumentError(
+                f"Invalid time interval ({interval_len}) received")
+        if totaltime < 1:
+            raise TwitterAPIArgumentError(
+                f"Invalid duration of search ({totaltime}) received. Ensure that start date and end date arguments of data collection are sequential."
+            )
+        pluralizer = "s" if interval_len > 1 else ""
+        if json_max < 1:
+            raise TwitterAPIArgumentError(
+                f"Invalid rate of tweets ({json_max}) per ({interval_len}) minute{pluralizer} requested. At least one tweet must be requested per time interval."
+            )
+        '''
+        If starting fresh, delete past data
+        '''
+        #archive past data storage files with matching search parameters, deleting any that were archived before, unless an interrupted collection with the same parameters is resumed
+        if start_date is not None and not sw.can_resume(
+                query_params['query'], json_max, interval_len, datestr,
+                datestr2, newdatestr2):
+            sd.archive_dataset(json_max, interval_len)
+
+    #record the parameters of this job so that it can be resumed if it is interrupted
+    return {
+        "query": query_params['query'],
+        "baseline_query": tq.make_query(tq.BASELINE_RULE, ["en"])['query'],
+        "json_max": json_max,
+        "interval_len": interval_len,
+        "totaltime": totaltime,
+        "academic_access": academic_access,
+        "end_time": end_dt.isoformat(),
+        "start_t": datestr,
+        "end_t": datestr2,
+        "new_end_t": newdatestr2,
+        "dataset": dataset,
+        "rule": rule,
+        "lang": lang,
+        "storage": storage
+    }
+
+
+def run_collection(job,
+                   client=None,
+                   baseline_caches=None,
+                   open_page=True,
+                   priority=1,
+                   budget=None,
+                   keyword_source=None,
+                   score_workers=None):
+    """
+    Retrieves tweets for a data collection job, parses them for sentiment and
+    stores them, then creates a graph and opens an html file that explains
+    the project details. Progress is checkpointed, so running an interrupted
+    job again continues where it stopped.
 
-            #retrieve timezone-aware time at exactly midnight
-            ti = dt.time(tzinfo=dt.timezone.utc)
+    Parameters
+    --------
+    job : dictionary
+        query strings of the keyword and baseline searches ('query',
+        'baseline_query'), search parameters ('json_max', 'interval_len',
+        'totaltime', 'academic_access', isoformat 'end_time'), dates of
+        the stored data ('start_t', 'end_t', 'new_end_t'), the 'dataset'
+        the data is stored in and the 'storage' backend it is stored with,
+        and the 'rule' and 'lang' of the keyword query, as returned by
+        build_job
+    client : tc.TwitterClient
+        client shared by the jobs of a batch, or None to create one for this
+        job
+    baseline_caches : dictionary
+        maps (baseline query, json_max, interval_len) to the BaselineCache
+        shared by the jobs of a batch, or None to load the cache for this job
+    open_page : boolean
+        whether to open the html file in the browser. The graph of a job
+        with a dataset is saved in the dataset directory instead.
+    priority : int
+        share of the rate limit budget of the client that this job receives
+        relative to other jobs running at the same time
+    budget : int
+        number of keyword tweets this run may retrieve, or None for no limit.
+        Baseline tweets are shared between jobs and are not counted.
+    keyword_source : object
+        member of a qp.CombinedQuery that supplies the keyword intervals of
+        this job, or None to request them with the job's own query. Keyword
+        intervals of a combined query resume from their first page.
+    score_workers : int
+        number of processes that score tweet sentiment, in which case
+        intervals are scored in batches large enough to keep every process
+        busy, or None to score each interval in this process as it arrives
 
-            end_dt = dt.datetime.combine(date2, ti)
+    Returns
+    --------
+    None
 
-            #retrieve query params from calendar
-            json_max = int(ci.json_max)
-            interval_len = int(ci.interval_len)
-            totaltime = ci.totaltime
+    Raises
+    --------
+    RateLimitError
+        if the rate limit is not reset after retrying, in which case the job
+        can be resumed later
+    rl.BudgetExceededError
+        if the budget is used up, in which case the job can be resumed later
 
-            #calculate the time in minutes between the current time and the time of the first request
-            delta_first_request = (dt.datetime.now(dt.timezone.utc) -
-                                   end_dt) / dt.timedelta(minutes=1)
+    """
 
-            #ensure that users follow API request time limitations
-            if totaltime + delta_first_request >= 10080 and academic_access != 'y':  #if user does not have academic access, they cannot request tweets more than a week in the past
-                raise TwitterAPIArgumentError(
-                    "Academic access to Twitter's API is required to search for tweets more than a week in the past"
-                )
-            '''
-            If starting fresh, delete past data
-            '''
-            #find past data storage files with matching search parameters
-            file_matches = []
-            for file in onlyfiles:
-                file_data = file.split("_")
-                file_prefix = file_data[0]
-                if file_prefix == "":
-                    continue
-                file_json_max = int(file_data[3])
-                file_interval_len = int(file_data[4])
-                if ((file_prefix == 'tweet' or file_prefix == 'senti' 
-                        or 'archived' in file_prefix)
-                        and file_json_max == json_max
-                        and file_interval_len == interval_len):
-                    file_matches.append(file)
-
-            #if previous data storage file exists, delete it
-            for file in file_matches:
-                filepath = os.path.join(mypath, file)
-                if "archived" in file:
-                    os.remove(filepath)
-                if os.path.exists(filepath):
-                    os.rename(filepath, os.path.join(mypath,
-                                                     "archived" + file))
-
-        elif start_fresh.lower() == 'n':
-            ci = ds.Cal_End(True)
-            ci.run_cal()
-
-            if (
-                    not ci.has_values
-            ):  #check if parameters were chosen from the calendar, or if it was closed prematurely
-                raise CalendarError(
-                    "Calendar did not select values before quitting")
-            #retrieve query params from calendar
-            json_max = int(ci.json_max)
-            interval_len = int(ci.interval_len)
-
-            #search in specified directory for file that matches default data storage file values (which are contained within the file name)
-            for file in onlyfiles:
-                file_data = file.split("_")
-                file_prefix = file_data[0]
-                if file_prefix == "":
-                    continue
-                file_startdate = file_data[1]
-                datestr = file_startdate
-                file_enddate = file_data[2]
-                datestr2 = file_enddate
-                date_c = file_enddate.split(".")
-                file_json_max = int(file_data[3])
-                file_interval_len = int(file_data[4])
-                if ((file_prefix == 'tweet' or file_prefix == 'senti')
-                        and file_json_max == json_max
-                        and file_interval_len == interval_len):
-                    past_file = file
-                    break
-            if past_file == "":
-                print("No previous tweet data found")
+    with sd.use_dataset(job.get("dataset")), sd.use_backend(
+            job.get("storage")):
+        _collect(job, client, baseline_caches, open_page, priority, budget,
+                 keyword_source, score_workers)
+
+
+def _collect(job, client, baseline_caches, open_page, priority, budget,
+             keyword_source, score_workers):
+    #see run_collection, every path used here is within the dataset of the job
+    query_params = {'query': job["query"]}
+    query_params2 = {'query': job["baseline_query"]}
+    json_max = job["json_max"]
+    interval_len = job["interval_len"]
+    totaltime = job["totaltime"]
+    academic_access = job["academic_access"]
+    end_dt = dt.datetime.fromisoformat(job["end_time"])
+
+    #pagination progress within each interval is recorded after every page
+    checkpoint = cp.Checkpoint(job)
+
+    #baseline tweets do not depend on the keywords, so intervals collected by previous runs with the same parameters are reused
+    cache_key = (query_params2['query'], json_max, interval_len)
+    if baseline_caches is not None and cache_key in baseline_caches:
+        baseline_cache = baseline_caches[cache_key]
+    else:
+        baseline_cache = bc.BaselineCache(query_params2['query'], json_max,
+                                          interval_len)
+        if baseline_caches is not None:
+            baseline_caches[cache_key] = baseline_cache
+
+    #each interval is stored as soon as it is scored, so an interrupted collection resumes after the last stored interval
+    writer = sw.StreamWriter(query_params['query'], json_max, interval_len,
+                             job["start_t"], job["end_t"], job["new_end_t"],
+                             job.get("storage"))
+
+    #jobs running at the same time through one client are scheduled as separate streams
+    streams = ["keyword", "baseline"]
+    if job.get("dataset") is not None:
+        streams = [job["dataset"] + "/" + stream for stream in streams]
+
+    #a pool of scoring processes is only kept busy by batches of several intervals
+    parse = pars.parse
+    batch_tweets = 0
+    if score_workers is not None and score_workers > 1:
+        parse = functools.partial(pars.parse, workers=score_workers)
+        batch_tweets = score_workers * pars.CHUNKSIZE
+
+    def scored_stream(stream, score):
+        #intervals are buffered until they hold batch_tweets tweets, then scored together and stored in order
+        buffered = []
+
+        def store(index, interval_end, json_interval):
+            buffered.append((index, interval_end, json_interval))
+            if sum(len(entry[2]) for entry in buffered) >= batch_tweets:
+                flush()
+
+        def flush():
+            if not buffered:
                 return
+            indices, interval_ends, json_intervals = zip(*buffered)
+            buffered.clear()
+            all_scores = score(list(interval_ends), list(json_intervals))
+            for index, interval_end, json_interval, scores in zip(
+                    indices, interval_ends, json_intervals, all_scores):
+                writer.add(stream, index, json_interval, scores, interval_end)
+            #intervals are only kept in the checkpoint until they are stored
+            checkpoint.discard(writer.done)
+
+        return store, flush
+
+    #convert tweet text into sentiment scores
+    store_keyword, flush_keyword = scored_stream(
+        "keyword", lambda interval_ends, json_intervals: parse(json_intervals))
+    #only score baseline intervals that were not cached by a previous run
+    store_baseline, flush_baseline = scored_stream(
+        "baseline",
+        lambda interval_ends, json_intervals: baseline_cache.score(
+            interval_ends, json_intervals, parse))
+
+    #a client shared by several jobs is closed by whoever created it
+    if client is None:
+        client_context = tc.TwitterClient(bearer_token)
+    else:
+        client_context = contextlib.nullcontext(client)
+
+    #retrieve tweet data for each time interval within the total time queried, collecting the keyword and baseline searches at the same time through one client whose rate limiter splits the budget between them
+    try:
+        with client_context as client:
+            for stream in streams:
+                client.limiter.set_priority(stream, priority)
+            tweet_budget = None if budget is None else rl.TweetBudget(budget)
+            #a query that is too long for the access level is divided into several queries whose tweets are merged
+            limit = tq.QUERY_LIMITS[academic_access]
+            if (keyword_source is None and job.get("rule") is not None
+                    and len(query_params['query']) > limit):
+                plans = qp.plan_queries({streams[0]: job["rule"]},
+                                        job["lang"], limit)
+                connect = query_connector(client, academic_access,
+                                          streams[0], {streams[0]: priority})
+                keyword_source = qp.plan_sources(
+                    plans, json_max, interval_len, connect,
+                    {streams[0]: tweet_budget})[streams[0]]
+            cancel_baseline = threading.Event()
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                #intervals are stored from the worker threads, which must see the dataset of the job
+                keyword_future = executor.submit(
+                    contextvars.copy_context().run,
+                    create_timeseries,
+                    query_params,
+                    json_max,
+                    totaltime,
+                    interval_len,
+                    academic_access,
+                    end_dt,
+                    client,
+                    concurrent=True,
+                    stream=streams[0],
+                    cache=keyword_source,
+                    on_interval=store_keyword,
+                    skip=writer.done,
+                    checkpoint=checkpoint,
+                    tweet_budget=tweet_budget)
+                baseline_future = executor.submit(
+                    contextvars.copy_context().run,
+                    create_timeseries,
+                    query_params2,
+                    json_max,
+                    totaltime,
+                    interval_len,
+                    academic_access,
+                    end_dt,
+                    client,
+                    concurrent=True,
+                    stream=streams[1],
+                    cache=baseline_cache,
+                    on_interval=store_baseline,
+                    skip=writer.done,
+                    checkpoint=checkpoint,
+                    cancel=cancel_baseline)
+                try:
+                    keyword_future.result()
+                except BaseException:
+                    #intervals of the baseline can no longer be stored once the keyword search stops, e.g. when its budget is used up
+                    cancel_baseline.set()
+                    try:
+                        baseline_future.result()
+                    except CollectionCancelled:
+                        pass
+                    raise
+                baseline_future.result()
+    finally:
+        #intervals left in a partial batch are stored even if the collection stopped, so they are not requested again
+        flush_keyword()
+        flush_baseline()
+        baseline_cache.save()
+
+    #rename the stored data to reflect the new end date of data collection
+    writer.finish()
+    checkpoint.remove()
+
+    #graph all historical data from the running aggregates of each interval instead of reloading every stored score
+    aggregates = sd.load_aggregates(json_max, interval_len)
+    totaltime = aggregates.totaltime()
+
+    #take mean of sentiment scores for each interval, using zero for the mean of any intervals that have no scores due to lack of data
+    avg_sent = aggregates.means("senti")
+    comp_sent = aggregates.means("senti_sample")
+
+    #only test the intervals appended since the last run for a trend
+    trend = tr.TrendState(
+        tr.trend_path(sd.storage_path(), json_max, interval_len))
+    trend.update(avg_sent)
+    trend.save()
+
+    #graph sentiment data, next to the data of the job if it has its own dataset
+    filepath = None
+    if job.get("dataset") is not None:
+        filepath = os.path.join(sd.storage_path(),
+                                'sentiment_comparisongraph.png')
+    ps.sent_line(avg_sent,
+                 comp_sent,
+                 totaltime,
+                 interval_len,
+                 trend,
+                 filepath=filepath)
+    if open_page:
+        ms.make_page()
+
+
+def run_batch(specs, max_jobs=1, consolidate=False, score_workers=None):
+    """
+    Runs data collection jobs in this process, sharing one HTTP client and
+    rate limiter, the sentiment scorer and the baseline caches between them.
+    Up to max_jobs jobs are collected at the same time, and the rate limiter
+    of the shared client interleaves their requests in proportion to their
+    priorities, so that together they keep the account at its rate limit.
+    Jobs with a higher priority are started first. A job that fails is
+    reported and the remaining jobs are still run.
+
+    Parameters
+    --------
+    specs : list of dictionaries
+        jobs as returned by bt.make_spec or bt.load_jobs
+    max_jobs : int
+        number of jobs collected at the same time
+    consolidate : boolean
+        whether to collect the keyword tweets of jobs over the same intervals
+        with combined queries, see consolidate_jobs
+    score_workers : int
+        number of processes that score tweet sentiment, shared by every job,
+        or None to score tweets in this process
 
-            newdatestr2 = ci.datestr2
+    Returns
+    --------
+    failed : list of str
+        names of the jobs that failed or used up their budget
 
-            #construct datetime dates for query limits calculation
-            date2_r = newdatestr2.split("/")
-            end_date = dt.date(
-                int(date2_r[2]) + 2000, int(date2_r[0]), int(date2_r[1]))
+    Raises
+    --------
 
-            #retrieve timezone-aware time at exactly midnight
-            ti = dt.time(tzinfo=dt.timezone.utc)
+    """
 
-            prev_end_date = dt.date(
-                int(date_c[2]) + 2000, int(date_c[0]), int(date_c[1])
-            )  #prev_end_date date of data collection will be end date of last data collection period
+    #jobs with the same json_max and interval_len share one baseline cache, so the baseline intervals they have in common are only requested once
+    baseline_query = tq.make_query(tq.BASELINE_RULE, ["en"])['query']
+    baseline_caches = {}
+    for spec in specs:
+        key = (baseline_query, spec["json_max"], spec["interval_len"])
+        if key not in baseline_caches:
+            baseline_caches[key] = bc.BaselineCache(*key)
+
+    def prepare_job(spec):
+        #a job without a name stores its data in storedqueries itself
+        name = spec["name"] if spec["name"] is not None else "storedqueries"
+        try:
+            return build_job(tq.make_query(spec["rule"], spec["lang"]),
+                             spec["json_max"], spec["interval_len"],
+                             'y' if spec["academic_access"] else 'n',
+                             spec["end_date"], spec["start_date"],
+                             spec["name"], spec["rule"], spec["lang"],
+                             spec["storage"])
+        except sd.FileMatchException:
+            print(f"Job {name} failed: no previous tweet data found")
+        except TwitterAPIArgumentError as e:
+            print(f"Job {name} failed: {e}")
+        return None
+
+    def run_job(spec, job):
+        name = spec["name"] if spec["name"] is not None else "storedqueries"
+        print(f"Running job {name}")
+        try:
+            run_collection(job,
+                           client=client,
+                           baseline_caches=baseline_caches,
+                           open_page=False,
+                           priority=spec["priority"],
+                           budget=spec["budget"],
+                           keyword_source=sources.get(spec["name"]),
+                           score_workers=score_workers)
+        except rl.BudgetExceededError as e:
+            print(
+                f"Job {name} stopped: {e}. Run it again to continue where it stopped"
+            )
+            return name
+        except (TwitterAPIArgumentError, RateLimitError) as e:
+            print(f"Job {name} failed: {e}")
+            return name
+        print(f"Finished job {name}")
+        return None
+
+    #jobs of equal priority are started in the order they are listed
+    specs = sorted(specs, key=lambda spec: -spec["priority"])
+
+    #every job is set up before collection starts, so that the jobs that can share queries are known
+    jobs = [prepare_job(spec) for spec in specs]
+    failed = [
+        spec["name"] if spec["name"] is not None else "storedqueries"
+        for spec, job in zip(specs, jobs) if job is None
+    ]
+    prepared = [(spec, job) for spec, job in zip(specs, jobs)
+                if job is not None]
+    specs = [spec for spec, _ in prepared]
+    jobs = [job for _, job in prepared]
 
-            #string representation of query end date for use in csv filenames
-            newdatestr2 = str(end_date.month).lstrip("0") + "." + str(
-                end_date.day).lstrip("0") + "." + str(end_date.year)[-2:]
-
-            #set query time constraints
-            start_dt = dt.datetime.combine(
-                prev_end_date, ti
-            )  #Note that start_dt does NOT correspond to the datetime when data collection first started, but the most recent data collection starting point!
-            end_dt = dt.datetime.combine(end_date, ti)
-            totaltime = int((end_dt - start_dt) / dt.timedelta(minutes=1))
-
-            #calculate the time in minutes between the current time and the time of the first request
-            delta_first_request = (dt.datetime.now(dt.timezone.utc) -
-                                   end_dt) / dt.timedelta(minutes=1)
-
-            #ensure that users follow API request time limitations
-            if totaltime + delta_first_request >= 10080 and academic_access != 'y':  #if user does not have academic access, they cannot request tweets more than a week in the past
-                raise TwitterAPIArgumentError(
-                    "Academic access to Twitter's API is required to search for tweets more than a week in the past"
-                )
-
-    #check for illegal arguments
-    if interval_len < 1:
-        raise TwitterAPIArgumentError(
-            f"Invalid time interval ({interval_len}) received")
-    if totaltime < 1:
-        raise TwitterAPIArgumentError(
-            f"Invalid duration of search ({totaltime}) received. Ensure that start date and end date arguments of data collection are sequential."
+    with tc.TwitterClient(bearer_token) as client:
+        sources = consolidate_jobs(specs, jobs, client) if consolidate else {}
+        with ThreadPoolExecutor(max_workers=max_jobs) as executor:
+            results = list(executor.map(run_job, specs, jobs))
+    return failed + [name for name in results if name is not None]
+
+
+def consolidate_jobs(specs, jobs, client):
+    """
+    Plans combined queries for the keyword searches of jobs that collect the
+    same intervals, so that each page retrieved serves every job whose
+    keywords the tweets match instead of one. Jobs with a budget are
+    collected with their own queries, since their tweets cannot be counted
+    separately.
+
+    Parameters
+    --------
+    specs : list of dictionaries
+        jobs as returned by bt.make_spec or bt.load_jobs
+    jobs : list of dictionaries
+        parameters of each job in specs, as returned by build_job
+    client : tc.TwitterClient
+        client that the combined queries are sent through
+
+    Returns
+    --------
+    sources : dictionary
+        maps the name of each job that shares a combined query to the
+        keyword source passed to run_collection
+
+    Raises
+    --------
+
+    """
+
+    #only searches over the same intervals in the same languages can be combined
+    groups = {}
+    for spec, job in zip(specs, jobs):
+        if spec["budget"] is not None or spec["name"] is None:
+            continue
+        key = (job["json_max"], job["interval_len"], job["totaltime"],
+               job["end_time"], job["academic_access"], tuple(spec["lang"]))
+        groups.setdefault(key, []).append(spec)
+
+    sources = {}
+    for index, (key, group) in enumerate(groups.items()):
+        json_max, interval_len, _, _, academic_access, lang = key
+        plans = qp.plan_queries({spec["name"]: spec["rule"]
+                                 for spec in group}, list(lang),
+                                tq.QUERY_LIMITS[academic_access])
+        connect = query_connector(
+            client, academic_access, "combined" + str(index),
+            {spec["name"]: spec["priority"]
+             for spec in group})
+        sources.update(
+            qp.plan_sources(plans, json_max, interval_len, connect))
+    return sources
+
+
+def query_connector(client, academic_access, stream, priorities):
+    """
+    Creates the function that qp.plan_sources calls for each query it
+    collects. Every query is scheduled as a stream of its own, at the highest
+    priority of the searches it serves.
+
+    Parameters
+    --------
+    client : tc.TwitterClient
+        client that the queries are sent through
+    academic_access : string
+        A string 'y'/'n' that represents whether the user has academic acces and wants to perform a full archive search
+    stream : string
+        prefix of the stream name of each query
+    priorities : dictionary
+        maps the name of each search to its priority
+
+    Returns
+    --------
+    connect : function
+        returns the request function of a query, given its query_params and
+        the rules it serves
+
+    Raises
+    --------
+
+    """
+
+    count = itertools.count()
+
+    def connect(query_params, rules):
+        query_stream = stream + "/" + str(next(count))
+        client.limiter.set_priority(query_stream,
+                                    max(priorities[name] for name in rules))
+        print(
+            f"Collecting {', '.join(rules)} with the query {query_params['query']}"
         )
-    pluralizer = "s" if interval_len > 1 else ""
-    if json_max < 1:
-        raise TwitterAPIArgumentError(
-            f"Invalid rate of tweets ({json_max}) per ({interval_len}) minute{pluralizer} requested. At least one tweet must be requested per time interval."
+        return lambda params: connect_to_endpoint(academic_access, params,
+                                                  client, query_stream)
+
+    return connect
+
+
+def resume(args, dataset=None, score_workers=None):
+    """
+    Resumes an interrupted data collection job from its checkpoint
+
+    Parameters
+    --------
+    args : list
+        empty to resume the only interrupted job, or the json_max and
+        interval_len of the job to resume
+    dataset : str
+        name of the dataset the job stores its data in, or None for the
+        storedqueries directory itself
+    score_workers : int
+        number of processes that score tweet sentiment, or None to score
+        tweets in this process
+
+    Returns
+    --------
+    None
+
+    Raises
+    --------
+
+    """
+
+    with sd.use_dataset(dataset):
+        if args:
+            filepath = cp.checkpoint_path(int(args[0]), int(args[1]))
+            checkpoints = [filepath] if os.path.exists(filepath) else []
+        else:
+            checkpoints = cp.find_checkpoints()
+
+    if not checkpoints:
+        print("No interrupted data collection found")
+        return
+    if len(checkpoints) > 1:
+        print(
+            "Several interrupted data collections found, choose one with resume JSON_MAX INTERVAL_LEN:"
         )
+        for filepath in checkpoints:
+            job = cp.load_job(filepath)
+            print(
+                f"{job['json_max']} {job['interval_len']} ({job['start_t']} to {job['new_end_t']})"
+            )
+        return
 
-    #retrieve tweet data for each time interval within the total time queried
-    json_response_list = create_timeseries(query_params, json_max, totaltime,
-                                           interval_len, academic_access,
-                                           end_dt)
-    json_response_list2 = create_timeseries(query_params2, json_max, totaltime,
-                                            interval_len, academic_access,
-                                            end_dt)
+    run_collection(cp.load_job(checkpoints[0]), score_workers=score_workers)
 
-    #convert tweet text list into sentiment score list
-    sentiment_list = pars.parse(json_response_list)
-    sentiment_list2 = pars.parse(json_response_list2)
 
-    #save tweet data collected for later use
-    sd.save_lists(json_response_list, json_response_list2, sentiment_list,
-                  sentiment_list2, datestr, datestr2, newdatestr2, json_max,
-                  interval_len)
+def parse_args(argv):
+    """
+    Parses the command line. Without a command the user is prompted for the
+    job and selects its dates on a calendar, every command runs without
+    prompts when the bearer token is given.
 
-    #load all historical data for graphing if the user desires
-    sentiment_list, _, sentiment_list2, _, totaltime = sd.load_lists(
-        json_max, interval_len)
+    Parameters
+    --------
+    argv : list of strings
+        command line arguments after the program name
 
-    #take mean of sentiment scores for each interval, using zero for the mean of any intervals that have no scores due to lack of data
-    avg_sent = [
-        sum(interval) / len(interval) if len(interval) != 0 else 0
-        for interval in sentiment_list
-    ]
-    comp_sent = [
-        sum(interval) / len(interval) if len(interval) != 0 else 0
-        for interval in sentiment_list2
-    ]
+    Returns
+    --------
+     : argparse.Namespace
+        parsed arguments, with the chosen command in 'command'
+
+    Raises
+    --------
+
+    """
+
+    parser = argparse.ArgumentParser(
+        prog="twitsent",
+        description=
+        "Tracks Twitter sentiment over time using Tweets that contain certain keywords. Run without a command to select a job interactively."
+    )
+    commands = parser.add_subparsers(dest="command")
+
+    #the bearer token is read from the environment so that it does not show up in the process list of scheduled runs
+    token_parser = argparse.ArgumentParser(add_help=False)
+    token_parser.add_argument(
+        "--bearer-token",
+        default=os.environ.get("TWITTER_BEARER_TOKEN"),
+        help=
+        "Twitter API v2 bearer token, read from TWITTER_BEARER_TOKEN by default"
+    )
 
-    #graph sentiment data
-    ps.sent_line(avg_sent, comp_sent, totaltime, interval_len)
-    ms.make_page()
+    #scoring is spread over several processes on hosts with spare cores
+    score_parser = argparse.ArgumentParser(add_help=False)
+    score_parser.add_argument(
+        "--score-workers",
+        type=int,
+        help=
+        "number of processes that score tweet sentiment, tweets are scored in this process if omitted"
+    )
+
+    run_parser = commands.add_parser("run",
+                                     parents=[token_parser, score_parser],
+                                     help="run one data collection job")
+    run_parser.add_argument(
+        "--keywords",
+        required=True,
+        help="comma delimited list of search terms, or D for default terms")
+    run_parser.add_argument(
+        "--start",
+        help=
+        "start date (YYYY-MM-DD) of a new data collection, continue the stored data collection if omitted"
+    )
+    run_parser.add_argument("--end",
+                            required=True,
+                            help="end date (YYYY-MM-DD) of data collection")
+    run_parser.add_argument("--json-max",
+                            type=int,
+                            default=bt.DEFAULTS["json_max"],
+                            help="number of tweets collected per interval")
+    run_parser.add_argument("--interval-len",
+                            type=int,
+                            default=bt.DEFAULTS["interval_len"],
+                            help="number of minutes per interval")
+    run_parser.add_argument(
+        "--academic",
+        action="store_true",
+        help="use academic access to search the full archive")
+    run_parser.add_argument(
+        "--budget",
+        type=int,
+        help="number of keyword tweets this run may retrieve")
+    run_parser.add_argument(
+        "--dataset",
+        help=
+        "name of the storedqueries subdirectory to store the data in, storedqueries itself if omitted"
+    )
+    run_parser.add_argument(
+        "--storage",
+        choices=list(sd.BACKENDS),
+        default=bt.DEFAULTS["storage"],
+        help="storage backend of the dataset (default csv)")
+
+    batch_parser = commands.add_parser(
+        "batch",
+        parents=[token_parser, score_parser],
+        help="run every job listed in a json config file")
+    batch_parser.add_argument("config", help="path to the job config file")
+    batch_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=4,
+        help="number of jobs collected at the same time (default 4)")
+    batch_parser.add_argument(
+        "--consolidate",
+        action="store_true",
+        help=
+        "collect jobs over the same dates with combined queries, splitting the tweets between them by their keywords"
+    )
+
+    resume_parser = commands.add_parser(
+        "resume",
+        parents=[token_parser, score_parser],
+        help="continue an interrupted data collection where it stopped")
+    resume_parser.add_argument("json_max", type=int, nargs="?")
+    resume_parser.add_argument("interval_len", type=int, nargs="?")
+    resume_parser.add_argument(
+        "--dataset", help="dataset of the interrupted data collection")
+
+    #install NLTK resources ahead of time for hosts without network access
+    commands.add_parser("prepare-resources",
+                        help="download the NLTK resources ahead of time")
+    #copy the csv datasets in storedqueries into the columnar storage backend
+    commands.add_parser(
+        "migrate-storage",
+        help="copy the csv datasets into the columnar storage backend")
+
+    #interrupted jobs were resumed with --resume before the resume command existed
+    if argv[:1] == ["--resume"]:
+        argv = ["resume"] + list(argv[1:])
+    args = parser.parse_args(argv)
+    if args.command == "resume" and (args.json_max is None) != (
+            args.interval_len is None):
+        parser.error("resume requires both JSON_MAX and INTERVAL_LEN, or neither")
+    return args
+
+
+def cli(argv):
+    """
+    Runs the command given on the command line
+
+    Parameters
+    --------
+    argv : list of strings
+        command line arguments after the program name
+
+    Returns
+    --------
+     : int
+        exit status, 1 if a job could not be run
+
+    Raises
+    --------
+
+    """
+
+    global bearer_token
+    args = parse_args(argv)
+
+    if args.command == "prepare-resources":
+        res.prepare_resources()
+        return 0
+    if args.command == "migrate-storage":
+        sd.migrate_to_columnar()
+        return 0
+
+    #jobs are validated before asking for the bearer token
+    specs = []
+    try:
+        if args.command == "run":
+            fields = {
+                "keywords": args.keywords,
+                "start": args.start,
+                "end": args.end,
+                "json_max": args.json_max,
+                "interval_len": args.interval_len,
+                "academic_access": args.academic,
+                "budget": args.budget,
+                "name": args.dataset,
+                "storage": args.storage
+            }
+            spec = bt.make_spec(fields)
+            #without a dataset name the data is stored in storedqueries itself, like an interactive run
+            if args.dataset is None:
+                spec["name"] = None
+            specs.append(spec)
+        elif args.command == "batch":
+            specs = bt.load_jobs(args.config)
+    except bt.JobConfigError as e:
+        print(e)
+        return 1
+
+    bearer_token = getattr(args, "bearer_token", None)
+    if not bearer_token:
+        print("Enter your Twitter API v2 bearer token or Q to quit")
+        bearer_token = input()
+        if bearer_token == 'q' or bearer_token == 'Q':
+            return 0
+
+    if args.command is None:
+        main()
+    elif args.command == "resume":
+        resume([] if args.json_max is None else
+               [args.json_max, args.interval_len], args.dataset,
+               args.score_workers)
+    elif args.command == "batch":
+        return 1 if run_batch(specs, max(args.jobs, 1), args.consolidate,
+                              args.score_workers) else 0
+    else:
+        return 1 if run_batch(specs, score_workers=args.score_workers) else 0
+    return 0
 
 
 if __name__ == "__main__":
-    print("Enter your Twitter API v2 bearer token or Q to quit")
-    bearer_token = input()
-    if bearer_token == 'q' or bearer_token == 'Q':
-        exit()
-    main()
+    sys.exit(cli(sys.argv[1:]))
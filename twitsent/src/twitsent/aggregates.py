@@ -0,0 +1,402 @@
+import os
+import re
+import json
+import datetime as dt
+import numpy as np
+import twitsent.ragged as ra
+
+#statistics kept for each interval, in column order
+COLUMNS = ("count", "sum", "sumsq", "min", "max", "median", "p25", "p75")
+
+#percentiles kept for each interval, in the order of their columns
+PERCENTILES = (50, 25, 75)
+
+#kinds of sentiment scores aggregated for each dataset
+KINDS = ("senti", "senti_sample")
+
+
+def aggregates_path(mypath, json_max, interval_len, archived=False):
+    """
+    Returns the path of the file that stores the aggregates of a dataset
+
+    Parameters
+    --------
+    mypath : str
+        storedqueries directory that datasets are stored in
+    json_max : int
+        number of tweets collected per interval
+    interval_len : int
+        number of minutes per interval
+    archived : boolean
+        whether to return the path of the archived aggregates instead
+
+    Returns
+    --------
+     : str
+        path to the file of fixed-width rows in the storedqueries directory.
+        Its dates and number of rows are kept beside it in a json file with
+        the same name.
+
+    Raises
+    --------
+
+    """
+
+    name = "aggregates_" + str(json_max) + "_" + str(interval_len) + ".bin"
+    return os.path.join(mypath, "archived" + name if archived else name)
+
+
+def _meta_path(filepath):
+    return os.path.splitext(filepath)[0] + ".json"
+
+
+def _legacy_path(filepath):
+    #aggregates were stored as one npz file before rows were appended in place
+    return os.path.splitext(filepath)[0] + ".npz"
+
+
+def interval_stats(interval_lists):
+    """
+    Computes the aggregates of each interval of sentiment scores
+
+    Parameters
+    --------
+    interval_lists : list of lists
+        sentiment scores grouped by the time interval of data collection
+
+    Returns
+    --------
+     : np.ndarray
+        one row per interval with the columns in COLUMNS. The min, max and
+        percentiles of an interval without scores are nan.
+
+    Raises
+    --------
+
+    """
+
+    scores = ra.RaggedArray.from_lists(interval_lists)
+    return np.column_stack((scores.counts(), scores.sums(), scores.sumsq(),
+                            scores.mins(), scores.maxs(),
+                            *scores.percentiles(list(PERCENTILES))))
+
+
+def archive(mypath, json_max, interval_len):
+    """
+    Moves the aggregates of a dataset to their archived name, replacing any
+    aggregates archived before
+
+    Parameters
+    --------
+    mypath : str
+        storedqueries directory that datasets are stored in
+    json_max : int
+        number of tweets collected per interval
+    interval_len : int
+        number of minutes per interval
+
+    Returns
+    --------
+    None
+
+    Raises
+    --------
+
+    """
+
+    filepath = aggregates_path(mypath, json_max, interval_len)
+    archivepath = aggregates_path(mypath, json_max, interval_len, True)
+    for path_of in (_meta_path, lambda path: path, _legacy_path):
+        if os.path.exists(path_of(archivepath)):
+            os.remove(path_of(archivepath))
+    #the json file is moved first, so that rows without their dates are never read
+    for path_of in (_meta_path, lambda path: path, _legacy_path):
+        if os.path.exists(path_of(filepath)):
+            os.replace(path_of(filepath), path_of(archivepath))
+
+
+def _pad_columns(stats):
+    #aggregates stored before the percentiles were kept have fewer columns, which are read as nan
+    if stats.shape[1] == len(COLUMNS):
+        return stats
+    padded = np.full((len(stats), len(COLUMNS)), np.nan)
+    padded[:, :stats.shape[1]] = stats
+    return padded
+
+
+def _date_name(datestr):
+    #dates are stored in the same month.day.year format used by the csv filenames
+    return re.sub(r"[:/]", ".", datestr)
+
+
+class Aggregates:
+    """
+    Running count, sum, sum of squares, min, max, median and quartiles of
+    the sentiment scores of each interval of a dataset. Aggregates of new
+    intervals are appended whenever data is stored, so graphing a dataset
+    only reads these aggregates instead of every stored score. Each interval
+    is one fixed-width row with the columns of every kind, and saving only
+    appends the rows added since the last save. The dates and number of rows
+    are written to a small json file afterwards, so rows of an interrupted
+    save are never read and are overwritten by the next save.
+
+    Parameters
+    --------
+    mypath : str
+        storedqueries directory that datasets are stored in
+    json_max : int
+        number of tweets collected per interval
+    interval_len : int
+        number of minutes per interval
+
+    Attributes
+    --------
+    filepath : str
+        path to the file that stores the rows of aggregates
+    exists : boolean
+        whether aggregates were stored for this dataset before
+    start : str
+        start date of the dataset, or None
+    end : str
+        end date of the dataset, or None
+    stats : dictionary
+        maps each kind in KINDS to an array with one row of COLUMNS per
+        interval, in the order the intervals were stored
+
+    Methods
+    --------
+    append(sentiment_list, sentiment_sample, start_t, end_t, new_end_t)
+        appends the aggregates of newly stored intervals
+    truncate(rows)
+        drops every interval after the first rows
+    means(kind)
+        returns the mean score of each interval
+    medians(kind), percentiles(kind, q)
+        returns the median or a quartile of the scores of each interval
+    totaltime()
+        returns the number of minutes the dataset contains data over
+    save()
+        writes the rows appended since the last save to disk
+    """
+
+    def __init__(self, mypath, json_max, interval_len):
+        self.filepath = aggregates_path(mypath, json_max, interval_len)
+        self.start = None
+        self.end = None
+        #blocks of rows in the order they were appended, joined when the stats are read
+        self._blocks = []
+        self._rows = 0
+        #number of rows in the file that are kept, the rows after them are written by the next save
+        self._kept = 0
+        self._stored = 0
+
+        metapath = _meta_path(self.filepath)
+        legacypath = _legacy_path(self.filepath)
+        self.exists = os.path.exists(metapath) or os.path.exists(legacypath)
+        if os.path.exists(metapath):
+            with open(metapath, "r", encoding="utf-8") as metafile:
+                meta = json.load(metafile)
+            self.start, self.end = meta["start"], meta["end"]
+            width = len(meta["columns"]) * len(KINDS)
+            rows = np.fromfile(self.filepath,
+                               dtype=np.float64,
+                               count=meta["rows"] * width).reshape(-1, width)
+            if len(meta["columns"]) == len(COLUMNS):
+                self._kept = self._stored = meta["rows"]
+            else:
+                #rows with fewer columns are padded and written again by the next save
+                rows = np.hstack([
+                    _pad_columns(block)
+                    for block in np.hsplit(rows, len(KINDS))
+                ])
+                self._stored = meta["rows"]
+            self._add_block(rows)
+        elif os.path.exists(legacypath):
+            with np.load(legacypath) as stored:
+                self.start, self.end = (str(date) for date in stored["dates"])
+                self._add_block(
+                    np.hstack([_pad_columns(stored[kind]) for kind in KINDS]))
+
+    def __len__(self):
+        return self._rows
+
+    def _add_block(self, rows):
+        if len(rows):
+            self._blocks.append(rows)
+            self._rows += len(rows)
+
+    def _all_rows(self):
+        if len(self._blocks) > 1:
+            self._blocks = [np.concatenate(self._blocks)]
+        if not self._blocks:
+            return np.empty((0, len(COLUMNS) * len(KINDS)), dtype=np.float64)
+        return self._blocks[0]
+
+    @property
+    def stats(self):
+        return dict(zip(KINDS, np.hsplit(self._all_rows(), len(KINDS))))
+
+    def append(self, sentiment_list, sentiment_sample, start_t, end_t,
+               new_end_t):
+        """
+        Appends the aggregates of newly stored intervals. Aggregates whose end
+        date does not match end_t belong to a previous data collection and
+        are replaced. If one kind has fewer intervals than the other, its
+        missing intervals are aggregated as empty intervals.
+
+        Parameters
+        --------
+        sentiment_list : list of lists
+            sentiment scores of tweets collected containing certain keywords
+        sentiment_sample : list of lists
+            sentiment scores of random tweets collected
+        start_t : string
+            Start date of data collection
+        end_t : string
+            End date of previous data collection file
+        new_end_t : string
+            End date of this data collection
+
+        Returns
+        --------
+        None
+
+        Raises
+        --------
+
+        """
+
+        if self.end is not None and self.end != _date_name(end_t):
+            self.start = None
+            self.truncate(0)
+        if self.start is None:
+            self.start = _date_name(start_t)
+        self.end = _date_name(new_end_t)
+
+        rows = max(len(sentiment_list), len(sentiment_sample))
+        self._add_block(
+            np.hstack([
+                interval_stats(
+                    list(interval_lists) + [[]] * (rows - len(interval_lists)))
+                for interval_lists in (sentiment_list, sentiment_sample)
+            ]))
+
+    def truncate(self, rows):
+        rows = min(rows, self._rows)
+        self._blocks = [self._all_rows()[:rows]] if rows else []
+        self._rows = rows
+        self._kept = min(self._kept, rows)
+
+    def means(self, kind):
+        """
+        Returns the mean sentiment score of each interval
+
+        Parameters
+        --------
+        kind : str
+            'senti' or 'senti_sample'
+
+        Returns
+        --------
+         : np.ndarray
+            mean of each interval, using zero for intervals without scores
+
+        Raises
+        --------
+
+        """
+
+        counts = self.stats[kind][:, 0]
+        sums = self.stats[kind][:, 1]
+        return np.divide(sums,
+                         counts,
+                         out=np.zeros_like(sums),
+                         where=counts != 0)
+    def medians(self, kind):
+        return self.percentiles(kind, 50)
+
+    def percentiles(self, kind, q):
+        """
+        Returns a percentile of the sentiment scores of each interval
+
+        Parameters
+        --------
+        kind : str
+            'senti' or 'senti_sample'
+        q : int
+            one of the percentiles in PERCENTILES
+
+        Returns
+        --------
+         : np.ndarray
+            percentile of each interval, nan for intervals without scores or
+            stored before percentiles were kept
+
+        Raises
+        --------
+        ValueError
+            if q is not kept for each interval
+
+        """
+
+        if q not in PERCENTILES:
+            raise ValueError(
+                f"Percentile {q} is not kept, choose one of {PERCENTILES}")
+        #the percentile columns follow each other in the order of PERCENTILES
+        return self.stats[kind][:, COLUMNS.index("median") +
+                                PERCENTILES.index(q)]
+
+    def totaltime(self):
+        #the total time is measured between midnight of the start and end dates, the same as for the csv files
+        date_s = self.start.split(".")
+        date_c = self.end.split(".")
+        start_date = dt.date(int(date_s[2]) + 2000, int(date_s[0]),
+                             int(date_s[1]))
+        end_date = dt.date(int(date_c[2]) + 2000, int(date_c[0]),
+                           int(date_c[1]))
+        return int((end_date - start_date) / dt.timedelta(minutes=1))
+
+    def _write_meta(self, rows):
+        tmp_path = _meta_path(self.filepath) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as metafile:
+            json.dump(
+                {
+                    "start": self.start,
+                    "end": self.end,
+                    "columns": list(COLUMNS),
+                    "rows": rows
+                }, metafile)
+        os.replace(tmp_path, _meta_path(self.filepath))
+
+    def save(self):
+        """
+        Appends the rows added since the last save to disk, then records the
+        new number of rows, so that an interrupted run cannot corrupt the
+        aggregates. Rows that were truncated or replaced are cut off first.
+
+        Parameters
+        --------
+
+        Returns
+        --------
+        None
+
+        Raises
+        --------
+
+        """
+
+        if self._kept < self._stored:
+            #the rows after the kept ones are no longer read once they are cut off
+            self._write_meta(self._kept)
+            self._stored = self._kept
+        new_rows = self._all_rows()[self._kept:]
+        with open(self.filepath, "ab") as aggregatefile:
+            aggregatefile.truncate(self._kept * new_rows.shape[1] *
+                                   new_rows.itemsize)
+            aggregatefile.write(np.ascontiguousarray(new_rows).tobytes())
+        self._write_meta(self._rows)
+        self._kept = self._stored = self._rows
+        if os.path.exists(_legacy_path(self.filepath)):
+            os.remove(_legacy_path(self.filepath))
+        self.exists = True
@@ -0,0 +1,235 @@
+import os
+import json
+import hashlib
+import threading
+from concurrent.futures import Future
+
+
+def cache_path():
+    """
+    Returns the directory that cached baseline intervals are stored in, which
+    sits beside the storedqueries directory
+
+    Parameters
+    --------
+
+    Returns
+    --------
+    fullpath : str
+        path to the baseline cache directory
+
+    Raises
+    --------
+
+    """
+
+    #get path to parent directory of this file
+    rel_path = os.path.dirname(os.path.realpath(__file__))
+
+    datadir = "baselinecache"
+    fullpath = os.path.join(rel_path, datadir)
+    os.makedirs(os.path.abspath(fullpath), mode=0o777, exist_ok=True)
+
+    return fullpath
+
+
+class BaselineCache:
+    """
+    Stores the cleaned text and sentiment scores of baseline tweets for each
+    time interval, so that keyword runs over overlapping dates only need to
+    collect the baseline intervals that have not been collected before.
+    Each cache file is addressed by a hash of the search parameters that
+    determine its content.
+
+    Parameters
+    --------
+    query : str
+        Twitter Search API v2 query string of the baseline search
+    json_max : int
+        max number of tweets stored per time interval
+    interval_len : int
+        length of each time interval in minutes
+
+    Attributes
+    --------
+    key : str
+        sha256 digest of the query, json_max and interval_len
+    filepath : str
+        path to the json file that stores this cache
+    intervals : dictionary
+        maps the isoformat end time of each cached interval to a dictionary
+        with its 'tweets' and 'scores'
+
+    Methods
+    --------
+    tweets(interval_end)
+        returns the cached tweet text of an interval, or None
+    fetch(interval_end, retrieve)
+        returns the tweet text of an interval, retrieving it only if it is
+        neither cached nor being retrieved by another collection
+    scores(interval_end)
+        returns the cached sentiment scores of an interval, or None
+    put(interval_end, tweets, scores)
+        adds an interval to the cache
+    score(interval_ends, interval_lists, parse)
+        scores the intervals that are not cached yet and returns the scores of
+        every interval
+    save()
+        atomically writes the cache to disk
+    """
+
+    def __init__(self, query, json_max, interval_len):
+        self.query = query
+        self.json_max = json_max
+        self.interval_len = interval_len
+
+        params = json.dumps(
+            {
+                "query": query,
+                "json_max": json_max,
+                "interval_len": interval_len
+            },
+            sort_keys=True)
+        self.key = hashlib.sha256(params.encode("utf-8")).hexdigest()
+        self.filepath = os.path.join(cache_path(), self.key + ".json")
+
+        self.intervals = {}
+        #intervals that are being retrieved, or were retrieved but not scored yet, mapped to a Future of their tweets
+        self._fetching = {}
+        self._lock = threading.Lock()
+        if os.path.exists(self.filepath):
+            with open(self.filepath, "r", encoding="utf-8") as cachefile:
+                self.intervals = json.load(cachefile)["intervals"]
+
+    def tweets(self, interval_end):
+        entry = self.intervals.get(interval_end.isoformat())
+        return None if entry is None else entry["tweets"]
+
+    def fetch(self, interval_end, retrieve):
+        """
+        Returns the tweet text of an interval. Collections that run at the
+        same time with the same baseline search share one retrieval of each
+        interval instead of requesting it once each.
+
+        Parameters
+        --------
+        interval_end : dt.datetime
+            end time of the interval
+        retrieve : function
+            called without arguments to retrieve the tweets of the interval
+            if they are not cached
+
+        Returns
+        --------
+         : list of strings
+            cleaned tweet text of the interval
+
+        Raises
+        --------
+        Exception
+            any exception raised by retrieve, in every collection waiting for
+            the interval
+
+        """
+
+        key = interval_end.isoformat()
+        with self._lock:
+            cached = self.tweets(interval_end)
+            if cached is not None:
+                return cached
+            future = self._fetching.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._fetching[key] = future
+        if not owner:
+            return future.result()
+
+        try:
+            tweets = retrieve()
+        except BaseException as e:
+            #a failed retrieval is tried again by the next collection that needs the interval
+            with self._lock:
+                del self._fetching[key]
+            future.set_exception(e)
+            raise
+        future.set_result(tweets)
+        return tweets
+
+    def scores(self, interval_end):
+        entry = self.intervals.get(interval_end.isoformat())
+        return None if entry is None else entry["scores"]
+
+    def put(self, interval_end, tweets, scores):
+        with self._lock:
+            self.intervals[interval_end.isoformat()] = {
+                "tweets": tweets,
+                "scores": scores
+            }
+            #the interval is cached now, so its retrieval no longer has to be kept
+            self._fetching.pop(interval_end.isoformat(), None)
+
+    def score(self, interval_ends, interval_lists, parse):
+        """
+        Scores the sentiment of every interval that is not cached yet, adds it
+        to the cache and returns the scores of all intervals
+
+        Parameters
+        --------
+        interval_ends : list of dt.datetime
+            end time of each interval in interval_lists
+        interval_lists : list of lists
+            Cleaned tweet text grouped by the time interval of data collection
+        parse : function
+            converts a list of tweet text intervals into sentiment scores
+
+        Returns
+        --------
+         : list of lists
+            Sentiment score data for each tweet in interval_lists, grouped
+            correspondingly by time interval
+
+        Raises
+        --------
+
+        """
+
+        missing = [
+            i for i, interval_end in enumerate(interval_ends)
+            if self.scores(interval_end) is None
+        ]
+        new_scores = parse([interval_lists[i] for i in missing])
+        for i, scores in zip(missing, new_scores):
+            self.put(interval_ends[i], interval_lists[i], scores)
+
+        return [self.scores(interval_end) for interval_end in interval_ends]
+
+    def save(self):
+        """
+        Writes the cache to disk, replacing the previous file in one step so
+        that an interrupted run cannot corrupt it
+
+        Parameters
+        --------
+
+        Returns
+        --------
+        None
+
+        Raises
+        --------
+
+        """
+
+        contents = {
+            "query": self.query,
+            "json_max": self.json_max,
+            "interval_len": self.interval_len,
+            "intervals": self.intervals
+        }
+        #collections that share the cache may add intervals or save it at the same time
+        with self._lock:
+            tmp_path = self.filepath + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as cachefile:
+                json.dump(contents, cachefile)
+            os.replace(tmp_path, self.filepath)
@@ -0,0 +1,229 @@
+import os
+import json
+import re
+import datetime as dt
+import twitsent.twitterquery as tq
+import twitsent.store_data as sd
+
+#settings that a job takes from the top level of the config file, or from these defaults, unless it sets its own
+DEFAULTS = {
+    "json_max": 10,
+    "interval_len": 240,
+    "academic_access": False,
+    "lang": ["en"],
+    "priority": 1,
+    "budget": None,
+    "storage": sd.DEFAULT_BACKEND
+}
+
+
+class JobConfigError(Exception):
+
+    def __init__(self, message):
+        super().__init__(message)
+
+
+def parse_keywords(keywords):
+    """
+    Creates a rule for make_query from keywords written the same way as when
+    they are entered at the prompt
+
+    Parameters
+    --------
+    keywords : str or list of strings
+        comma delimited string or list of search terms, where the words of a
+        term must all be contained in a tweet. 'd' selects the default terms.
+
+    Returns
+    --------
+     : list of lists
+        rule that make_query accepts
+
+    Raises
+    --------
+    JobConfigError
+        if no search terms are given
+    """
+
+    if isinstance(keywords, str):
+        if keywords.strip().lower() == 'd':
+            return tq.DEFAULT_RULE
+        keywords = keywords.split(",")
+    rule = [
+        term.strip().lower().split(" ") for term in keywords if term.strip()
+    ]
+    if not rule:
+        raise JobConfigError("No search terms received")
+    return rule
+
+
+def parse_date(value):
+    """
+    Reads a date from a config file or the command line
+
+    Parameters
+    --------
+    value : str
+        date in YYYY-MM-DD format
+
+    Returns
+    --------
+     : dt.date
+        the date
+
+    Raises
+    --------
+    JobConfigError
+        if the date is not in YYYY-MM-DD format
+    """
+
+    try:
+        return dt.date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise JobConfigError(
+            f"Invalid date ({value}) received, dates must be written as YYYY-MM-DD"
+        )
+
+
+def dataset_name(rule):
+    #datasets are named after their keywords, so that a job continues the same dataset every time it is run
+    name = re.sub(r"[^a-z0-9]+", "_",
+                  " ".join(" ".join(term) for term in rule))
+    return name.strip("_")[:64] or "dataset"
+
+
+def make_spec(fields, defaults=None):
+    """
+    Validates the fields of one job and fills in the missing settings
+
+    Parameters
+    --------
+    fields : dictionary
+        'keywords' and 'end' date of the job, and optionally its 'start'
+        date, 'name', 'json_max', 'interval_len', 'academic_access', 'lang',
+        'priority' (share of the rate limit relative to other jobs running
+        at the same time), 'budget' (number of keyword tweets a run may
+        retrieve) and 'storage' (name of the storage backend). A job without
+        a start date continues the stored dataset with the same name.
+    defaults : dictionary
+        settings used for the fields that the job does not set, DEFAULTS if
+        None
+
+    Returns
+    --------
+    spec : dictionary
+        'name', 'rule', 'lang', 'start_date' (dt.date or None), 'end_date',
+        'json_max', 'interval_len', 'academic_access', 'priority',
+        'budget' (int or None) and 'storage' of the job
+
+    Raises
+    --------
+    JobConfigError
+        if a field is missing or invalid
+    """
+
+    settings = dict(DEFAULTS if defaults is None else defaults)
+    settings.update(fields)
+    if "keywords" not in settings or "end" not in settings:
+        raise JobConfigError("Each job requires 'keywords' and an 'end' date")
+
+    rule = parse_keywords(settings["keywords"])
+    spec = {
+        "name": settings.get("name") or dataset_name(rule),
+        "rule": rule,
+        "lang": list(settings["lang"]),
+        "start_date": None,
+        "end_date": parse_date(settings["end"]),
+        "academic_access": bool(settings["academic_access"]),
+        "storage": settings["storage"]
+    }
+    #the name is used as the directory of the dataset within storedqueries
+    if (spec["name"] in (".", "..")
+            or os.path.basename(spec["name"]) != spec["name"]):
+        raise JobConfigError(f"Invalid job name ({spec['name']}) received")
+    if settings.get("start") is not None:
+        spec["start_date"] = parse_date(settings["start"])
+    for key in ("json_max", "interval_len", "priority", "budget"):
+        if key == "budget" and settings[key] is None:
+            spec[key] = None
+            continue
+        try:
+            spec[key] = int(settings[key])
+        except (TypeError, ValueError):
+            raise JobConfigError(
+                f"Invalid {key} ({settings[key]}) received for job {spec['name']}"
+            )
+    #terms that make_query would drop are rejected, and rules too long for one query are divided into several queries when they are collected
+    dropped = tq.forbidden_terms(rule)
+    if dropped:
+        raise JobConfigError(
+            f"Search terms cannot contain '\\' or ':', received {', '.join(dropped)} for job {spec['name']}"
+        )
+    try:
+        tq.split_rule(rule, spec["lang"],
+                      tq.QUERY_LIMITS['y' if spec["academic_access"] else 'n'])
+    except tq.QueryLengthError as e:
+        raise JobConfigError(f"Invalid keywords for job {spec['name']}: {e}")
+    if spec["storage"] not in sd.BACKENDS:
+        raise JobConfigError(
+            f"Invalid storage ({spec['storage']}) received for job {spec['name']}, choose one of {', '.join(sd.BACKENDS)}"
+        )
+    if spec["priority"] < 1:
+        raise JobConfigError(
+            f"Invalid priority ({spec['priority']}) received for job {spec['name']}, priorities start at 1"
+        )
+    return spec
+
+
+def load_jobs(filepath):
+    """
+    Reads the data collection jobs of a batch from a json config file of the
+    form {"jobs": [{...}, ...]}. Any other top level key is used as the
+    default setting of every job, see make_spec.
+
+    Parameters
+    --------
+    filepath : str
+        path to the config file
+
+    Returns
+    --------
+     : list of dictionaries
+        the spec of each job, in the order they are listed
+
+    Raises
+    --------
+    JobConfigError
+        if the file cannot be read or is not valid json, a job is invalid or
+        two jobs would store their data in the same dataset
+    """
+
+    try:
+        with open(filepath, "r", encoding="utf-8") as configfile:
+            config = json.load(configfile)
+    except OSError as e:
+        raise JobConfigError(f"Could not read job config file {filepath}: {e}")
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise JobConfigError(f"Invalid job config file {filepath}: {e}")
+    if not isinstance(config, dict) or not isinstance(
+            config.get("jobs"), list):
+        raise JobConfigError(
+            f"Job config file {filepath} must contain a list of 'jobs'")
+
+    defaults = dict(DEFAULTS)
+    defaults.update(
+        {key: value for key, value in config.items() if key != "jobs"})
+    for position, fields in enumerate(config["jobs"], 1):
+        if not isinstance(fields, dict):
+            raise JobConfigError(
+                f"Job {position} in {filepath} must be an object of settings, received {fields!r}"
+            )
+    specs = [make_spec(fields, defaults) for fields in config["jobs"]]
+
+    names = [spec["name"] for spec in specs]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise JobConfigError(
+            f"Jobs must store their data in different datasets, give them distinct names: {', '.join(duplicates)}"
+        )
+    return specs
@@ -0,0 +1,273 @@
+import os
+import glob
+import json
+import threading
+import twitsent.store_data as sd
+
+
+def checkpoint_path(json_max, interval_len):
+    """
+    Returns the path of the checkpoint file of a data collection job
+
+    Parameters
+    --------
+    json_max : int
+        number of tweets collected per interval
+    interval_len : int
+        number of minutes per interval
+
+    Returns
+    --------
+     : str
+        path to the checkpoint file in the storedqueries directory
+
+    Raises
+    --------
+
+    """
+
+    return os.path.join(
+        sd.storage_path(),
+        "checkpoint_" + str(json_max) + "_" + str(interval_len) + ".json")
+
+
+def find_checkpoints():
+    """
+    Finds the checkpoint files of every interrupted data collection job
+
+    Parameters
+    --------
+
+    Returns
+    --------
+     : list of str
+        paths of the checkpoint files in the storedqueries directory
+
+    Raises
+    --------
+
+    """
+
+    return sorted(
+        glob.glob(os.path.join(sd.storage_path(), "checkpoint_*_*.json")))
+
+
+def load_job(filepath):
+    """
+    Reads the parameters of the data collection job that a checkpoint file
+    belongs to
+
+    Parameters
+    --------
+    filepath : str
+        path to the checkpoint file
+
+    Returns
+    --------
+     : dictionary
+        the job parameters that were passed to Checkpoint
+
+    Raises
+    --------
+
+    """
+
+    with open(filepath, "r", encoding="utf-8") as checkpointfile:
+        return json.load(checkpointfile)["job"]
+
+
+def _log_path(filepath):
+    return os.path.splitext(filepath)[0] + ".log"
+
+
+class Checkpoint:
+    """
+    Records the progress of a data collection job within each interval being
+    collected: the tweets retrieved so far, the request the interval is at
+    and the pagination token of the next page. Completed intervals are kept
+    until they are stored, so an interrupted job resumes without requesting
+    any page twice. Intervals that are already stored are recorded by the
+    stream_writer progress file instead.
+
+    The job parameters are written once to a json file. Each page is
+    appended to a log next to it as one json line with the tweets of that
+    page only, so recording a page costs the size of the page rather than
+    of every interval in progress. The log is rewritten with only the
+    intervals still in progress once most of it belongs to stored
+    intervals. Intervals of keyword searches that share a qp.CombinedQuery
+    are not recorded, and are requested again from their first page.
+
+    Parameters
+    --------
+    job : dictionary
+        json serializable parameters of the job, which must include
+        'json_max' and 'interval_len'. The state of a previous job is only
+        resumed if its parameters were identical.
+
+    Attributes
+    --------
+    filepath : str
+        path to the json file that stores the job parameters
+    job : dictionary
+        parameters of the job
+    intervals : dictionary
+        maps '<stream>:<index>' of each interval in progress to a dictionary
+        with its 'index', 'request', 'next_token' and 'tweets'
+
+    Methods
+    --------
+    resume(stream, index)
+        returns the recorded state of an interval, or None
+    update(stream, index, request, next_token, tweets)
+        records the state of an interval after a page is retrieved
+    discard(done)
+        forgets the state of every interval before index done
+    save()
+        rewrites the log with only the intervals in progress
+    remove()
+        deletes the checkpoint files once the job is complete
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.filepath = checkpoint_path(job["json_max"], job["interval_len"])
+        self.logpath = _log_path(self.filepath)
+        self.intervals = {}
+        self._lock = threading.Lock()
+        #bytes of the log in total and of the lines of each interval in progress
+        self._log_bytes = 0
+        self._live_bytes = {}
+
+        contents = None
+        if os.path.exists(self.filepath):
+            with open(self.filepath, "r", encoding="utf-8") as checkpointfile:
+                contents = json.load(checkpointfile)
+        #the state of a job with different parameters cannot be resumed
+        if contents is not None and contents["job"] == job:
+            #checkpoints written before the log kept every interval in the json file
+            self.intervals = contents.get("intervals", {})
+            if os.path.exists(self.logpath):
+                self._read_log()
+        if contents is None or contents != {"job": job}:
+            tmp_path = self.filepath + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as checkpointfile:
+                json.dump({"job": job}, checkpointfile)
+            #the log is rewritten before the job file so that a job never refers to the log of another job
+            self._write()
+            os.replace(tmp_path, self.filepath)
+        else:
+            self._write()
+
+    def _read_log(self):
+        with open(self.logpath, "r", encoding="utf-8") as logfile:
+            for line in logfile:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    #the last line of an interrupted run may be incomplete
+                    break
+                if "done" in entry:
+                    self._forget(entry["done"])
+                    continue
+                key = entry.pop("key")
+                tweets = entry.pop("tweets")
+                state = self.intervals.setdefault(key, {"tweets": []})
+                state.update(entry)
+                state["tweets"].extend(tweets)
+
+    def resume(self, stream, index):
+        with self._lock:
+            return self.intervals.get(stream + ":" + str(index))
+
+    def update(self, stream, index, request, next_token, tweets):
+        """
+        Records the state of an interval after one of its pages was
+        retrieved, appending the tweets that were not recorded yet to the log
+
+        Parameters
+        --------
+        stream : str
+            name of the collection the interval belongs to
+        index : int
+            position of the interval in reverse chronological order
+        request : int
+            index of the request within the interval that next_token belongs
+            to, or of the next request if next_token is None
+        next_token : str
+            pagination token of the next page, or None
+        tweets : list of strings
+            cleaned tweet text retrieved for the interval so far
+
+        Returns
+        --------
+        None
+
+        Raises
+        --------
+
+        """
+
+        key = stream + ":" + str(index)
+        with self._lock:
+            state = self.intervals.setdefault(key, {"tweets": []})
+            new_tweets = tweets[len(state["tweets"]):]
+            state.update(index=index, request=request, next_token=next_token)
+            state["tweets"].extend(new_tweets)
+            self._append({
+                "key": key,
+                "index": index,
+                "request": request,
+                "next_token": next_token,
+                "tweets": new_tweets
+            }, key)
+
+    def _forget(self, done):
+        self.intervals = {
+            key: state
+            for key, state in self.intervals.items()
+            if state["index"] >= done
+        }
+        self._live_bytes = {
+            key: size
+            for key, size in self._live_bytes.items() if key in self.intervals
+        }
+
+    def discard(self, done):
+        with self._lock:
+            self._forget(done)
+            #rewriting the log costs the intervals in progress, so it is only done once they are a small part of it
+            if self._log_bytes > 2 * sum(self._live_bytes.values()):
+                self._write()
+            else:
+                self._append({"done": done})
+
+    def _append(self, entry, key=None):
+        line = (json.dumps(entry) + "\n").encode("utf-8")
+        with open(self.logpath, "ab") as logfile:
+            logfile.write(line)
+        self._log_bytes += len(line)
+        if key is not None:
+            self._live_bytes[key] = self._live_bytes.get(key, 0) + len(line)
+
+    def _write(self):
+        #every interval in progress becomes a single line of the new log
+        lines = {
+            key: (json.dumps(dict(state, key=key)) + "\n").encode("utf-8")
+            for key, state in self.intervals.items()
+        }
+        tmp_path = self.logpath + ".tmp"
+        with open(tmp_path, "wb") as logfile:
+            logfile.writelines(lines.values())
+        os.replace(tmp_path, self.logpath)
+        self._live_bytes = {key: len(line) for key, line in lines.items()}
+        self._log_bytes = sum(self._live_bytes.values())
+
+    def save(self):
+        with self._lock:
+            self._write()
+
+    def remove(self):
+        #the job file goes first, since a log without it is never read
+        for path in (self.filepath, self.logpath):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,128 @@
+import re
+from cleantext import constants
+from cleantext.clean import fix_bad_unicode, unidecode
+
+#cleantext options that clean_batch reproduces, kept to compare against cleantext.clean
+CLEAN_OPTIONS = {
+    "fix_unicode": True,  # fix various unicode errors
+    "to_ascii": True,  # transliterate to closest ASCII representation
+    "lower": True,  # lowercase text
+    "no_line_breaks":
+    True,  # fully strip line breaks as opposed to only normalizing them
+    "no_urls": True,  # replace all URLs with a special token
+    "no_emails": True,  # replace all email addresses with a special token
+    "no_phone_numbers":
+    True,  # replace all phone numbers with a special token
+    "no_numbers": True,  # replace all numbers with a special token
+    "no_digits": True,  # replace all digits with a special token
+    "no_currency_symbols":
+    True,  # replace all currency symbols with a special token
+    "no_punct": True,  # remove punctuations
+    "replace_with_url": "",
+    "replace_with_email": "",
+    "replace_with_phone_number": "",
+    "replace_with_number": "",
+    "replace_with_digit": "",
+    "replace_with_currency_symbol": "",
+    "no_emoji": True,
+    "lang": "en"  # set to 'de' for German special handling
+}
+
+#retweet characters left in the text after cleaning
+RT_REGEX = re.compile(r"\brt\b")
+
+#ftfy removes this control character while fixing unicode, so it can safely delimit tweets within a joined page. It is whitespace to the patterns below and a non-word character to their lookarounds, so every pattern treats it like the start or end of a tweet.
+SEPARATOR = "\x1e"
+
+#ascii text without control characters, html entities or backslash escapes is left unchanged by fix_bad_unicode
+PLAIN_REGEX = re.compile(r"[\t\n\x20-\x25\x27-\x5b\x5d-\x7e]*")
+
+#cleantext's phone pattern, except that the optional spaces around an extension cannot reach into the next tweet
+PHONE_REGEX = re.compile(constants.PHONE_REGEX.pattern.replace(
+    r"\s?", "[^\\S" + SEPARATOR + "]?"))
+DIGIT_REGEX = re.compile(r"\d")
+SPACE_REGEX = re.compile("[^\\S" + SEPARATOR + "]+")
+EDGE_REGEX = re.compile(" ?" + SEPARATOR + " ?")
+
+#text is ascii by the time punctuation is removed, so only the ascii part of cleantext's table is needed
+PUNCT_TABLE = {
+    key: value
+    for key, value in constants.PUNCT_TRANSLATE_UNICODE.items() if key < 128
+}
+
+
+def _clean_page(texts):
+    """
+    Applies the cleantext steps that follow fixing unicode to a page of
+    texts at once, by running each precompiled pattern over the joined page
+
+    Parameters
+    --------
+    texts : list of strings
+        tweet text with unicode already fixed
+
+    Returns
+    --------
+     : list of strings
+        cleaned text of each tweet, or None if a tweet contained the
+        separator
+
+    Raises
+    --------
+
+    """
+
+    page = SEPARATOR.join(texts)
+    page = constants.CURRENCY_REGEX.sub("", page)
+    page = constants.SINGLE_QUOTE_REGEX.sub("'", page)
+    page = constants.DOUBLE_QUOTE_REGEX.sub('"', page)
+    page = unidecode(page)
+    page = constants.URL_REGEX.sub("", page)
+    page = constants.EMAIL_REGEX.sub("", page)
+    page = PHONE_REGEX.sub("", page)
+    page = constants.NUMBERS_REGEX.sub("", page)
+    page = DIGIT_REGEX.sub("", page)
+    page = page.translate(PUNCT_TABLE).lower()
+
+    #collapse whitespace within each tweet and strip it around each tweet
+    page = EDGE_REGEX.sub(SEPARATOR, SPACE_REGEX.sub(" ", page))
+    tweets = RT_REGEX.sub("", page).split(SEPARATOR)
+    if len(tweets) != len(texts):
+        return None
+    return [tweet.strip() for tweet in tweets]
+
+
+def clean_batch(texts):
+    """
+    Cleans a page of raw tweet text at once, with the same result as
+    cleantext.clean with CLEAN_OPTIONS followed by removing retweet
+    characters. Only fixing unicode with ftfy is done one text at a time,
+    for distinct texts that are not plain ascii. Every other step is a
+    precompiled pattern or translation applied once to the joined page.
+
+    Parameters
+    --------
+    texts : list of strings
+        raw text of each tweet in a page of API results
+
+    Returns
+    --------
+     : list of strings
+        cleaned text of each tweet, in the same order as texts
+
+    Raises
+    --------
+
+    """
+
+    distinct = list(dict.fromkeys(texts))
+    fixed = [
+        text if PLAIN_REGEX.fullmatch(text) else fix_bad_unicode(text)
+        for text in distinct
+    ]
+    cleaned = _clean_page(fixed)
+    if cleaned is None:
+        #transliteration produced the separator, so fall back to cleaning one tweet at a time
+        cleaned = [_clean_page([text])[0] for text in fixed]
+    cleaned = dict(zip(distinct, cleaned))
+    return [cleaned[text] for text in texts]
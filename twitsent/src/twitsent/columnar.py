@@ -0,0 +1,411 @@
+import os
+import json
+import shutil
+import datetime as dt
+import numpy as np
+import twitsent.ragged as ra
+
+#kinds of data stored in each columnar dataset, in the order that save_lists receives them
+SCORE_KINDS = ("senti", "senti_sample")
+TWEET_KINDS = ("tweet", "tweet_sample")
+
+#dtype of each column file of a kind, by the suffix of its name
+COLUMNS = {
+    "_values": np.float64,
+    "_offsets": np.int64,
+    "_intervals": np.int64
+}
+
+
+def dataset_name(json_max, interval_len):
+    """
+    Returns the name of the directory that stores a columnar dataset
+
+    Parameters
+    --------
+    json_max : int
+        number of tweets collected per interval
+    interval_len : int
+        number of minutes per interval
+
+    Returns
+    --------
+     : str
+        directory name within storedqueries
+
+    Raises
+    --------
+
+    """
+
+    return "columnar_" + str(json_max) + "_" + str(interval_len)
+
+
+def _column_path(fullpath, name):
+    #columns are raw arrays without a header, their lengths are kept in meta.json
+    return os.path.join(fullpath, name + ".col")
+
+
+def _map_column(path, dtype, length):
+    #offset arrays always start with a zero, even before any interval is stored
+    if length == 0:
+        return np.zeros(1 if dtype == np.int64 else 0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(length, ))
+
+
+def _append_column(path, length, array):
+    #bytes after the recorded length belong to a save that was interrupted before its metadata was written
+    array = np.ascontiguousarray(array)
+    with open(path, "ab") as columnfile:
+        columnfile.truncate(length * array.itemsize)
+        columnfile.write(array.tobytes())
+    return length + len(array)
+
+
+def _read_array(path, dtype):
+    #columns of datasets stored before they were appended in place are npy files
+    if not os.path.exists(path):
+        return np.zeros(1 if dtype == np.int64 else 0, dtype=dtype)
+    return np.load(path, mmap_mode="r")
+
+
+class TweetColumn:
+    """
+    Read-only list of tweet text intervals backed by a memory-mapped text
+    blob. Tweets are only decoded when an interval is accessed.
+
+    Parameters
+    --------
+    blob : memory map or bytes
+        utf-8 encoded text of every tweet, one after another
+    tweet_offsets : np.ndarray
+        byte offset of the start of each tweet within blob, followed by the
+        length of blob
+    interval_offsets : np.ndarray
+        index of the first tweet of each interval, followed by the number of
+        tweets
+
+    Attributes
+    --------
+    blob : memory map or bytes
+        utf-8 encoded text of every tweet
+    tweet_offsets : np.ndarray
+        byte offsets of each tweet within blob
+    interval_offsets : np.ndarray
+        tweet offsets of each interval
+
+    Methods
+    --------
+    __getitem__(index)
+        decodes and returns the tweets of one interval as a list of strings
+    """
+
+    def __init__(self, blob, tweet_offsets, interval_offsets):
+        self.blob = blob
+        self.tweet_offsets = tweet_offsets
+        self.interval_offsets = interval_offsets
+
+    def __len__(self):
+        return len(self.interval_offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("interval index out of range")
+        first = int(self.interval_offsets[index])
+        last = int(self.interval_offsets[index + 1])
+        starts = self.tweet_offsets[first:last + 1]
+        return [
+            bytes(self.blob[int(starts[i]):int(starts[i + 1])]).decode("utf-8")
+            for i in range(last - first)
+        ]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+class ColumnarBackend:
+    """
+    Stores each dataset as NumPy arrays instead of CSV text. Sentiment scores
+    are kept as one flat float array per kind together with the offset of the
+    first score of each interval, and tweets are kept as one utf-8 text blob
+    with offset arrays, so that loading memory-maps the files instead of
+    parsing every row. Every array is a raw file that new intervals are
+    appended to, and the length of each is recorded in meta.json once the
+    new intervals are written, so storing an interval only writes that
+    interval.
+
+    Parameters
+    --------
+    mypath : str
+        storedqueries directory that datasets are stored in
+
+    Attributes
+    --------
+    mypath : str
+        storedqueries directory that datasets are stored in
+
+    Methods
+    --------
+    save_lists(...)
+        appends collected intervals to the dataset, same arguments as
+        store_data.save_lists
+    load_lists(json_max, interval_len)
+        memory-maps the dataset, same return value as store_data.load_lists
+    storage_name(json_max, interval_len)
+        returns the name of the dataset directory, as recorded in the manifest
+    """
+
+    def __init__(self, mypath):
+        self.mypath = mypath
+
+    def storage_name(self, json_max, interval_len):
+        return dataset_name(json_max, interval_len)
+
+    def _dataset_path(self, json_max, interval_len):
+        return os.path.join(self.mypath, dataset_name(json_max, interval_len))
+
+    def _read_meta(self, fullpath):
+        metapath = os.path.join(fullpath, "meta.json")
+        if not os.path.exists(metapath):
+            return None
+        with open(metapath, "r", encoding="utf-8") as metafile:
+            return json.load(metafile)
+
+    def _upgrade(self, fullpath, meta):
+        #datasets stored as npy files are converted to appendable columns once
+        if "lengths" in meta:
+            return
+        meta["lengths"] = {}
+        for kind in SCORE_KINDS + TWEET_KINDS:
+            for suffix, dtype in COLUMNS.items():
+                npy_path = os.path.join(fullpath, kind + suffix + ".npy")
+                if os.path.exists(npy_path):
+                    meta["lengths"][kind + suffix] = _append_column(
+                        _column_path(fullpath, kind + suffix), 0,
+                        np.load(npy_path).astype(dtype))
+
+    def _append_offsets(self, fullpath, lengths, name, counts):
+        #appends the offsets that follow the last one stored, starting the column with a zero
+        length = lengths.get(name, 0)
+        offsets = _map_column(_column_path(fullpath, name), np.int64, length)
+        new_offsets = int(offsets[-1]) + np.cumsum(counts, dtype=np.int64)
+        if length == 0:
+            new_offsets = np.concatenate(([0], new_offsets))
+        lengths[name] = _append_column(_column_path(fullpath, name), length,
+                                       new_offsets)
+
+    def _append_scores(self, fullpath, lengths, kind, interval_lists):
+        scores = ra.RaggedArray.from_lists(interval_lists)
+        name = kind + "_values"
+        lengths[name] = _append_column(_column_path(fullpath, name),
+                                       lengths.get(name, 0), scores.values)
+        self._append_offsets(fullpath, lengths, kind + "_offsets",
+                             scores.counts())
+
+    def _append_tweets(self, fullpath, lengths, kind, interval_lists):
+        encoded = [
+            tweet.encode("utf-8") for interval in interval_lists
+            for tweet in interval
+        ]
+        tweet_offsets = _map_column(_column_path(fullpath, kind + "_offsets"),
+                                    np.int64, lengths.get(kind + "_offsets", 0))
+
+        #the blob is cut to the bytes its offsets reference, so bytes from an interrupted save are never kept
+        with open(os.path.join(fullpath, kind + ".bin"), "ab") as blobfile:
+            blobfile.truncate(int(tweet_offsets[-1]))
+            blobfile.write(b"".join(encoded))
+
+        self._append_offsets(
+            fullpath, lengths, kind + "_offsets",
+            np.array([len(tweet) for tweet in encoded], dtype=np.int64))
+        self._append_offsets(
+            fullpath, lengths, kind + "_intervals",
+            np.array([len(interval) for interval in interval_lists],
+                     dtype=np.int64))
+
+    def save_lists(self,
+                   json_response_list,
+                   json_sample_list,
+                   sentiment_list,
+                   sentiment_sample,
+                   start_t,
+                   end_t,
+                   new_end_t,
+                   json_max,
+                   interval_len,
+                   query=None,
+                   interval_ends=None):
+        """
+        Appends collected intervals to the columnar dataset with matching
+        parameters. A dataset whose end date does not match end_t belongs to a
+        previous data collection and is archived first. Intervals are stored
+        in the order they are received, so query and interval_ends are not
+        needed.
+
+        Parameters
+        --------
+        same as store_data.save_lists
+
+        Returns
+        --------
+        None
+
+        Raises
+        --------
+
+        """
+
+        fullpath = self._dataset_path(json_max, interval_len)
+        start_t = _date_name(start_t)
+        end_t = _date_name(end_t)
+        new_end_t = _date_name(new_end_t)
+
+        meta = self._read_meta(fullpath)
+        if meta is not None and meta["end"] != end_t:
+            #a new data collection was started, keep the previous one as the archived dataset
+            archivepath = os.path.join(
+                self.mypath, "archived" + dataset_name(json_max, interval_len))
+            if os.path.exists(archivepath):
+                shutil.rmtree(archivepath)
+            os.rename(fullpath, archivepath)
+            meta = None
+        if meta is None:
+            meta = {"start": start_t, "end": end_t, "lengths": {}}
+        os.makedirs(fullpath, exist_ok=True)
+        self._upgrade(fullpath, meta)
+
+        for kind, interval_lists in zip(SCORE_KINDS,
+                                        (sentiment_list, sentiment_sample)):
+            self._append_scores(fullpath, meta["lengths"], kind,
+                                interval_lists)
+        for kind, interval_lists in zip(TWEET_KINDS,
+                                        (json_response_list, json_sample_list)):
+            self._append_tweets(fullpath, meta["lengths"], kind,
+                                interval_lists)
+
+        #the metadata is written last, so the dataset only reflects the new intervals and end date once every array is durable
+        meta["end"] = new_end_t
+        tmp_path = os.path.join(fullpath, "meta.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as metafile:
+            json.dump(meta, metafile)
+        os.replace(tmp_path, os.path.join(fullpath, "meta.json"))
+        for kind in SCORE_KINDS + TWEET_KINDS:
+            for suffix in COLUMNS:
+                npy_path = os.path.join(fullpath, kind + suffix + ".npy")
+                if os.path.exists(npy_path):
+                    os.remove(npy_path)
+
+    def _load_column(self, fullpath, meta, name, dtype):
+        if "lengths" not in meta:
+            return _read_array(os.path.join(fullpath, name + ".npy"), dtype)
+        return _map_column(_column_path(fullpath, name), dtype,
+                           meta["lengths"].get(name, 0))
+
+    def load_scores(self, fullpath, kind, meta=None):
+        """
+        Memory-maps the flat scores and interval offsets of one kind of data
+
+        Parameters
+        --------
+        fullpath : str
+            directory of the dataset
+        kind : str
+            'senti' or 'senti_sample'
+        meta : dictionary
+            contents of meta.json of the dataset, or None to read it
+
+        Returns
+        --------
+        (values, offsets) : Tuple
+            np.ndarray of every score and np.ndarray of the index of the first
+            score of each interval, followed by the number of scores
+
+        Raises
+        --------
+
+        """
+
+        if meta is None:
+            meta = self._read_meta(fullpath)
+        values = self._load_column(fullpath, meta, kind + "_values",
+                                   np.float64)
+        offsets = self._load_column(fullpath, meta, kind + "_offsets",
+                                    np.int64)
+        return values, offsets
+
+    def _load_tweets(self, fullpath, meta, kind):
+        tweet_offsets = self._load_column(fullpath, meta, kind + "_offsets",
+                                          np.int64)
+        interval_offsets = self._load_column(fullpath, meta,
+                                             kind + "_intervals", np.int64)
+        blob = b""
+        if tweet_offsets[-1] > 0:
+            blob = np.memmap(os.path.join(fullpath, kind + ".bin"),
+                             dtype=np.uint8,
+                             mode="r",
+                             shape=(int(tweet_offsets[-1]), ))
+        return TweetColumn(blob, tweet_offsets, interval_offsets)
+
+    def load_lists(self, json_max, interval_len):
+        """
+        Memory-maps the columnar dataset with matching parameters
+
+        Parameters
+        --------
+        json_max : int
+            number of tweets collected per interval
+        interval_len : int
+            number of minutes per interval
+
+        Returns
+        --------
+        (sentiment_list,tweet_list,sentiment_sample, tweet_sample, totaltime) : Tuple
+            Scores of each interval as read-only array views, tweets of each
+            interval as TweetColumn objects and the total time (int) in
+            minutes that the dataset contains data over
+
+        Raises
+        --------
+        FileNotFoundError
+            if no columnar dataset with matching parameters exists
+        """
+
+        fullpath = self._dataset_path(json_max, interval_len)
+        meta = self._read_meta(fullpath)
+        if meta is None:
+            raise FileNotFoundError(
+                f"No columnar dataset found for {json_max} tweets per {interval_len} minutes"
+            )
+
+        score_lists = []
+        for kind in SCORE_KINDS:
+            values, offsets = self.load_scores(fullpath, kind, meta)
+            score_lists.append([
+                values[offsets[i]:offsets[i + 1]]
+                for i in range(len(offsets) - 1)
+            ])
+        tweet_lists = [
+            self._load_tweets(fullpath, meta, kind) for kind in TWEET_KINDS
+        ]
+
+        totaltime = int((_parse_date(meta["end"]) - _parse_date(meta["start"]))
+                        / dt.timedelta(minutes=1))
+
+        return (score_lists[0], tweet_lists[0], score_lists[1], tweet_lists[1],
+                totaltime)
+
+
+def _date_name(datestr):
+    #dates are stored in the same month.day.year format used by the csv filenames
+    return datestr.replace("/", ".").replace(":", ".")
+
+
+def _parse_date(datestr):
+    date_s = datestr.split(".")
+    date = dt.date(int(date_s[2]) + 2000, int(date_s[0]), int(date_s[1]))
+    return dt.datetime.combine(date, dt.time(tzinfo=dt.timezone.utc))
@@ -0,0 +1,138 @@
+import math
+import numpy as np
+
+#number of points drawn per line unless another target is requested
+DEFAULT_POINTS = 1000
+
+
+def lttb(x, y, threshold):
+    """
+    Selects the points of a line that best preserve its shape with the
+    Largest-Triangle-Three-Buckets algorithm. The first and last points are
+    always kept, and from every bucket in between the point that forms the
+    largest triangle with the previously selected point and the average of
+    the next bucket is kept, so peaks and troughs remain visible.
+
+    Parameters
+    --------
+    x : np.ndarray
+        x coordinate of each point
+    y : np.ndarray
+        y coordinate of each point
+    threshold : int
+        number of points to keep
+
+    Returns
+    --------
+    indices : np.ndarray
+        indices of the kept points, in increasing order
+
+    Raises
+    --------
+
+    """
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    #points between the first and last are split into threshold - 2 buckets
+    every = (n - 2) / (threshold - 2)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    a = 0
+    for i in range(threshold - 2):
+        start = int(math.floor(i * every)) + 1
+        end = int(math.floor((i + 1) * every)) + 1
+        next_end = min(int(math.floor((i + 2) * every)) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) -
+                      (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    indices[-1] = n - 1
+
+    return indices
+
+
+def minmax(x, y, threshold):
+    """
+    Selects the lowest and highest point of each of threshold / 2 equal
+    buckets of a line, so that every peak and trough is kept
+
+    Parameters
+    --------
+    x : np.ndarray
+        x coordinate of each point, unused as the buckets are equally sized
+    y : np.ndarray
+        y coordinate of each point
+    threshold : int
+        number of points to keep
+
+    Returns
+    --------
+    indices : np.ndarray
+        indices of the kept points, in increasing order
+
+    Raises
+    --------
+
+    """
+
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    buckets = threshold // 2
+    if threshold >= n or buckets < 1:
+        return np.arange(n)
+
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    lows = [start + int(np.argmin(y[start:end]))
+            for start, end in zip(edges[:-1], edges[1:])]
+    highs = [start + int(np.argmax(y[start:end]))
+             for start, end in zip(edges[:-1], edges[1:])]
+    return np.unique(np.concatenate((lows, highs)))
+
+
+#downsampling methods that can be selected by name
+METHODS = {"lttb": lttb, "minmax": minmax}
+
+
+def downsample(x, y, threshold=DEFAULT_POINTS, method="lttb"):
+    """
+    Reduces a line to at most threshold points for plotting, returning it
+    unchanged if it is already short enough
+
+    Parameters
+    --------
+    x : list of floats
+        x coordinate of each point
+    y : list of floats
+        y coordinate of each point
+    threshold : int
+        number of points to keep, or None to keep every point
+    method : str
+        'lttb' or 'minmax'
+
+    Returns
+    --------
+    (x, y) : Tuple
+        np.ndarray of the kept x and y coordinates
+
+    Raises
+    --------
+    ValueError
+        if no downsampling method with the given name exists
+    """
+
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method ({method}) requested")
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if threshold is None or len(x) <= threshold:
+        return x, y
+    indices = METHODS[method](x, y, threshold)
+    return x[indices], y[indices]
@@ -0,0 +1,156 @@
+import os
+import re
+import json
+
+#name of the index file within the storedqueries directory
+MANIFEST_NAME = "manifest.json"
+
+#csv dataset filenames, e.g. tweet_7.1.22_7.3.22_10_240_sample.csv or archivedsenti_7.1.22_7.3.22_10_240_.csv
+FILENAME_REGEX = re.compile(
+    r"^((?:archived)?(?:tweet|senti))_([^_]+)_([^_]+)_(\d+)_(\d+)_(sample)?\.csv$")
+
+
+def _key(prefix, json_max, interval_len, has_sample):
+    return "|".join(
+        (prefix, str(json_max), str(interval_len), str(int(has_sample))))
+
+
+class Manifest:
+    """
+    Index of the datasets in the storedqueries directory, so that a
+    dataset is found with one dictionary lookup instead of scanning and
+    splitting every filename. Datasets of the columnar and sqlite backends
+    are indexed the same way, together with the name of their backend. The
+    index is rebuilt from the csv filenames in the directory once if it does
+    not exist yet, and is replaced atomically whenever it is saved.
+
+    Parameters
+    --------
+    mypath : str
+        storedqueries directory that datasets are stored in
+
+    Attributes
+    --------
+    filepath : str
+        path to the json file that stores the index
+    entries : dictionary
+        maps a (prefix, json_max, interval_len, sample flag) key to a
+        dictionary with the 'file', 'start', 'end' and storage 'backend' of
+        that dataset, and the keyword 'query' of datasets that are stored
+        with the intervals of other queries
+
+    Methods
+    --------
+    lookup(prefix, json_max, interval_len, has_sample)
+        returns the entry of a dataset, or None
+    record(prefix, json_max, interval_len, has_sample, filename, start, end,
+           backend="csv", query=None)
+        adds or replaces the entry of a dataset
+    remove(prefix, json_max, interval_len, has_sample)
+        removes the entry of a dataset
+    datasets(prefix, backend=None)
+        returns the (json_max, interval_len) of every dataset with a prefix,
+        optionally only of the datasets stored with one backend
+    rebuild()
+        recreates the index from the files in the directory
+    save()
+        atomically writes the index to disk
+    """
+
+    def __init__(self, mypath):
+        self.mypath = mypath
+        self.filepath = os.path.join(mypath, MANIFEST_NAME)
+        self.entries = {}
+        if os.path.exists(self.filepath):
+            with open(self.filepath, "r", encoding="utf-8") as manifestfile:
+                self.entries = json.load(manifestfile)["entries"]
+        else:
+            #datasets stored before the index existed are picked up once
+            self.rebuild()
+            self.save()
+
+    def lookup(self, prefix, json_max, interval_len, has_sample):
+        return self.entries.get(
+            _key(prefix, json_max, interval_len, has_sample))
+
+    def record(self,
+               prefix,
+               json_max,
+               interval_len,
+               has_sample,
+               filename,
+               start,
+               end,
+               backend="csv",
+               query=None):
+        entry = {
+            "file": filename,
+            "start": start,
+            "end": end,
+            "backend": backend
+        }
+        if query is not None:
+            entry["query"] = query
+        self.entries[_key(prefix, json_max, interval_len, has_sample)] = entry
+
+    def remove(self, prefix, json_max, interval_len, has_sample):
+        self.entries.pop(_key(prefix, json_max, interval_len, has_sample),
+                         None)
+
+    def datasets(self, prefix, backend=None):
+        params = set()
+        for key, entry in self.entries.items():
+            key_prefix, json_max, interval_len, _ = key.split("|")
+            if key_prefix == prefix and (backend is None or entry.get(
+                    "backend", "csv") == backend):
+                params.add((int(json_max), int(interval_len)))
+        return sorted(params)
+
+    def rebuild(self):
+        """
+        Recreates the index from the csv dataset filenames in the directory.
+        Files that do not follow the dataset naming convention are ignored.
+
+        Parameters
+        --------
+
+        Returns
+        --------
+        None
+
+        Raises
+        --------
+
+        """
+
+        self.entries = {}
+        for file in sorted(os.listdir(self.mypath)):
+            match = FILENAME_REGEX.match(file)
+            if match is None or not os.path.isfile(
+                    os.path.join(self.mypath, file)):
+                continue
+            prefix, start, end, json_max, interval_len, sample = match.groups()
+            self.record(prefix, int(json_max), int(interval_len),
+                        sample is not None, file, start, end)
+
+    def save(self):
+        """
+        Writes the index to disk, replacing the previous file in one step so
+        that readers never see a partially written index
+
+        Parameters
+        --------
+
+        Returns
+        --------
+        None
+
+        Raises
+        --------
+
+        """
+
+        tmp_path = self.filepath + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as manifestfile:
+            json.dump({"entries": self.entries}, manifestfile, indent=1)
+        os.replace(tmp_path, self.filepath)
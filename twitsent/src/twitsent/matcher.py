@@ -0,0 +1,243 @@
+import re
+import twitsent.twitterquery as tq
+
+#a character that continues a word, so a term followed by it is part of a longer word
+WORD_CHAR = re.compile(r"\w")
+
+
+def rule_terms(keywords_ops):
+    """
+    Splits each sublist of a rule into the terms that the query created by
+    make_query searches for. A term without '-' is quoted by make_query and
+    searched for as an exact phrase, any other term is passed on unquoted,
+    so each of its words is a keyword, or a negated keyword if it starts
+    with '-'.
+
+    Parameters
+    --------
+    keywords_ops : list of lists
+        rule in the format accepted by make_query
+
+    Returns
+    --------
+     : list of tuples
+        the phrases that a tweet must contain and the phrases that it must
+        not contain to match each sublist
+
+    Raises
+    --------
+
+    """
+
+    clauses = []
+    for possible_match in tq.normalize_rule(keywords_ops):
+        required = []
+        forbidden = []
+        for partial_match in possible_match:
+            #twitter matches phrases regardless of case and of the whitespace between their words
+            if not "-" in partial_match:
+                required.append(" ".join(partial_match.lower().split()))
+                continue
+            for word in partial_match.lower().split():
+                if word.startswith("-"):
+                    if word[1:]:
+                        forbidden.append(word[1:])
+                else:
+                    required.append(word)
+        clauses.append((required, forbidden))
+    return clauses
+
+
+class Matcher:
+    """
+    Compiled form of one or more rules, which checks tweet text against
+    every rule with a single scan of the text. Every phrase of the rules is
+    an alternative of one regular expression that finds each position a
+    phrase starts at, preferring the longest phrase there. The shorter
+    phrases that also start there are prefixes of it, so each phrase records
+    the phrases it implies, and the sublists of each rule are evaluated as
+    bitmasks of the phrases found.
+
+    Phrases are matched as whole words, so the text is expected to be raw
+    tweet text. Cleaned text has lost its punctuation and digits, so
+    phrases such as hashtags are not found in it.
+
+    Parameters
+    --------
+    rules : dictionary
+        maps the name of each rule to the rule, in the format accepted by
+        make_query
+    lang : list
+        language abbreviations a tweet must be written in to match, with an
+        empty list or None representing all languages. Abbreviations that
+        make_query does not accept are ignored, the same way make_query
+        ignores them.
+
+    Attributes
+    --------
+    rule_names : list
+        names of the rules, in the order they were given
+    phrases : list of str
+        every distinct phrase of the rules, longest first
+    langs : set of str
+        language abbreviations a tweet must be written in, empty for all
+        languages
+
+    Methods
+    --------
+    found(text)
+        returns the bitmask of the phrases found in a text
+    names(text, tweet_lang=None)
+        returns the names of the rules a tweet matches
+    match(text, tweet_lang=None)
+        returns whether a tweet matches any rule
+    filter(texts, langs=None)
+        returns the texts that match any rule
+    """
+
+    def __init__(self, rules, lang=None):
+        clauses = {name: rule_terms(rule) for name, rule in rules.items()}
+        self.rule_names = list(clauses)
+        phrases = {
+            phrase
+            for rule in clauses.values() for required, forbidden in rule
+            for phrase in required + forbidden
+        }
+        #the regular expression tries alternatives in order, so the longest phrase starting at a position is found
+        self.phrases = sorted(phrases,
+                              key=lambda phrase: (-len(phrase), phrase))
+        bits = {phrase: 1 << i for i, phrase in enumerate(self.phrases)}
+
+        #a phrase found at a position implies every phrase that it starts with and that ends at a word boundary within it
+        self._implied = [0]
+        for phrase in self.phrases:
+            implied = 0
+            for prefix in self.phrases:
+                if phrase.startswith(prefix) and (
+                        len(prefix) == len(phrase)
+                        or not WORD_CHAR.match(phrase[len(prefix)])):
+                    implied |= bits[prefix]
+            self._implied.append(implied)
+
+        alternatives = "|".join(
+            "(" + r"\s+".join(re.escape(word) for word in phrase.split()) +
+            ")" for phrase in self.phrases)
+        self._regex = None
+        if self.phrases:
+            self._regex = re.compile(r"(?<!\w)(?=(?:" + alternatives +
+                                     r")(?!\w))")
+
+        self._rules = []
+        for name, rule in clauses.items():
+            masks = []
+            for required, forbidden in rule:
+                masks.append((sum(bits[phrase] for phrase in set(required)),
+                              sum(bits[phrase] for phrase in set(forbidden))))
+            self._rules.append((name, masks))
+
+        self.langs = {abbr for abbr in lang or [] if abbr in tq.LANGUAGES}
+
+    def found(self, text):
+        if self._regex is None:
+            return 0
+        found = 0
+        for match in self._regex.finditer(text.lower()):
+            found |= self._implied[match.lastindex]
+        return found
+
+    def _accepts(self, tweet_lang):
+        return tweet_lang is None or not self.langs or tweet_lang in self.langs
+
+    def names(self, text, tweet_lang=None):
+        """
+        Returns the names of the rules that a tweet matches
+
+        Parameters
+        --------
+        text : str
+            raw text of the tweet
+        tweet_lang : str
+            language abbreviation of the tweet, or None if it is not known,
+            in which case the language is not checked
+
+        Returns
+        --------
+         : list
+            names of the rules the tweet matches, in the order the rules
+            were given
+
+        Raises
+        --------
+
+        """
+
+        if not self._accepts(tweet_lang):
+            return []
+        found = self.found(text)
+        return [
+            name for name, masks in self._rules
+            if any(found & required == required and not found & forbidden
+                   for required, forbidden in masks)
+        ]
+
+    def match(self, text, tweet_lang=None):
+        if not self._accepts(tweet_lang):
+            return False
+        found = self.found(text)
+        return any(found & required == required and not found & forbidden
+                   for _, masks in self._rules
+                   for required, forbidden in masks)
+
+    def filter(self, texts, langs=None):
+        """
+        Selects the tweets that match any rule, such as the stored or
+        replayed tweets of a data collection
+
+        Parameters
+        --------
+        texts : iterable of strings
+            raw text of each tweet
+        langs : iterable of strings
+            language abbreviation of each tweet, or None if they are not known
+
+        Returns
+        --------
+         : list of strings
+            the texts that match, in the order they were given
+
+        Raises
+        --------
+
+        """
+
+        if langs is None:
+            return [text for text in texts if self.match(text)]
+        return [
+            text for text, tweet_lang in zip(texts, langs)
+            if self.match(text, tweet_lang)
+        ]
+
+
+def compile_rule(keywords_ops, lang=None):
+    """
+    Compiles a rule into a Matcher that selects the tweets the query created
+    by make_query(keywords_ops, lang) would select
+
+    Parameters
+    --------
+    keywords_ops : list of lists
+        rule in the format accepted by make_query
+    lang : list
+        language abbreviations passed to make_query
+
+    Returns
+    --------
+     : Matcher
+        matcher of the rule, which names it None
+
+    Raises
+    --------
+
+    """
+
+    return Matcher({None: keywords_ops}, lang)
@@ -1,14 +1,214 @@
-import nltk
 import re
-from nltk.sentiment import SentimentIntensityAnalyzer
-from nltk.tokenize import word_tokenize
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import twitsent.resources as res
 
-nltk.download('stopwords')
-nltk.download('vader_lexicon')
-nltk.download('punkt')
 
+class SentimentScorer:
+    """
+    Scores the sentiment of cleaned tweet text. The sentiment analysis tool
+    and the stopword set are built once when the scorer is created and reused
+    for every tweet afterwards. NLTK and its resources are only loaded when
+    the first scorer is created, so importing this module stays fast and
+    never touches the network.
+
+    Parameters
+    --------
+    download : boolean
+        whether missing NLTK resources may be downloaded
+
+    Attributes
+    --------
+    sia : SentimentIntensityAnalyzer
+        NLTK Vader sentiment analysis tool
+    tokenize : function
+        NLTK word tokenizer
+    stopwords : frozenset
+        words that are meaningless to sentiment analysis, stored as a set so
+        that each token is filtered in constant time
+
+    Methods
+    --------
+    filter_tokens(text)
+        returns the meaningful words of text joined into one string
+    score(text)
+        returns the compound sentiment score of one tweet
+    score_batch(texts)
+        returns the compound sentiment score of each tweet in a list
+    """
+
+    def __init__(self, download=True):
+        res.ensure_resources(download)
+
+        import nltk
+        from nltk.sentiment import SentimentIntensityAnalyzer
+        from nltk.tokenize import word_tokenize
+
+        #initialize sentiment analysis tool
+        self.sia = SentimentIntensityAnalyzer()
+        self.tokenize = word_tokenize
+        #set of words that are meaningless to sentiment analysis
+        self.stopwords = frozenset(nltk.corpus.stopwords.words("english"))
+
+    def filter_tokens(self, text):
+        """
+        Removes stopwords from the tokens of a tweet
+
+        Parameters
+        --------
+        text : string
+            cleaned tweet text
+
+        Returns
+        --------
+        words : string
+            every meaningful token of text, each followed by a space
+
+        Raises
+        --------
+
+        """
+
+        stopwords = self.stopwords
+        words = [w + " " for w in self.tokenize(text) if w not in stopwords]
+        words = "".join(words)
+        return words
+
+    def score(self, text):
+        """
+        Scores the sentiment of one tweet
+
+        Parameters
+        --------
+        text : string
+            cleaned tweet text
+
+        Returns
+        --------
+         : float
+            Vader compound score of the meaningful words in text
+
+        Raises
+        --------
+
+        """
+
+        #use the compound score to represent sentiment score
+        return self.sia.polarity_scores(self.filter_tokens(text))['compound']
+
+    def score_batch(self, texts):
+        """
+        Scores the sentiment of each tweet in a list
 
-def parse(interval_lists):
+        Parameters
+        --------
+        texts : list of strings
+            cleaned tweet text
+
+        Returns
+        --------
+         : list of floats
+            Vader compound score of each tweet in texts
+
+        Raises
+        --------
+
+        """
+
+        polarity_scores = self.sia.polarity_scores
+        filter_tokens = self.filter_tokens
+        return [
+            polarity_scores(filter_tokens(text))['compound'] for text in texts
+        ]
+
+
+#number of tweets sent to a worker process at once by default
+CHUNKSIZE = 64
+
+#scorer shared by every call to parse in this process
+_scorer = None
+#jobs collected at the same time may request the scorer at once, but it is only created once
+_scorer_lock = threading.Lock()
+#pools of scoring processes shared by every call to parse in this process, by number of workers
+_pools = {}
+_pool_lock = threading.Lock()
+
+
+def get_scorer(download=True):
+    """
+    Returns the scorer shared by this process, creating it on first use
+
+    Parameters
+    --------
+    download : boolean
+        whether missing NLTK resources may be downloaded when the scorer is
+        created
+
+    Returns
+    --------
+    _scorer : SentimentScorer
+        scorer shared by every call to parse in this process
+
+    Raises
+    --------
+
+    """
+
+    global _scorer
+    with _scorer_lock:
+        if _scorer is None:
+            _scorer = SentimentScorer(download)
+    return _scorer
+
+
+def get_pool(workers):
+    """
+    Returns the pool of scoring processes shared by this process, starting
+    it on first use. The NLTK resources are downloaded here once, before any
+    worker starts, so that the workers only load them.
+
+    Parameters
+    --------
+    workers : int
+        number of processes in the pool
+
+    Returns
+    --------
+     : ProcessPoolExecutor
+        pool whose workers each hold their own scorer
+
+    Raises
+    --------
+    res.MissingResourceError
+        if a resource is missing and could not be downloaded
+    """
+
+    with _pool_lock:
+        if workers not in _pools:
+            res.ensure_resources(download=True)
+            _pools[workers] = ProcessPoolExecutor(max_workers=workers,
+                                                  initializer=_init_worker)
+        return _pools[workers]
+
+
+def _init_worker():
+    """
+    Loads the sentiment analysis tool once per worker process of the pool
+    used by parse
+    """
+
+    get_scorer(download=False)
+
+
+def _score_chunk(texts):
+    """
+    Scores a chunk of tweets inside a worker process of the pool used by parse
+    """
+
+    return get_scorer().score_batch(texts)
+
+
+def parse(interval_lists, workers=None, chunksize=CHUNKSIZE):
     """
     Sentiment is parsed from collected tweet text and converted to a score
 
@@ -16,42 +216,82 @@ def parse(interval_lists):
     --------
     interval_lists : list of lists
         Cleaned tweet text grouped by the time interval of data collection
-        
+    workers : int
+        number of processes that score tweets in parallel, tweets are scored
+        in this process if None or 1. The pool is kept for later calls with
+        the same number of workers.
+    chunksize : int
+        number of tweets sent to a worker process at once
+
     Returns
     --------
     all_sentiment : list of lists
         Sentiment score data for each tweet in interval_lists, grouped
         correspondingly by time interval
-        
+
     Raises
     --------
-    
+
+    """
+
+    if workers is not None and workers > 1:
+        return _parse_parallel(interval_lists, workers, chunksize)
+
+    scorer = get_scorer()
+
+    #score each interval as one batch so that the output mimics the interval_lists fed as input to this method
+    all_sentiment = [scorer.score_batch(interval) for interval in interval_lists]
+
+    return all_sentiment
+
+
+def _parse_parallel(interval_lists, workers, chunksize):
     """
+    Scores the tweets of every interval across the shared pool of processes,
+    each of which loads its own sentiment analysis tool, then regroups the
+    scores by interval
+
+    Parameters
+    --------
+    interval_lists : list of lists
+        Cleaned tweet text grouped by the time interval of data collection
+    workers : int
+        number of processes that score tweets in parallel
+    chunksize : int
+        number of tweets sent to a worker process at once
+
+    Returns
+    --------
+    all_sentiment : list of lists
+        Sentiment score data for each tweet in interval_lists, grouped
+        correspondingly by time interval
+
+    Raises
+    --------
 
-    #initialize sentiment analysis tool
-    sia = SentimentIntensityAnalyzer()
-    #create lists to store sentiment analysis scores in a format that mimics the interval_lists fed as input to this method
-    sent_list = []  #temp sublist of all_sentiment
-    all_sentiment = []  #this list is returned
+    """
 
-    #list of words that are meaningless to sentiment analysis
-    stopwords = nltk.corpus.stopwords.words("english")
+    #tweets are flattened so that chunks are balanced regardless of how many tweets each interval holds
+    tweets = [tweet for interval in interval_lists for tweet in interval]
+    chunks = [
+        tweets[start:start + chunksize]
+        for start in range(0, len(tweets), chunksize)
+    ]
+    scores = [
+        score for chunk_scores in get_pool(workers).map(_score_chunk, chunks)
+        for score in chunk_scores
+    ]
 
-    #use all meaningful words in the strings within interval_lists to parse sentiment and store the sentiment within all_sentiment
+    all_sentiment = []
+    start = 0
     for interval in interval_lists:
-        for tweet in interval:
-            word_tokens = word_tokenize(tweet)
-            words = [w + " " for w in word_tokens if w not in stopwords]
-            words = "".join(words)
-            #use the compound score to represent sentiment score
-            sent_list.append(sia.polarity_scores(words)['compound'])
-        all_sentiment.append(sent_list.copy())
-        sent_list.clear()
+        all_sentiment.append(scores[start:start + len(interval)])
+        start += len(interval)
 
     return all_sentiment
 
 
 '''
-sia vader 
+sia vader
 Hutto, C.J. & Gilbert, E.E. (2014). VADER: A Parsimonious Rule-based Model for Sentiment Analysis of Social Media Text. Eighth International Conference on Weblogs and Social Media (ICWSM-14). Ann Arbor, MI, June 2014.
 '''
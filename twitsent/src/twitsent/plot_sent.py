@@ -1,6 +1,10 @@
-import matplotlib.pyplot as plt
-import math
+import time
+import threading
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import pymannkendall as mk
+import twitsent.ragged as ra
+import twitsent.downsample as ds
 import pickle
 import os
 
@@ -11,7 +15,167 @@ class TwitterAPIArgumentError(Exception):
         super().__init__(message)
 
 
-def sent_line(sent_array, sent_array_neu, totaltime, interval_len):
+class ChartRenderer:
+    """
+    Renders sentiment line-graphs headlessly with the Agg canvas and the
+    object-oriented matplotlib API, independent of the default backend and
+    pyplot's global state. The figure, axes, lines and labels are created
+    once and only their data is replaced for each chart, so many charts can
+    be rendered in one process without building a new figure each time.
+
+    Parameters
+    --------
+    figsize : Tuple
+        width and height of each chart in inches
+    dpi : int
+        resolution of the saved png files
+
+    Attributes
+    --------
+    fig : Figure
+        figure template reused by every chart
+    render_times : list of floats
+        seconds taken to render each chart
+
+    Methods
+    --------
+    render(time_list, sent_array, sent_array_neu, stat_string, filepath, max_points, method)
+        draws one chart and saves it as a png. Charts of jobs that finish at
+        the same time are rendered one after another.
+    """
+
+    def __init__(self, figsize=(8, 6), dpi=100):
+        self.dpi = dpi
+        self.fig = Figure(figsize=figsize)
+        FigureCanvasAgg(self.fig)
+        #leave room below the axes for the trend annotation, so the layout does not have to be measured on every save
+        self.fig.subplots_adjust(bottom=0.25, right=0.95)
+        self.ax = self.fig.add_subplot()
+
+        #entries in the sent_array list are in reverse chronological order
+        self.ax.invert_xaxis()
+        self.keyword_line, = self.ax.plot([], [],
+                                          color='blue',
+                                          marker='o',
+                                          label="Search Term Sentiment")
+        self.baseline_line, = self.ax.plot([], [],
+                                           color='red',
+                                           marker='o',
+                                           label="Baseline Tweet Sentiment")
+        self.ax.legend()
+        self.ax.set_title('Sentiment Over Time', pad=20, fontsize=24)
+        self.ax.set_xlabel('Minutes Ago', fontsize=14)
+        self.ax.set_ylabel('Average Sentiment', fontsize=14)
+        self.ax.grid(True)
+        self.ax.set_ylim((-1, 1))
+        self.annotation = self.ax.annotate("",
+                                           xy=(0, -.2),
+                                           fontsize=10,
+                                           xycoords='axes fraction',
+                                           ha='left',
+                                           va='top')
+        self.render_times = []
+        self._lock = threading.Lock()
+
+    def render(self,
+               time_list,
+               sent_array,
+               sent_array_neu,
+               stat_string,
+               filepath,
+               max_points=ds.DEFAULT_POINTS,
+               method="lttb"):
+        """
+        Draws one chart on the figure template and saves it as a png
+
+        Parameters
+        --------
+        time_list : list of floats
+            minutes elapsed at each interval
+        sent_array : list of floats
+            Sentiment scores of tweets containing keywords being analyzed
+        sent_array_neu : list of floats
+            Sentiment scores of random tweets being analyzed
+        stat_string : str
+            description of the trend shown below the chart
+        filepath : str
+            path of the png file to save
+        max_points : int
+            number of points each line is downsampled to before drawing, or
+            None to draw every point
+        method : str
+            downsampling method, 'lttb' or 'minmax'
+
+        Returns
+        --------
+        elapsed : float
+            seconds taken to render and save the chart
+
+        Raises
+        --------
+
+        """
+
+        #the figure template can only hold one chart at a time
+        with self._lock:
+            start = time.perf_counter()
+            for line, sentiment in ((self.keyword_line, sent_array),
+                                    (self.baseline_line, sent_array_neu)):
+                #long timeseries are reduced to the points that preserve their shape, so render time and file size do not grow with history
+                x, y = ds.downsample(time_list, sentiment, max_points, method)
+                line.set_data(x, y)
+                #markers are only drawn when every interval is shown
+                line.set_marker('o' if len(x) == len(time_list) else 'None')
+            self.annotation.set_text(stat_string)
+            #only the x axis depends on the data, the sentiment axis always spans -1 to 1
+            self.ax.relim()
+            self.ax.autoscale_view(scaley=False)
+            self.fig.savefig(filepath, dpi=self.dpi)
+            elapsed = time.perf_counter() - start
+            self.render_times.append(elapsed)
+        print(f"Rendered {os.path.basename(filepath)} in {elapsed:.3f} seconds")
+        return elapsed
+
+
+#figure template shared by every chart rendered in this process
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def get_renderer():
+    """
+    Returns the chart renderer shared by every chart rendered in this
+    process, creating it on first use
+
+    Parameters
+    --------
+
+    Returns
+    --------
+     : ChartRenderer
+        shared chart renderer
+
+    Raises
+    --------
+
+    """
+
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = ChartRenderer()
+    return _renderer
+
+
+def sent_line(sent_array,
+              sent_array_neu,
+              totaltime,
+              interval_len,
+              trend=None,
+              filepath=None,
+              renderer=None,
+              max_points=ds.DEFAULT_POINTS,
+              method="lttb"):
     """
     Given a list containing sentiment scores collected at specific intervals,
     this method draws a line-graph and tests for trends in the data, then saves
@@ -27,6 +191,19 @@ def sent_line(sent_array, sent_array_neu, totaltime, interval_len):
         time in minutes that data is collected for
     interval_len : int
         length of each interval that data is collected within
+    trend : tr.TrendState
+        if given, incremental trend test state of sent_array that is used
+        instead of testing the whole timeseries again
+    filepath : str
+        path of the png file to save, or None for
+        sentiment_comparisongraph.png beside this file
+    renderer : ChartRenderer
+        renderer to draw the chart with, or None for the shared renderer
+    max_points : int
+        number of points each line is downsampled to before drawing, or None
+        to draw every interval
+    method : str
+        downsampling method, 'lttb' or 'minmax'
 
     --------
     Return
@@ -45,26 +222,22 @@ def sent_line(sent_array, sent_array_neu, totaltime, interval_len):
         raise TwitterAPIArgumentError(
             f"Invalid duration of search ({totaltime}) received. Ensure that start date and end date arguments of data collection are sequential."
         )
-    time_list = [
-    ]  #list of cumulative times elapsed since start time for each interval, in minutes
     is_sig = ""
-    num_intervals = math.ceil(totaltime / interval_len)
-    time_elapsed = 0
     try:
         #calculate statistical significance of timeseries data without the assumption of gaussian distribution
-        stat_sig = mk.original_test(sent_array, alpha=.05)
+        if trend is not None:
+            stat_sig = trend.test(alpha=.05)
+        else:
+            stat_sig = mk.original_test(sent_array, alpha=.05)
     except ZeroDivisionError:
         print(
             "Time intervals of data collection exceed duration of data collection"
         )
 
-    #create x axis timeseries data for graphing, each datapoint spaced interval_len apart
-    for i in range(num_intervals):
-        #make sure that a smaller interval at the end(assuming total time isn't divided evenly by interval_len) isn't allotted the max interval_len
-        time_list.append(min(time_elapsed, totaltime))
-        time_elapsed += interval_len
+    #create x axis timeseries data for graphing, each datapoint spaced interval_len apart, making sure that a smaller interval at the end(assuming total time isn't divided evenly by interval_len) isn't allotted the max interval_len
+    time_list = ra.time_axis(totaltime, interval_len)
 
-    if stat_sig[1] is True:
+    if stat_sig[1]:
         is_sig = 'statistically signicant'
     else:
         is_sig = 'statistically insignicant'
@@ -77,36 +250,14 @@ def sent_line(sent_array, sent_array_neu, totaltime, interval_len):
     ) + ' is ' + is_sig + '. The p-value of this particular \ntimeseries using the Mann-Kendall test is ' + str(
         round(stat_sig[2], 2)) + '.'
 
-    #plt.figure(figsize=(8,6))
-    fig, ax = plt.subplots(figsize=(8, 6))
-    #entries in the sent_array list are in reverse chronological order
-    ax.invert_xaxis()
-    plt.gcf().subplots_adjust(bottom=0.2)
-    plt.plot(time_list,
-             sent_array,
-             color='blue',
-             marker='o',
-             label="Search Term Sentiment")
-    plt.plot(time_list,
-             sent_array_neu,
-             color='red',
-             marker='o',
-             label="Baseline Tweet Sentiment")
-    plt.legend()
-    plt.title('Sentiment Over Time', pad=20, fontsize=24)
-    plt.xlabel('Minutes Ago', fontsize=14)
-    plt.ylabel('Average Sentiment', fontsize=14)
-    plt.grid(True)
-    plt.ylim((-1, 1))
-    plt.annotate(stat_string,
-                 xy=(0, -.2),
-                 fontsize=10,
-                 xycoords='axes fraction',
-                 ha='left')
-    #get path to parent directory of this file
-    rel_path = os.path.dirname(os.path.realpath(__file__))
-    plt.savefig(os.path.join(rel_path, 'sentiment_comparisongraph.png'),
-                bbox_inches='tight')
+    if filepath is None:
+        #get path to parent directory of this file
+        rel_path = os.path.dirname(os.path.realpath(__file__))
+        filepath = os.path.join(rel_path, 'sentiment_comparisongraph.png')
+
+    renderer = renderer if renderer is not None else get_renderer()
+    renderer.render(time_list, sent_array, sent_array_neu, stat_string,
+                    filepath, max_points, method)
 
 
 '''
@@ -0,0 +1,332 @@
+import threading
+import collections
+import datetime as dt
+from concurrent.futures import Future
+import twitsent.twitterquery as tq
+import twitsent.clean_tweets as ct
+import twitsent.matcher as mt
+
+
+def demultiplex(tweets, matcher):
+    """
+    Assigns each tweet returned by a combined query to the rules it matches
+
+    Parameters
+    --------
+    tweets : list of dictionaries
+        tweets as returned by the Twitter Search API v2, with their raw 'text'
+    matcher : mt.Matcher
+        compiled rules of the searches served by the query
+
+    Returns
+    --------
+    found : dictionary
+        maps the name of each rule to the tweets that match it, in the order
+        they were given
+
+    Raises
+    --------
+
+    """
+
+    found = {name: [] for name in matcher.rule_names}
+    for tweet_inst in tweets:
+        for name in matcher.names(tweet_inst["text"], tweet_inst.get("lang")):
+            found[name].append(tweet_inst)
+    return found
+
+
+def plan_queries(rules, lang, limit):
+    """
+    Packs rules into as few combined queries as fit within the query length
+    limit. Sublists shared by several rules are searched for once, and each
+    rule is added to the query that grows the least by it, so rules that
+    overlap are combined with each other. A rule whose query is too long on
+    its own is divided by tq.split_rule, so that it is served by several
+    queries.
+
+    Parameters
+    --------
+    rules : dictionary
+        maps the name of each rule to the rule
+    lang : list
+        language abbreviations passed to make_query
+    limit : int
+        max length of a query string, see tq.QUERY_LIMITS
+
+    Returns
+    --------
+     : list of tuples
+        query_params of each combined query and a dictionary that maps the
+        name of each rule it serves to the part of the rule it searches for
+
+    Raises
+    --------
+    tq.QueryLengthError
+        if a sublist of a rule does not fit within the limit on its own
+
+    """
+
+    pieces = [(name, piece) for name, rule in rules.items()
+              for piece in tq.split_rule(rule, lang, limit)]
+
+    def length(keywords_ops):
+        return len(tq.make_query(keywords_ops, lang)['query'])
+
+    #the longest rules are placed first, while every query still has room for them
+    groups = []
+    for name, piece in sorted(pieces, key=lambda item: -length(item[1])):
+        best = None
+        for group in groups:
+            sublists = group["sublists"] + [
+                sublist for sublist in piece
+                if sublist not in group["sublists"]
+            ]
+            new_length = length(sublists)
+            growth = new_length - group["length"]
+            if new_length <= limit and (best is None or growth < best[0]):
+                best = (growth, group, sublists, new_length)
+        if best is None:
+            groups.append({
+                "sublists": list(piece),
+                "length": length(piece),
+                "rules": {
+                    name: piece
+                }
+            })
+            continue
+        _, group, group["sublists"], group["length"] = best
+        #pieces of one rule that end up in the same query are searched for together
+        group["rules"][name] = group["rules"].get(name, []) + piece
+
+    return [(tq.make_query(group["sublists"], lang), group["rules"])
+            for group in groups]
+
+
+class CombinedQuery:
+    """
+    Collects the intervals of several keyword searches with one combined
+    query. Each page returned is split between the searches by their rules
+    before the tweets are cleaned, and an interval is paged through until
+    every search has json_max tweets, the interval runs out of tweets, or as
+    many tweets were retrieved as the searches would have retrieved on their
+    own. Each search receives the most recent matching tweets of the
+    interval, which are the tweets its own query would have returned.
+    Searches that are divided between several queries merge the tweets of
+    each, see plan_sources. A query that serves only one search, such as a
+    part of a divided rule, gives that search every tweet it returns without
+    checking them against the rule. Pagination within an interval is not
+    checkpointed, since the pages are shared by jobs with checkpoints of
+    their own, so an interrupted interval is requested again from its first
+    page. Intervals that were already stored are not requested again.
+
+    Parameters
+    --------
+    query_params : dictionary
+        combined query created by plan_queries
+    rules : dictionary
+        maps the name of each search served by the query to its rule
+    json_max : int
+        max number of tweets stored per time interval for each search
+    interval_len : int
+        length of each time interval in minutes
+    request : function
+        sends the request parameters to the Twitter Search API v2 and returns
+        the json response
+
+    Attributes
+    --------
+    intervals : dictionary
+        maps the isoformat end time of each interval that was requested to a
+        Future of the tweets of each search that has not taken them yet
+
+    Methods
+    --------
+    fetch(interval_end)
+        returns the tweets of every search for an interval, retrieving it
+        only once
+    take(name, interval_end)
+        returns the tweets of one search for an interval
+    """
+
+    def __init__(self, query_params, rules, json_max, interval_len, request):
+        self.query_params = query_params
+        self.rules = rules
+        self.json_max = json_max
+        self.interval_len = interval_len
+        self.request = request
+        #the rules are compiled once and every tweet is checked against all of them in one scan
+        self.matcher = mt.Matcher(rules) if len(rules) > 1 else None
+        self.intervals = {}
+        self._lock = threading.Lock()
+
+    def fetch(self, interval_end):
+        """
+        Returns the tweets of every search for an interval. Searches that
+        need the interval at the same time share one retrieval.
+
+        Parameters
+        --------
+        interval_end : dt.datetime
+            end time of the interval
+
+        Returns
+        --------
+         : dictionary
+            maps the name of each search that has not taken its tweets yet to
+            its most recent json_max tweets of the interval, as returned by
+            the Twitter Search API v2
+
+        Raises
+        --------
+        Exception
+            any exception raised by request, in every search waiting for the
+            interval
+
+        """
+
+        key = interval_end.isoformat()
+        with self._lock:
+            future = self.intervals.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self.intervals[key] = future
+        if not owner:
+            return future.result()
+
+        try:
+            tweets = self._retrieve(interval_end)
+        except BaseException as e:
+            #a failed retrieval is tried again by the next search that needs the interval
+            with self._lock:
+                del self.intervals[key]
+            future.set_exception(e)
+            raise
+        future.set_result(tweets)
+        return tweets
+
+    def take(self, name, interval_end):
+        #each search takes its tweets once, and the interval is dropped when no search still needs it
+        tweets = self.fetch(interval_end)
+        with self._lock:
+            json_interval = tweets.pop(name)
+            if not tweets:
+                self.intervals.pop(interval_end.isoformat(), None)
+        return json_interval
+
+    def _retrieve(self, interval_end):
+        query_params = dict(self.query_params)
+        query_params['start_time'] = (
+            interval_end - dt.timedelta(minutes=self.interval_len)).isoformat()
+        query_params['end_time'] = interval_end.isoformat()
+
+        found = {name: [] for name in self.rules}
+        #never retrieve more tweets than the searches would have retrieved with their own queries
+        cap = self.json_max * len(self.rules)
+        retrieved = 0
+        while True:
+            #twitter returns between 10 and 100 tweets per page
+            query_params['max_results'] = max(min(cap - retrieved, 100), 10)
+            json_response = self.request(query_params)
+            page = json_response.get("data", [])
+            retrieved += len(page)
+            if self.matcher is None:
+                pages = {name: page for name in self.rules}
+            else:
+                pages = demultiplex(page, self.matcher)
+            for name, tweets in pages.items():
+                found[name].extend(tweets[:self.json_max - len(found[name])])
+
+            next_token = json_response.get("meta", {}).get("next_token")
+            if (next_token is None or retrieved >= cap
+                    or all(len(tweets) >= self.json_max
+                           for tweets in found.values())):
+                break
+            query_params['next_token'] = next_token
+
+        return found
+
+
+def plan_sources(plans, json_max, interval_len, connect, tweet_budgets=None):
+    """
+    Creates the keyword sources of the searches that share a query with
+    another search or are divided between several queries. Every other
+    search is collected with its own query as usual.
+
+    Parameters
+    --------
+    plans : list of tuples
+        combined queries as returned by plan_queries
+    json_max : int
+        max number of tweets stored per time interval for each search
+    interval_len : int
+        length of each time interval in minutes
+    connect : function
+        called with the query_params and rules of each query that is
+        collected, returns the request function of the query, see
+        CombinedQuery
+    tweet_budgets : dictionary
+        maps the name of a search to the rl.TweetBudget that its tweets are
+        counted against
+
+    Returns
+    --------
+    sources : dictionary
+        maps the name of each of these searches to the keyword source passed
+        to create_timeseries as its cache
+
+    Raises
+    --------
+
+    """
+
+    served = collections.Counter(name for _, rules in plans for name in rules)
+    queries = {}
+    for query_params, rules in plans:
+        if len(rules) < 2 and all(served[name] < 2 for name in rules):
+            continue
+        combined = CombinedQuery(query_params, rules, json_max, interval_len,
+                                 connect(query_params, rules))
+        for name in rules:
+            queries.setdefault(name, []).append(combined)
+
+    tweet_budgets = tweet_budgets or {}
+    return {
+        name: _Member(combined, name, json_max, tweet_budgets.get(name))
+        for name, combined in queries.items()
+    }
+
+
+class _Member:
+    #supplies the keyword intervals of one search in place of a cache, see create_timeseries
+
+    def __init__(self, queries, name, json_max, tweet_budget=None):
+        self.queries = queries
+        self.name = name
+        self.json_max = json_max
+        self.tweet_budget = tweet_budget
+
+    def tweets(self, interval_end):
+        return None
+
+    def fetch(self, interval_end, retrieve):
+        #the tweets of an interval are counted against the budget before they are retrieved, as in fetch_interval
+        keep = self.json_max
+        if self.tweet_budget is not None:
+            keep = self.tweet_budget.reserve(keep)
+
+        tweets = []
+        for combined in self.queries:
+            tweets.extend(combined.take(self.name, interval_end))
+        if len(self.queries) > 1:
+            #a tweet can match the parts of a search in several queries, and tweet ids increase with the time they were posted
+            unique = {tweet_inst["id"]: tweet_inst for tweet_inst in tweets}
+            tweets = sorted(unique.values(),
+                            key=lambda tweet_inst: int(tweet_inst["id"]),
+                            reverse=True)
+        tweets = tweets[:keep]
+
+        if self.tweet_budget is not None:
+            self.tweet_budget.release(keep - len(tweets))
+        return ct.clean_batch([tweet_inst["text"] for tweet_inst in tweets])
@@ -0,0 +1,212 @@
+import math
+import numpy as np
+
+
+def time_axis(totaltime, interval_len):
+    """
+    Calculates the time elapsed since the start of data collection at the
+    beginning of each interval
+
+    Parameters
+    --------
+    totaltime : int
+        time in minutes that data is collected for
+    interval_len : int
+        length of each interval that data is collected within
+
+    Returns
+    --------
+     : np.ndarray
+        minutes elapsed for each interval, spaced interval_len apart. A
+        shorter final interval is capped at totaltime.
+
+    Raises
+    --------
+
+    """
+
+    num_intervals = math.ceil(totaltime / interval_len)
+    return np.minimum(
+        np.arange(num_intervals, dtype=np.int64) * interval_len, totaltime)
+
+
+def _lerp(a, b, t):
+    #same linear interpolation as np.percentile, so that results are identical
+    diff_b_a = b - a
+    return np.where(t >= 0.5, b - diff_b_a * (1 - t), a + diff_b_a * t)
+
+
+class RaggedArray:
+    """
+    Intervals of sentiment scores stored as one flat array of values and
+    the offset of the first value of each interval, so that statistics of
+    every interval are computed with a few vectorized reductions instead of
+    a Python loop over the intervals
+
+    Parameters
+    --------
+    values : np.ndarray
+        every score, one interval after another
+    offsets : np.ndarray
+        index of the first value of each interval within values, followed by
+        the number of values
+
+    Attributes
+    --------
+    values : np.ndarray
+        every score, one interval after another
+    offsets : np.ndarray
+        offsets of each interval within values
+
+    Methods
+    --------
+    from_lists(interval_lists)
+        creates a RaggedArray from a list of intervals
+    counts()
+        number of values in each interval
+    sums(), sumsq()
+        sum and sum of squares of each interval
+    means(), mins(), maxs()
+        mean, min and max of each interval
+    medians(), percentiles(q)
+        median and percentiles q of each interval
+    """
+
+    def __init__(self, values, offsets):
+        self.values = np.asarray(values, dtype=np.float64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+
+    @classmethod
+    def from_lists(cls, interval_lists):
+        counts = np.fromiter((len(interval) for interval in interval_lists),
+                             dtype=np.int64,
+                             count=len(interval_lists))
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        values = np.fromiter(
+            (score for interval in interval_lists for score in interval),
+            dtype=np.float64,
+            count=int(offsets[-1]))
+        return cls(values, offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return self.values[self.offsets[index]:self.offsets[index + 1]]
+
+    def _interval_ids(self):
+        #index of the interval that each value belongs to
+        return np.repeat(np.arange(len(self)), self.counts())
+
+    def counts(self):
+        return np.diff(self.offsets)
+
+    def sums(self):
+        return np.bincount(self._interval_ids(),
+                           weights=self.values[:self.offsets[-1]],
+                           minlength=len(self))
+
+    def sumsq(self):
+        values = self.values[:self.offsets[-1]]
+        return np.bincount(self._interval_ids(),
+                           weights=values * values,
+                           minlength=len(self))
+
+    def means(self, empty=0.0):
+        """
+        Returns the mean of each interval
+
+        Parameters
+        --------
+        empty : float
+            value used as the mean of intervals without values
+
+        Returns
+        --------
+         : np.ndarray
+            mean of each interval
+
+        Raises
+        --------
+
+        """
+
+        counts = self.counts()
+        return np.divide(self.sums(),
+                         counts,
+                         out=np.full(len(self), empty, dtype=np.float64),
+                         where=counts != 0)
+
+    def _reduce(self, ufunc):
+        #empty intervals contain no values, so each reduction of a non-empty interval ends where the next non-empty interval starts
+        result = np.full(len(self), np.nan)
+        nonempty = self.counts() > 0
+        if nonempty.any():
+            result[nonempty] = ufunc.reduceat(self.values[:self.offsets[-1]],
+                                              self.offsets[:-1][nonempty])
+        return result
+
+    def mins(self):
+        return self._reduce(np.minimum)
+
+    def maxs(self):
+        return self._reduce(np.maximum)
+
+    def _sorted(self):
+        #values sorted within each interval, and the position of the first value of each interval among them
+        counts = self.counts()
+        values = self.values[:self.offsets[-1]]
+        width = int(counts.max())
+        if len(self) * width <= 4 * len(values):
+            #intervals hold at most json_max scores, so they are padded to one width and sorted row by row, which is much faster than sorting every value by interval
+            padded = np.full((len(self), width), np.inf)
+            positions = np.arange(len(values)) - np.repeat(
+                self.offsets[:-1], counts)
+            padded[self._interval_ids(), positions] = values
+            padded.sort(axis=1)
+            return padded.ravel(), np.arange(len(self)) * width
+        order = np.lexsort((values, self._interval_ids()))
+        return values[order], self.offsets[:-1]
+
+    def percentiles(self, q):
+        """
+        Returns percentiles of each interval, interpolated linearly the same
+        way as np.percentile. The values are sorted once, however many
+        percentiles are requested, see _sorted.
+
+        Parameters
+        --------
+        q : float or list of floats
+            percentiles between 0 and 100
+
+        Returns
+        --------
+         : np.ndarray
+            percentile of each interval, or one row per percentile if q is a
+            list, nan for intervals without values
+
+        Raises
+        --------
+
+        """
+
+        qs = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        counts = self.counts()
+        nonempty = counts > 0
+        result = np.full((len(qs), len(self)), np.nan)
+        if nonempty.any():
+            ordered, starts = self._sorted()
+            starts = starts[nonempty]
+            last = counts[nonempty] - 1
+            for row, percentile in enumerate(qs):
+                position = last * (percentile / 100)
+                below = np.floor(position).astype(np.int64)
+                above = np.minimum(below + 1, last)
+                result[row, nonempty] = _lerp(ordered[starts + below],
+                                              ordered[starts + above],
+                                              position - below)
+        return result if np.ndim(q) else result[0]
+
+    def medians(self):
+        return self.percentiles(50)
@@ -0,0 +1,383 @@
+import threading
+import time
+
+#length in seconds of the Twitter Search API v2 rate limit window
+WINDOW = 900
+
+#number of requests allowed per window for recent ('n') and full archive ('y') search
+WINDOW_LIMITS = {'n': 450, 'y': 300}
+
+#minimum number of seconds between requests, full archive search is limited to 1 request per second
+MIN_INTERVALS = {'n': 0, 'y': 1}
+
+
+class BudgetExceededError(Exception):
+
+    def __init__(self, message):
+        super().__init__(message)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket that paces requests to a single Twitter API
+    endpoint. Tokens refill continuously at the endpoint's window rate, and the
+    rate limit headers returned by the API take precedence over the local
+    estimate whenever they are received.
+
+    Parameters
+    --------
+    capacity : int
+        number of requests allowed per rate limit window
+    window : float
+        length of the rate limit window in seconds
+    min_interval : float
+        minimum number of seconds between two consecutive requests
+
+    Attributes
+    --------
+    tokens : float
+        number of requests that can be sent immediately
+    blocked_until : float
+        monotonic time before which no request may be sent because the API
+        reported an exhausted window
+    reset_at : float
+        monotonic time at which the API reported that the current window
+        resets and the full budget becomes available again
+
+    Methods
+    --------
+    acquire(stream)
+        blocks until a request may be sent, then consumes a token. Tokens are
+        handed to waiting streams in turn so that concurrent collections split
+        the budget in proportion to their priorities
+    set_priority(stream, priority)
+        sets the share of the budget that a stream receives
+    update(headers)
+        synchronizes the bucket with the x-rate-limit headers of a response
+    exhaust(headers)
+        blocks the bucket until the window reported by a 429 response resets
+    """
+
+    def __init__(self, capacity, window=WINDOW, min_interval=0):
+        self.capacity = capacity
+        self.rate = capacity / window
+        self.window = window
+        self.min_interval = min_interval
+        self.tokens = float(capacity)
+        self.blocked_until = 0.0
+        self.reset_at = 0.0
+        self._last_refill = time.monotonic()
+        self._last_grant = -min_interval
+        self._cond = threading.Condition()
+        #number of threads waiting for a token in each stream
+        self._waiting = {}
+        #relative share of the tokens that each stream receives, 1 unless set
+        self.priorities = {}
+        #virtual time of each stream, which advances by 1 / priority for every token it receives. The waiting stream that is furthest behind receives the next token.
+        self._passes = {}
+        self._vtime = 0.0
+
+    def _refill(self, now):
+        #a window reset reported by the API restores the full budget at once
+        if self.reset_at and now >= self.reset_at:
+            self.tokens = float(self.capacity)
+            self.reset_at = 0.0
+        if self.blocked_until and now >= self.blocked_until:
+            self.tokens = float(self.capacity)
+            self.blocked_until = 0.0
+        self.tokens = min(self.capacity,
+                          self.tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def _wait_time(self, now):
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        wait = self._last_grant + self.min_interval - now
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return max(wait, 0)
+
+    def set_priority(self, stream, priority):
+        with self._cond:
+            self.priorities[stream] = priority
+
+    def _next_stream(self):
+        #ties go to the stream that started waiting first, so streams of equal priority take turns
+        return min(self._waiting, key=self._passes.get)
+
+    def acquire(self, stream=None):
+        """
+        Blocks until a request may be sent at the highest legal rate, then
+        consumes one token. When several streams are waiting, tokens are
+        granted to them in turn, with a stream of priority 2 receiving twice
+        as many tokens as a stream of priority 1.
+
+        Parameters
+        --------
+        stream : hashable
+            name of the collection the request belongs to, requests without a
+            name share one stream
+
+        Returns
+        --------
+        None
+
+        Raises
+        --------
+
+        """
+
+        with self._cond:
+            if stream not in self._waiting:
+                #a stream that was idle cannot save up tokens for later, it joins behind the streams that are waiting
+                self._passes[stream] = max(self._passes.get(stream, 0.0),
+                                           self._vtime)
+            self._waiting[stream] = self._waiting.get(stream, 0) + 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    wait = self._wait_time(now)
+                    if wait <= 0 and self._next_stream() == stream:
+                        self.tokens -= 1
+                        self._last_grant = now
+                        #the stream that was just served moves back in line by the inverse of its priority
+                        self._vtime = self._passes[stream]
+                        self._passes[stream] += 1 / self.priorities.get(
+                            stream, 1)
+                        return
+                    self._cond.wait(wait if wait > 0 else None)
+            finally:
+                self._waiting[stream] -= 1
+                if self._waiting[stream] == 0:
+                    del self._waiting[stream]
+                self._cond.notify_all()
+
+    def update(self, headers):
+        """
+        Synchronizes the bucket with the rate limit state reported by the API
+
+        Parameters
+        --------
+        headers : dictionary
+            response headers that may contain x-rate-limit-remaining and
+            x-rate-limit-reset
+
+        Returns
+        --------
+        None
+
+        Raises
+        --------
+
+        """
+
+        remaining = _header_int(headers, "x-rate-limit-remaining")
+        reset = _header_int(headers, "x-rate-limit-reset")
+        with self._cond:
+            self._refill(time.monotonic())
+            if reset is not None:
+                self.reset_at = _reset_monotonic(reset, self.window)
+            if remaining is not None:
+                #other requests may already be in flight, so never raise the local estimate
+                self.tokens = min(self.tokens, remaining)
+                if remaining == 0:
+                    self.blocked_until = _reset_monotonic(reset, self.window)
+            self._cond.notify_all()
+
+    def exhaust(self, headers):
+        """
+        Stops all requests until the window reported by a 429 response resets
+
+        Parameters
+        --------
+        headers : dictionary
+            response headers that may contain x-rate-limit-reset
+
+        Returns
+        --------
+        wait : float
+            number of seconds until requests resume
+
+        Raises
+        --------
+
+        """
+
+        reset = _header_int(headers, "x-rate-limit-reset")
+        with self._cond:
+            self.tokens = 0.0
+            self.blocked_until = _reset_monotonic(reset, self.window)
+            self._cond.notify_all()
+            return self.blocked_until - time.monotonic()
+
+
+class RateLimiter:
+    """
+    Holds one token bucket for each Twitter Search API v2 endpoint
+
+    Parameters
+    --------
+    limits : dictionary
+        maps 'n' (recent search) and 'y' (full archive search) to the number of
+        requests allowed per window
+    min_intervals : dictionary
+        maps each endpoint to the minimum number of seconds between requests
+
+    Attributes
+    --------
+    buckets : dictionary
+        maps each endpoint to its TokenBucket
+
+    Methods
+    --------
+    acquire(acad_access, stream)
+        blocks until a request to the endpoint may be sent, sharing the budget
+        between streams in proportion to their priorities
+    set_priority(stream, priority)
+        sets the share of the budget of every endpoint that a stream receives
+    update(acad_access, headers)
+        synchronizes the endpoint's bucket with a response's headers
+    exhaust(acad_access, headers)
+        blocks the endpoint until its rate limit window resets
+    """
+
+    def __init__(self, limits=WINDOW_LIMITS, min_intervals=MIN_INTERVALS):
+        self.buckets = {
+            acad_access: TokenBucket(limit, WINDOW,
+                                     min_intervals.get(acad_access, 0))
+            for acad_access, limit in limits.items()
+        }
+
+    def bucket(self, acad_access):
+        """
+        Returns the token bucket of the endpoint that a request with the given
+        access level is sent to
+
+        Parameters
+        --------
+        acad_access : string
+            A string 'y'/'n' that represents whether the user has academic acces and wants to perform a full archive search
+
+        Returns
+        --------
+         : TokenBucket
+            bucket of the recent search endpoint for 'n', otherwise of the full
+            archive search endpoint
+
+        Raises
+        --------
+
+        """
+
+        #mirrors the endpoint selection of the client, where anything but 'n' is a full archive search
+        if acad_access == 'n':
+            return self.buckets['n']
+        return self.buckets['y']
+
+    def acquire(self, acad_access, stream=None):
+        self.bucket(acad_access).acquire(stream)
+
+    def set_priority(self, stream, priority):
+        for bucket in self.buckets.values():
+            bucket.set_priority(stream, priority)
+
+    def update(self, acad_access, headers):
+        self.bucket(acad_access).update(headers)
+
+    def exhaust(self, acad_access, headers):
+        return self.bucket(acad_access).exhaust(headers)
+
+
+class TweetBudget:
+    """
+    Thread-safe count of the tweets that a collection may still retrieve,
+    shared by every interval of the collection, so that a query cannot use
+    more than its share of the account's monthly tweet cap
+
+    Parameters
+    --------
+    limit : int
+        number of tweets the collection may retrieve
+
+    Attributes
+    --------
+    limit : int
+        number of tweets the collection may retrieve
+    used : int
+        number of tweets retrieved so far
+
+    Methods
+    --------
+    remaining()
+        returns the number of tweets that may still be retrieved
+    reserve(count)
+        sets aside up to count tweets of the budget for one request
+    release(count)
+        returns tweets that were reserved but not retrieved to the budget
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def remaining(self):
+        with self._lock:
+            return self.limit - self.used
+
+    def reserve(self, count):
+        """
+        Sets aside tweets of the budget before a request is sent, so that
+        requests sent at the same time cannot retrieve more tweets than the
+        budget allows between them
+
+        Parameters
+        --------
+        count : int
+            number of tweets the request would retrieve
+
+        Returns
+        --------
+        granted : int
+            number of tweets the request may keep, at most count
+
+        Raises
+        --------
+        BudgetExceededError
+            if the budget is used up
+
+        """
+
+        with self._lock:
+            granted = min(count, self.limit - self.used)
+            if granted <= 0:
+                raise BudgetExceededError(
+                    f"Tweet budget of {self.limit} tweets was used up")
+            self.used += granted
+            return granted
+
+    def release(self, count):
+        with self._lock:
+            self.used -= count
+
+
+def _header_int(headers, name):
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def _reset_monotonic(reset, window):
+    """
+    Converts the epoch time of an x-rate-limit-reset header into the
+    monotonic clock, assuming a full window if the header is missing
+    """
+
+    if reset is None:
+        return time.monotonic() + window
+    return time.monotonic() + max(reset - time.time(), 0)
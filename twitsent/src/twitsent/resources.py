@@ -0,0 +1,142 @@
+import os
+
+#NLTK resources used for sentiment scoring, mapped to the path that nltk.data.find looks them up by
+RESOURCES = {
+    'stopwords': 'corpora/stopwords',
+    'vader_lexicon': 'sentiment/vader_lexicon.zip',
+    'punkt': 'tokenizers/punkt'
+}
+
+#environment variable that overrides the directory NLTK resources are stored in
+DATA_ENV = "TWITSENT_NLTK_DATA"
+
+
+class MissingResourceError(Exception):
+
+    def __init__(self, message):
+        super().__init__(message)
+
+
+def data_path():
+    """
+    Returns the local directory that NLTK resources are downloaded to and
+    loaded from
+
+    Parameters
+    --------
+
+    Returns
+    --------
+     : str
+        value of the TWITSENT_NLTK_DATA environment variable if it is set,
+        otherwise the nltk_data directory beside this file
+
+    Raises
+    --------
+
+    """
+
+    if os.environ.get(DATA_ENV):
+        return os.environ[DATA_ENV]
+
+    #get path to parent directory of this file
+    rel_path = os.path.dirname(os.path.realpath(__file__))
+    return os.path.join(rel_path, "nltk_data")
+
+
+def _register_path(nltk):
+    #the local directory is searched before NLTK's default locations
+    if data_path() not in nltk.data.path:
+        nltk.data.path.insert(0, data_path())
+
+
+def missing_resources():
+    """
+    Checks which NLTK resources needed for sentiment scoring are not installed
+
+    Parameters
+    --------
+
+    Returns
+    --------
+    missing : list of strings
+        names of the resources that could not be found
+
+    Raises
+    --------
+
+    """
+
+    import nltk
+
+    _register_path(nltk)
+    missing = []
+    for name, path in RESOURCES.items():
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            missing.append(name)
+    return missing
+
+
+def ensure_resources(download=True):
+    """
+    Makes sure that every NLTK resource needed for sentiment scoring is
+    installed, downloading the missing ones to the local data directory.
+    Nothing is downloaded if every resource is already installed, so hosts
+    without network access only need prepare_resources to have been run once.
+
+    Parameters
+    --------
+    download : boolean
+        whether missing resources may be downloaded
+
+    Returns
+    --------
+    None
+
+    Raises
+    --------
+    MissingResourceError
+        if a resource is missing and could not be downloaded
+    """
+
+    missing = missing_resources()
+    if not missing:
+        return
+
+    if download:
+        import nltk
+
+        os.makedirs(data_path(), exist_ok=True)
+        for name in missing:
+            nltk.download(name, download_dir=data_path(), quiet=True)
+        missing = missing_resources()
+
+    if missing:
+        raise MissingResourceError(
+            f"NLTK resources {', '.join(missing)} are not installed in {data_path()}. Run 'python -m twitsent prepare-resources' on a host with network access and copy that directory, or set {DATA_ENV} to a directory that contains them."
+        )
+
+
+def prepare_resources():
+    """
+    Downloads every NLTK resource needed for sentiment scoring ahead of time,
+    for use on hosts that will later run without network access
+
+    Parameters
+    --------
+
+    Returns
+    --------
+    None
+
+    Raises
+    --------
+    MissingResourceError
+        if a resource could not be downloaded
+    """
+
+    print(f"Installing NLTK resources to {data_path()}")
+    ensure_resources(download=True)
+    print("All NLTK resources are installed")
@@ -0,0 +1,484 @@
+import os
+import sqlite3
+import itertools
+import threading
+import datetime as dt
+import twitsent.manifest as mf
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    query TEXT NOT NULL,
+    kind TEXT NOT NULL DEFAULT 'tweet',
+    json_max INTEGER NOT NULL,
+    interval_len INTEGER NOT NULL,
+    start_time TEXT NOT NULL,
+    end_time TEXT NOT NULL,
+    created TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS intervals (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    query TEXT NOT NULL,
+    kind TEXT NOT NULL DEFAULT 'tweet',
+    json_max INTEGER NOT NULL,
+    interval_len INTEGER NOT NULL,
+    interval_start TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tweets (
+    interval_id INTEGER NOT NULL REFERENCES intervals(id),
+    position INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (interval_id, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS scores (
+    interval_id INTEGER NOT NULL REFERENCES intervals(id),
+    position INTEGER NOT NULL,
+    score REAL NOT NULL,
+    PRIMARY KEY (interval_id, position)
+) WITHOUT ROWID;
+"""
+
+#created once the kind column exists, databases written before it was added are migrated first
+INDEXES = """
+DROP INDEX IF EXISTS intervals_lookup;
+DROP INDEX IF EXISTS intervals_range;
+CREATE INDEX IF NOT EXISTS intervals_query_range
+    ON intervals (query, interval_len, json_max, kind, interval_start);
+"""
+
+#the keyword tweets and the baseline tweets of a data collection are stored under the same query
+KINDS = ("tweet", "sample")
+
+
+def database_path():
+    """
+    Returns the path of the SQLite database stored beside the csv datasets
+
+    Parameters
+    --------
+
+    Returns
+    --------
+     : str
+        path to twitsent.db in the storedqueries directory
+
+    Raises
+    --------
+
+    """
+
+    #get path to parent directory of this file
+    rel_path = os.path.dirname(os.path.realpath(__file__))
+
+    #construct the full path to store collected tweet data
+    datadir = "storedqueries"
+    fullpath = os.path.join(rel_path, datadir)
+    os.makedirs(os.path.abspath(fullpath), mode=0o777, exist_ok=True)
+
+    return os.path.join(fullpath, "twitsent.db")
+
+
+class SQLiteStore:
+    """
+    Embedded SQLite store for collected tweets and sentiment scores. Every
+    interval is stored with the search query that produced it, and intervals
+    are indexed by (query, interval_len, json_max, kind, interval_start) so
+    that loading a date range of a search is an index seek instead of a scan.
+    The kind is 'tweet' for the keyword tweets of the query and 'sample' for
+    the baseline tweets collected alongside them.
+
+    Parameters
+    --------
+    path : str
+        path of the database file, or None for twitsent.db in storedqueries
+
+    Attributes
+    --------
+    conn : sqlite3.Connection
+        connection to the database, in write-ahead logging mode. It may be
+        used from any thread while holding lock.
+    lock : threading.Lock
+        serializes the use of the connection
+
+    Methods
+    --------
+    save_run(query, kind, json_max, interval_len, interval_starts, tweet_lists, score_lists, run_id=None)
+        stores the intervals of one data collection run, or adds them to a
+        run stored before
+    load_range(query, kind, json_max, interval_len, start, end)
+        loads the intervals of a search that start within a date range
+    close()
+        closes the connection to the database
+    """
+
+    def __init__(self, path=None):
+        self.path = path if path is not None else database_path()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.lock = threading.Lock()
+        #write-ahead logging lets the plot read history while a collection run is writing
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        for table in ("runs", "intervals"):
+            columns = [
+                row[1] for row in self.conn.execute("PRAGMA table_info(" +
+                                                    table + ")")
+            ]
+            if "kind" not in columns:
+                self.conn.execute("ALTER TABLE " + table +
+                                  " ADD COLUMN kind TEXT NOT NULL DEFAULT 'tweet'")
+        self.conn.executescript(INDEXES)
+
+    def save_run(self,
+                 query,
+                 kind,
+                 json_max,
+                 interval_len,
+                 interval_starts,
+                 tweet_lists,
+                 score_lists,
+                 run_id=None):
+        """
+        Stores intervals of a data collection run in a single transaction,
+        inserting tweets and scores in bulk. A collection that stores its
+        intervals one at a time passes the run_id returned by its first save,
+        so that all of them belong to one run.
+
+        Parameters
+        --------
+        query : str
+            Twitter Search API v2 query string the tweets were collected with
+        kind : str
+            'tweet' or 'sample', see KINDS
+        json_max : int
+            number of tweets collected per interval
+        interval_len : int
+            number of minutes per interval
+        interval_starts : list of dt.datetime
+            start time of each interval
+        tweet_lists : list of lists
+            cleaned tweet text of each interval
+        score_lists : list of lists
+            sentiment score of each tweet in tweet_lists
+        run_id : int
+            id of the run to add the intervals to, or None to store them as
+            a new run
+
+        Returns
+        --------
+        run_id : int
+            id of the row in the runs table, or the run_id given if there
+            were no intervals to store
+
+        Raises
+        --------
+
+        """
+
+        if not interval_starts:
+            return run_id
+        start_time = min(interval_starts).isoformat()
+        end_time = (max(interval_starts) +
+                    dt.timedelta(minutes=interval_len)).isoformat()
+        with self.lock, self.conn:
+            if run_id is None:
+                cursor = self.conn.execute(
+                    "INSERT INTO runs (query, kind, json_max, interval_len, start_time, end_time, created) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (query, kind, json_max, interval_len, start_time,
+                     end_time, dt.datetime.now(dt.timezone.utc).isoformat()))
+                run_id = cursor.lastrowid
+            else:
+                #the run covers every interval added to it
+                self.conn.execute(
+                    "UPDATE runs SET start_time = MIN(start_time, ?), end_time = MAX(end_time, ?) WHERE id = ?",
+                    (start_time, end_time, run_id))
+
+            interval_ids = []
+            for start in interval_starts:
+                cursor = self.conn.execute(
+                    "INSERT INTO intervals (run_id, query, kind, json_max, interval_len, interval_start) VALUES (?, ?, ?, ?, ?, ?)",
+                    (run_id, query, kind, json_max, interval_len,
+                     start.isoformat()))
+                interval_ids.append(cursor.lastrowid)
+
+            self.conn.executemany(
+                "INSERT INTO tweets (interval_id, position, text) VALUES (?, ?, ?)",
+                ((interval_id, position, text)
+                 for interval_id, tweets in zip(interval_ids, tweet_lists)
+                 for position, text in enumerate(tweets)))
+            self.conn.executemany(
+                "INSERT INTO scores (interval_id, position, score) VALUES (?, ?, ?)",
+                ((interval_id, position, score)
+                 for interval_id, scores in zip(interval_ids, score_lists)
+                 for position, score in enumerate(scores)))
+
+        return run_id
+
+    def load_range(self,
+                   query,
+                   kind,
+                   json_max,
+                   interval_len,
+                   start=None,
+                   end=None):
+        """
+        Loads every interval of a kind that starts within a date range, most
+        recent first. If an interval was collected more than once, the most
+        recent run is used. The intervals, tweets and scores are read with
+        one ordered join.
+
+        Parameters
+        --------
+        query : str
+            Twitter Search API v2 query string the tweets were collected with,
+            or None for the intervals of any query
+        kind : str
+            'tweet' or 'sample', see KINDS
+        json_max : int
+            number of tweets collected per interval
+        interval_len : int
+            number of minutes per interval
+        start : dt.datetime
+            earliest interval start to load, or None for no lower bound
+        end : dt.datetime
+            latest interval start to load (exclusive), or None for no upper
+            bound
+
+        Returns
+        --------
+        (interval_starts, tweet_lists, score_lists) : Tuple
+            start time of each interval in reverse chronological order, with
+            the cleaned tweet text and sentiment scores of each interval
+
+        Raises
+        --------
+
+        """
+
+        conditions = ["interval_len = ?", "json_max = ?", "kind = ?"]
+        params = [interval_len, json_max, kind]
+        if query is not None:
+            conditions.insert(0, "query = ?")
+            params.insert(0, query)
+        if start is not None:
+            conditions.append("interval_start >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            conditions.append("interval_start < ?")
+            params.append(end.isoformat())
+
+        #an interval without tweets is one row without text
+        with self.lock:
+            rows = self.conn.execute(
+                "WITH latest AS (SELECT interval_start, MAX(id) AS id FROM intervals WHERE "
+                + " AND ".join(conditions) +
+                " GROUP BY interval_start) SELECT latest.interval_start, tweets.text, scores.score FROM latest LEFT JOIN tweets ON tweets.interval_id = latest.id LEFT JOIN scores ON scores.interval_id = latest.id AND scores.position = tweets.position ORDER BY latest.interval_start DESC, tweets.position",
+                params).fetchall()
+
+        interval_starts = []
+        tweet_lists = []
+        score_lists = []
+        for interval_start, interval_rows in itertools.groupby(
+                rows, key=lambda row: row[0]):
+            interval_rows = [row for row in interval_rows if row[1] is not None]
+            interval_starts.append(dt.datetime.fromisoformat(interval_start))
+            tweet_lists.append([row[1] for row in interval_rows])
+            score_lists.append([row[2] for row in interval_rows])
+
+        return interval_starts, tweet_lists, score_lists
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class SQLiteBackend:
+    """
+    Storage backend that keeps the datasets of store_data.save_lists in the
+    SQLite store. Each interval is stored with the search query and the start
+    time it was collected for, keyword tweets as the 'tweet' kind and
+    baseline tweets as the 'sample' kind. A dataset is every interval of its
+    query that starts between the start and end date recorded in the
+    manifest, just as a csv dataset is every row of its files. The intervals
+    of one data collection are stored as one run through one connection,
+    which is closed once the collection moves the end date of its dataset.
+
+    Parameters
+    --------
+    mypath : str
+        storedqueries directory that the database is stored in
+
+    Attributes
+    --------
+    mypath : str
+        storedqueries directory that the database is stored in
+
+    Methods
+    --------
+    save_lists(...)
+        stores collected intervals, same arguments as store_data.save_lists
+    load_lists(json_max, interval_len)
+        loads every interval of the dataset, same return value as
+        store_data.load_lists
+    storage_name(json_max, interval_len)
+        returns the name of the database file, as recorded in the manifest
+    """
+
+    def __init__(self, mypath):
+        self.mypath = mypath
+
+    def storage_name(self, json_max, interval_len):
+        return "twitsent.db"
+
+    def _collection(self, dbpath):
+        #the store and the runs of a collection in progress, shared by every save of the collection
+        with _collections_lock:
+            if dbpath not in _collections:
+                _collections[dbpath] = (SQLiteStore(dbpath), {})
+            return _collections[dbpath]
+
+    def _finish(self, dbpath, key):
+        with _collections_lock:
+            if dbpath not in _collections:
+                return
+            store, runs = _collections[dbpath]
+            for kind in KINDS:
+                runs.pop(key + (kind, ), None)
+            if not runs:
+                del _collections[dbpath]
+                store.close()
+
+    def save_lists(self,
+                   json_response_list,
+                   json_sample_list,
+                   sentiment_list,
+                   sentiment_sample,
+                   start_t,
+                   end_t,
+                   new_end_t,
+                   json_max,
+                   interval_len,
+                   query=None,
+                   interval_ends=None):
+        """
+        Stores collected intervals in the database. Nothing is written if
+        there are no intervals, such as when a finished collection only moves
+        the end date of its dataset, which ends the run of the collection.
+
+        Parameters
+        --------
+        same as store_data.save_lists
+
+        Returns
+        --------
+        None
+
+        Raises
+        --------
+        ValueError
+            if intervals are stored without the query they were collected with
+        """
+
+        dbpath = os.path.join(self.mypath,
+                              self.storage_name(json_max, interval_len))
+        #saves of one collection share the dates of the dataset they continue
+        key = (query, json_max, interval_len, start_t, end_t)
+        if not sentiment_list and not sentiment_sample:
+            if new_end_t != end_t:
+                self._finish(dbpath, key)
+            return
+        if query is None:
+            raise ValueError(
+                "The sqlite backend requires the query the intervals were collected with"
+            )
+        delta = dt.timedelta(minutes=interval_len)
+        if interval_ends is None:
+            #intervals stored all at once were collected in reverse chronological order, starting at the end date
+            end_dt = _parse_date(new_end_t)
+            interval_ends = [
+                end_dt - delta * i
+                for i in range(max(len(sentiment_list), len(sentiment_sample)))
+            ]
+        interval_starts = [
+            interval_end - delta for interval_end in interval_ends
+        ]
+
+        store, runs = self._collection(dbpath)
+        for kind, tweet_lists, score_lists in (("tweet", json_response_list,
+                                                sentiment_list),
+                                               ("sample", json_sample_list,
+                                                sentiment_sample)):
+            runs[key + (kind, )] = store.save_run(
+                query, kind, json_max, interval_len,
+                interval_starts[:len(score_lists)], tweet_lists, score_lists,
+                runs.get(key + (kind, )))
+        if new_end_t != end_t:
+            #intervals stored all at once are a whole collection
+            self._finish(dbpath, key)
+
+    def load_lists(self, json_max, interval_len):
+        """
+        Loads every interval of the dataset with matching parameters, using
+        the query recorded for it in the manifest. Datasets recorded before
+        the query was kept load the intervals of any query.
+
+        Parameters
+        --------
+        json_max : int
+            number of tweets collected per interval
+        interval_len : int
+            number of minutes per interval
+
+        Returns
+        --------
+        (sentiment_list,tweet_list,sentiment_sample, tweet_sample, totaltime) : Tuple
+            same as store_data.load_lists, with the intervals in reverse
+            chronological order
+
+        Raises
+        --------
+        FileNotFoundError
+            if the manifest has no sqlite dataset with matching parameters
+        """
+
+        entry = mf.Manifest(self.mypath).lookup("tweet", json_max,
+                                                interval_len, False)
+        if entry is None or entry.get("backend") != "sqlite":
+            raise FileNotFoundError(
+                f"No sqlite dataset found for {json_max} tweets per {interval_len} minutes"
+            )
+        start = _parse_date(entry["start"])
+        end = _parse_date(entry["end"])
+        #interval ends are moved slightly before midnight, so the dataset is every interval that ends within its dates
+        first_start = start - dt.timedelta(minutes=interval_len)
+
+        with SQLiteStore(os.path.join(self.mypath, entry["file"])) as store:
+            _, tweet_list, sentiment_list = store.load_range(
+                entry.get("query"), "tweet", json_max, interval_len,
+                first_start, end)
+            _, tweet_sample, sentiment_sample = store.load_range(
+                entry.get("query"), "sample", json_max, interval_len,
+                first_start, end)
+
+        totaltime = int((end - start) / dt.timedelta(minutes=1))
+
+        return (sentiment_list, tweet_list, sentiment_sample, tweet_sample,
+                totaltime)
+
+
+#stores of the collections in progress in this process, by database path
+_collections = {}
+_collections_lock = threading.Lock()
+
+
+def _parse_date(datestr):
+    #dates are either in the calendar's month/day/year format or the month.day.year format of the csv filenames
+    date_s = datestr.replace("/", ".").split(".")
+    date = dt.date(int(date_s[2]) + 2000, int(date_s[0]), int(date_s[1]))
+    return dt.datetime.combine(date, dt.time(tzinfo=dt.timezone.utc))
@@ -3,9 +3,13 @@ import datetime as dt
 import re
 import pickle
 import csv
-from os import listdir
-from os.path import isfile, join
-import datetime as dt
+import shutil
+import contextlib
+import contextvars
+import twitsent.columnar as col
+import twitsent.sqlstore as sq
+import twitsent.manifest as mf
+import twitsent.aggregates as agg
 
 
 class FileMatchException(Exception):
@@ -14,9 +18,200 @@ class FileMatchException(Exception):
         super().__init__(message)
 
 
-def save_lists(json_response_list, json_sample_list, sentiment_list,
-               sentiment_sample, start_t, end_t, new_end_t, json_max,
-               interval_len):
+#name of the dataset that data is currently stored under, None for the storedqueries directory itself. A context variable keeps jobs that run in different threads apart.
+_dataset = contextvars.ContextVar("dataset", default=None)
+#name of the storage backend that data is currently stored with, None for DEFAULT_BACKEND
+_backend = contextvars.ContextVar("backend", default=None)
+
+
+def storage_path():
+    """
+    Returns the directory that collected tweet data is stored in, creating it
+    if it does not exist yet. This is the storedqueries directory, or its
+    subdirectory of the dataset selected with use_dataset.
+
+    Parameters
+    --------
+
+    Returns
+    --------
+    fullpath : str
+        path to the storedqueries directory of the current dataset
+
+    Raises
+    --------
+
+    """
+
+    #get path to parent directory of this file
+    rel_path = os.path.dirname(os.path.realpath(__file__))
+
+    #construct the full path to store collected tweet data
+    datadir = "storedqueries"
+    fullpath = os.path.join(rel_path, datadir)
+    if _dataset.get() is not None:
+        fullpath = os.path.join(fullpath, _dataset.get())
+    os.makedirs(os.path.abspath(fullpath), mode=0o777, exist_ok=True)
+
+    return fullpath
+
+
+@contextlib.contextmanager
+def use_dataset(name):
+    """
+    Stores and loads every dataset within the block in a subdirectory of
+    storedqueries, so that keyword sets collected with the same json_max and
+    interval_len do not overwrite each other. Threads started within the
+    block must be run with contextvars.copy_context() to share the dataset.
+
+    Parameters
+    --------
+    name : str
+        name of the dataset subdirectory, or None for the storedqueries
+        directory itself
+
+    Returns
+    --------
+    None
+
+    Raises
+    --------
+    ValueError
+        if the name is not a plain directory name
+    """
+
+    if name is not None and (not name or name in (".", "..") or
+                             os.path.basename(name) != name):
+        raise ValueError(f"Invalid dataset name ({name}) received")
+    token = _dataset.set(name)
+    try:
+        yield
+    finally:
+        _dataset.reset(token)
+
+
+class CSVBackend:
+    """
+    Stores each dataset as four pipe-quoted CSV files whose names contain the
+    parameters of the data collection
+
+    Parameters
+    --------
+    mypath : str
+        storedqueries directory that datasets are stored in
+
+    Attributes
+    --------
+    mypath : str
+        storedqueries directory that datasets are stored in
+
+    Methods
+    --------
+    save_lists(...)
+        appends collected intervals to the csv files, same arguments as
+        save_lists
+    load_lists(json_max, interval_len)
+        reads the csv files, same return value as load_lists
+    """
+
+    def __init__(self, mypath):
+        self.mypath = mypath
+
+    def save_lists(self, *args, query=None, interval_ends=None):
+        #rows are appended in the order they are received, the query and interval times are not stored
+        _save_csv_lists(*args)
+
+    def load_lists(self, json_max, interval_len):
+        return _load_csv_lists(json_max, interval_len)
+
+
+#storage backends that can be selected by name, csv is used unless another is requested
+BACKENDS = {
+    "csv": CSVBackend,
+    "columnar": col.ColumnarBackend,
+    "sqlite": sq.SQLiteBackend
+}
+DEFAULT_BACKEND = "csv"
+
+
+@contextlib.contextmanager
+def use_backend(name):
+    """
+    Stores and loads every dataset within the block with a storage backend,
+    the same way use_dataset selects the directory they are stored in.
+    Threads started within the block must be run with
+    contextvars.copy_context() to share the backend.
+
+    Parameters
+    --------
+    name : str
+        name of a backend in BACKENDS, or None for DEFAULT_BACKEND
+
+    Returns
+    --------
+    None
+
+    Raises
+    --------
+    ValueError
+        if no backend with the given name exists
+    """
+
+    if name is not None and name not in BACKENDS:
+        raise ValueError(f"Unknown storage backend ({name}) requested")
+    token = _backend.set(name)
+    try:
+        yield
+    finally:
+        _backend.reset(token)
+
+
+def backend_name():
+    #name of the backend selected with use_backend
+    name = _backend.get()
+    return name if name is not None else DEFAULT_BACKEND
+
+
+def get_backend(backend=None):
+    """
+    Creates the storage backend with the given name
+
+    Parameters
+    --------
+    backend : str
+        name of a backend in BACKENDS, or None for the backend selected with
+        use_backend
+
+    Returns
+    --------
+     : CSVBackend, col.ColumnarBackend or sq.SQLiteBackend
+        backend that stores datasets in the storedqueries directory
+
+    Raises
+    --------
+    ValueError
+        if no backend with the given name exists
+    """
+
+    name = backend if backend is not None else backend_name()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown storage backend ({name}) requested")
+    return BACKENDS[name](storage_path())
+
+
+def save_lists(json_response_list,
+               json_sample_list,
+               sentiment_list,
+               sentiment_sample,
+               start_t,
+               end_t,
+               new_end_t,
+               json_max,
+               interval_len,
+               backend=None,
+               aggregates=None,
+               query=None,
+               interval_ends=None):
     """
     Stores tweet data collected in files for later access
 
@@ -40,10 +235,23 @@ def save_lists(json_response_list, json_sample_list, sentiment_list,
         number of tweets collected per interval
     interval_len : int
         number of minutes per interval
+    backend : str
+        name of the storage backend to store the data with, or None for the
+        backend selected with use_backend
+    aggregates : agg.Aggregates
+        aggregates of the dataset kept in memory by the caller, or None to
+        load them from disk
+    query : str
+        Twitter Search API v2 query string of the keyword search, required by
+        the sqlite backend
+    interval_ends : list of dt.datetime
+        end time of each interval, or None if the intervals were collected in
+        reverse chronological order starting at new_end_t
 
     Returns
     --------
-    None
+    aggregates : agg.Aggregates
+        aggregates of the dataset including the stored intervals
     
     Raises
     --------
@@ -51,15 +259,115 @@ def save_lists(json_response_list, json_sample_list, sentiment_list,
         Raised if files are unexpectedly missing when searched for
     """
 
+    if aggregates is None:
+        aggregates = agg.Aggregates(storage_path(), json_max, interval_len)
+    #a dataset stored before aggregates were kept has its earlier intervals added before the new ones
+    if not aggregates.exists and not len(aggregates):
+        try:
+            _seed_aggregates(aggregates, json_max, interval_len, backend)
+        except (FileMatchException, FileNotFoundError):
+            pass
+
+    store = get_backend(backend)
+    store.save_lists(json_response_list,
+                     json_sample_list,
+                     sentiment_list,
+                     sentiment_sample,
+                     start_t,
+                     end_t,
+                     new_end_t,
+                     json_max,
+                     interval_len,
+                     query=query,
+                     interval_ends=interval_ends)
+    if not isinstance(store, CSVBackend):
+        _record_dataset(store, start_t, new_end_t, json_max, interval_len,
+                        query)
+
+    #update the running aggregates with the new intervals only, so graphing does not need to reload every stored score
+    aggregates.append(sentiment_list, sentiment_sample, start_t, end_t,
+                      new_end_t)
+    aggregates.save()
+    return aggregates
+
+
+def load_aggregates(json_max, interval_len):
+    """
+    Retrieve the running aggregates of each interval of a dataset, computing
+    them from the csv files once if the dataset was stored before aggregates
+    were kept
+
+    Parameters
+    --------
+    json_max : int
+        number of tweets collected per interval
+    interval_len : int
+        number of minutes per interval
+
+    Returns
+    --------
+     : agg.Aggregates
+        aggregates of every interval of the dataset
+
+    Raises
+    --------
+    FileMatchException
+        if no aggregates or csv files with matching parameters exist
+    """
+
+    aggregates = agg.Aggregates(storage_path(), json_max, interval_len)
+    if not aggregates.exists:
+        _seed_aggregates(aggregates, json_max, interval_len)
+        aggregates.save()
+    return aggregates
+
+
+def _seed_aggregates(aggregates, json_max, interval_len, backend=None):
+    #computes the aggregates of every interval that is already stored, raising FileMatchException if there is none
+    manifest = mf.Manifest(storage_path())
+    _, datestr, datestr2, _ = find_file(manifest, 'tweet', json_max,
+                                        interval_len, True)
+    sentiment_list, _, sentiment_sample, _, _ = load_lists(
+        json_max, interval_len, backend)
+    aggregates.append(sentiment_list, sentiment_sample, datestr, datestr2,
+                      datestr2)
+
+
+def _record_dataset(store,
+                    start_t,
+                    new_end_t,
+                    json_max,
+                    interval_len,
+                    query=None):
+    #datasets of the other backends are indexed under the same keys as csv datasets, so that they can be found and continued
+    manifest = mf.Manifest(storage_path())
+    if query is None:
+        current = manifest.lookup("tweet", json_max, interval_len, False)
+        query = current.get("query") if current is not None else None
+    filename = store.storage_name(json_max, interval_len)
+    name = next(name for name, backend in BACKENDS.items()
+                if isinstance(store, backend))
+    for prefix in ("tweet", "senti"):
+        for has_sample in (False, True):
+            manifest.record(prefix, json_max, interval_len, has_sample,
+                            filename, re.sub(r"[:/]", ".", start_t),
+                            re.sub(r"[:/]", ".", new_end_t), name, query)
+    manifest.save()
+
+
+def _save_csv_lists(json_response_list, json_sample_list, sentiment_list,
+                    sentiment_sample, start_t, end_t, new_end_t, json_max,
+                    interval_len):
+    """
+    Appends tweet data collected to the csv files of the csv backend, see
+    save_lists
+    """
+
     #string format of the time at the current moment
     time_now = dt.datetime.now().isoformat()
 
-    #get path to parent directory of this file
-    rel_path = os.path.dirname(os.path.realpath(__file__))
-
     #construct the full path to store collected tweet data
-    datadir = "storedqueries"
-    fullpath = os.path.join(rel_path, datadir)
+    fullpath = storage_path()
 
     #remove illegal characters from filename
     tweetfile = "tweet_" + start_t + "_" + end_t + "_" + str(
@@ -163,16 +471,125 @@ def save_lists(json_response_list, json_sample_list, sentiment_list,
         os.rename(os.path.join(fullpath, sample_sentifile),
                   os.path.join(fullpath, new_sample_sentifile))
 
+    #index the renamed files so that later lookups do not have to scan the directory
+    manifest = mf.Manifest(fullpath)
+    for prefix, has_sample, filename in (("tweet", False, newtweetfile),
+                                         ("tweet", True, new_sample_tweetfile),
+                                         ("senti", False, newsentifile),
+                                         ("senti", True,
+                                          new_sample_sentifile)):
+        match = mf.FILENAME_REGEX.match(filename)
+        manifest.record(prefix, json_max, interval_len, has_sample, filename,
+                        match.group(2), match.group(3))
+    manifest.save()
+
+
+def csv_files(start_t, end_t, json_max, interval_len):
+    """
+    Returns the paths of the four csv files that a dataset is stored in
+
+    Parameters
+    --------
+    start_t : string
+        Start date of data collection
+    end_t : string
+        End date of data collection
+    json_max : int
+        max number of results stored in file for each time interval
+    interval_len : int
+        Represents length of collection intervals in minutes
+
+    Returns
+    --------
+     : list of str
+        paths of the tweet, sample tweet, sentiment and sample sentiment files
+
+    Raises
+    --------
+
+    """
+
+    #remove illegal characters from filename
+    stem = "_" + start_t + "_" + end_t + "_" + str(json_max) + "_" + str(
+        interval_len) + "_"
+    stem = re.sub(r"[:/]", ".", stem)
+    return [
+        os.path.join(storage_path(), prefix + stem + suffix)
+        for prefix in ("tweet", "senti") for suffix in (".csv", "sample.csv")
+    ]
+
 
-def find_file(onlyfiles, prefix, json_max, interval_len, has_sample):
+def archive_dataset(json_max, interval_len):
+    """
+    Archives the dataset with matching parameters, deleting any dataset
+    archived by a previous data collection. Csv files and columnar dataset
+    directories are renamed to their archived names. Sqlite intervals stay in
+    the database, where the next dataset only loads the intervals within its
+    own dates, so only their manifest entries are archived.
+
+    Parameters
+    --------
+    json_max : int
+        max number of results stored in file for each time interval
+    interval_len : int
+        Represents length of collection intervals in minutes
+
+    Returns
+    --------
+    None
+
+    Raises
+    --------
+
+    """
+
+    mypath = storage_path()
+    manifest = mf.Manifest(mypath)
+    for prefix in ("tweet", "senti"):
+        for has_sample in (False, True):
+            archived = manifest.lookup("archived" + prefix, json_max,
+                                       interval_len, has_sample)
+            if archived is not None:
+                filepath = os.path.join(mypath, archived["file"])
+                backend = archived.get("backend", "csv")
+                if backend == "columnar":
+                    shutil.rmtree(filepath, ignore_errors=True)
+                elif backend == "csv" and os.path.exists(filepath):
+                    os.remove(filepath)
+                manifest.remove("archived" + prefix, json_max, interval_len,
+                                has_sample)
+
+            current = manifest.lookup(prefix, json_max, interval_len,
+                                      has_sample)
+            if current is None:
+                continue
+            backend = current.get("backend", "csv")
+            filename = current["file"]
+            if backend != "sqlite":
+                #the four entries of a columnar dataset share its directory, which is renamed with the first
+                filename = "archived" + current["file"]
+                filepath = os.path.join(mypath, current["file"])
+                if os.path.exists(filepath):
+                    os.rename(filepath, os.path.join(mypath, filename))
+            if os.path.exists(os.path.join(mypath, filename)):
+                manifest.record("archived" + prefix, json_max, interval_len,
+                                has_sample, filename, current["start"],
+                                current["end"], backend,
+                                current.get("query"))
+            manifest.remove(prefix, json_max, interval_len, has_sample)
+    manifest.save()
+    agg.archive(mypath, json_max, interval_len)
+
+
+def find_file(manifest, prefix, json_max, interval_len, has_sample):
     """
     Given a list of parameters, this method returns data about the
     file that matches those parameters
     
     Parameters
     --------
-    onlyfiles : list of paths
-        Contains references to the files to be searched on with this method
+    manifest : mf.Manifest
+        index of the files in the storedqueries directory
     prefix : string
         file prefix to be searched for
     json_max : int
@@ -194,36 +611,17 @@ def find_file(onlyfiles, prefix, json_max, interval_len, has_sample):
     
     """
 
-    past_file = ""
-
-    #search in specified file list for sentiment file that matches specified data storage file values (which are contained within the file name)
-    for file in onlyfiles:
-        file_data = file.split("_")
-        file_prefix = file_data[0]
-        if file_prefix == "":
-            continue
-        file_startdate = file_data[1]
-        datestr = file_startdate
-        date_s = file_startdate.split(".")
-        file_enddate = file_data[2]
-        datestr2 = file_enddate
-        date_c = file_enddate.split(".")
-        file_json_max = int(file_data[3])
-        file_interval_len = int(file_data[4])
-        if ((file_prefix == prefix) and file_json_max == json_max
-                and file_interval_len == interval_len):
-            if has_sample:
-                if "sample" in file:
-                    past_file = file
-                    break
-            else:
-                if "sample" not in file:
-                    past_file = file
-                    break
-
-    if past_file == "":
+    #look up the file that matches the specified data storage file values in the index
+    entry = manifest.lookup(prefix, json_max, interval_len, has_sample)
+    if entry is None:
         raise FileMatchException("No sentiment storage files found")
 
+    past_file = entry["file"]
+    datestr = entry["start"]
+    date_s = datestr.split(".")
+    datestr2 = entry["end"]
+    date_c = datestr2.split(".")
+
     #create dates that represent the start and stop dates of file data storage
     start_date = dt.date(
         int(date_s[2]) + 2000, int(date_s[0]), int(date_s[1])
@@ -243,7 +641,7 @@ def find_file(onlyfiles, prefix, json_max, interval_len, has_sample):
     return (past_file, datestr, datestr2, totaltime)
 
 
-def load_lists(json_max, interval_len):
+def load_lists(json_max, interval_len, backend=None):
     """
     Retrieve tweet data lists from file storage based on search parameters
     
@@ -253,6 +651,9 @@ def load_lists(json_max, interval_len):
         number of tweets collected per interval
     interval_len : int
         number of minutes per interval
+    backend : str
+        name of the storage backend to load the data from, or None for the
+        backend selected with use_backend
         
     Returns
     --------
@@ -266,14 +667,19 @@ def load_lists(json_max, interval_len):
     
     """
 
-    #get path to parent directory of this file
-    rel_path = os.path.dirname(os.path.realpath(__file__))
+    return get_backend(backend).load_lists(json_max, interval_len)
+
+
+def _load_csv_lists(json_max, interval_len):
+    """
+    Reads tweet data lists from the csv files of the csv backend, see
+    load_lists
+    """
 
     #construct the full path to store collected tweet data
-    datadir = "storedqueries"
-    mypath = os.path.join(rel_path, datadir)
+    mypath = storage_path()
 
-    onlyfiles = [f for f in listdir(mypath) if isfile(join(mypath, f))]
+    manifest = mf.Manifest(mypath)
 
     past_sentifile = ""
     past_tweetfile = ""
@@ -282,20 +688,24 @@ def load_lists(json_max, interval_len):
     tweet_datestr2 = "c"
     senti_datestr2 = "d"
 
-    if not onlyfiles:
+    if not manifest.entries:
         raise FileMatchException("No data storage files found")
+    entry = manifest.lookup('tweet', json_max, interval_len, False)
+    if entry is not None and entry.get("backend", "csv") != "csv":
+        raise FileMatchException(
+            f"The dataset is stored with the {entry['backend']} backend")
 
     #retrieve file name with specified parameters
     past_sentifile, senti_datestr, senti_datestr2, _ = find_file(
-        onlyfiles, 'senti', json_max, interval_len, False)
+        manifest, 'senti', json_max, interval_len, False)
     past_tweetfile, tweet_datestr, tweet_datestr2, _ = find_file(
-        onlyfiles, 'tweet', json_max, interval_len, False)
+        manifest, 'tweet', json_max, interval_len, False)
 
     #retrieve file name with specified parameters that contains sample comparison data
     past_sample_sentifile, sample_senti_datestr, sample_senti_datestr2, _ = find_file(
-        onlyfiles, 'senti', json_max, interval_len, True)
+        manifest, 'senti', json_max, interval_len, True)
     past_sample_tweetfile, sample_tweet_datestr, sample_tweet_datestr2, totaltime = find_file(
-        onlyfiles, 'tweet', json_max, interval_len, True)
+        manifest, 'tweet', json_max, interval_len, True)
 
     if tweet_datestr != tweet_datestr or tweet_datestr2 != senti_datestr2:
         raise FileMatchException("No matching tweet and sentiment files found")
@@ -310,7 +720,7 @@ def load_lists(json_max, interval_len):
                                          quotechar='|',
                                          quoting=csv.QUOTE_MINIMAL)
                 for row in sentireader:
-                    sentiment_list.append([float(row[0]), float(row[1])])
+                    sentiment_list.append([float(score) for score in row])
         sentiment_sample = []
         if os.path.exists(os.path.join(mypath, past_sample_sentifile)):
             #retrieve tweet sentiment array
@@ -322,7 +732,7 @@ def load_lists(json_max, interval_len):
                                          quotechar='|',
                                          quoting=csv.QUOTE_MINIMAL)
                 for row in sentireader:
-                    sentiment_sample.append([float(row[0]), float(row[1])])
+                    sentiment_sample.append([float(score) for score in row])
 
         tweet_list = []
         if os.path.exists(os.path.join(mypath, past_tweetfile)):
@@ -350,3 +760,56 @@ def load_lists(json_max, interval_len):
 
         return (sentiment_list, tweet_list, sentiment_sample, tweet_sample,
                 totaltime)
+
+
+def migrate_to_columnar():
+    """
+    Copies every csv dataset in the storedqueries directory into the columnar
+    backend and indexes the copy in the manifest in place of the csv files,
+    so that it is found by find_file and loaded with the columnar backend.
+    The csv files are left in place. Archived datasets are skipped.
+
+    Parameters
+    --------
+
+    Returns
+    --------
+    migrated : list of tuples
+        (json_max, interval_len) of every dataset that was migrated
+
+    Raises
+    --------
+
+    """
+
+    mypath = storage_path()
+    manifest = mf.Manifest(mypath)
+
+    #every distinct combination of search parameters that has csv data
+    params = manifest.datasets("senti", "csv")
+
+    columnar = col.ColumnarBackend(mypath)
+    migrated = []
+    for json_max, interval_len in sorted(params):
+        try:
+            past_file, datestr, datestr2, _ = find_file(
+                manifest, 'senti', json_max, interval_len, False)
+            sentiment_list, tweet_list, sentiment_sample, tweet_sample, _ = _load_csv_lists(
+                json_max, interval_len)
+        except FileMatchException:
+            print(
+                f"Skipping incomplete csv dataset for {json_max} tweets per {interval_len} minutes"
+            )
+            continue
+        #the columnar dataset is rebuilt from scratch so that the migration can be repeated
+        shutil.rmtree(os.path.join(mypath,
+                                   col.dataset_name(json_max, interval_len)),
+                      ignore_errors=True)
+        columnar.save_lists(tweet_list, tweet_sample, sentiment_list,
+                            sentiment_sample, datestr, datestr, datestr2,
+                            json_max, interval_len)
+        _record_dataset(columnar, datestr, datestr2, json_max, interval_len)
+        migrated.append((json_max, interval_len))
+        print(f"Migrated {past_file} to the columnar backend")
+
+    return migrated
@@ -0,0 +1,283 @@
+import os
+import json
+import threading
+import twitsent.store_data as sd
+import twitsent.aggregates as agg
+
+#names of the two collections that are stored side by side in each dataset
+STREAMS = ("keyword", "baseline")
+
+
+def progress_path(json_max, interval_len):
+    """
+    Returns the path of the file that records how far the collection of a
+    dataset has been stored
+
+    Parameters
+    --------
+    json_max : int
+        number of tweets collected per interval
+    interval_len : int
+        number of minutes per interval
+
+    Returns
+    --------
+     : str
+        path to the progress file in the storedqueries directory
+
+    Raises
+    --------
+
+    """
+
+    return os.path.join(
+        sd.storage_path(),
+        "progress_" + str(json_max) + "_" + str(interval_len) + ".json")
+
+
+def load_progress(json_max, interval_len):
+    """
+    Reads the progress of an interrupted data collection
+
+    Parameters
+    --------
+    json_max : int
+        number of tweets collected per interval
+    interval_len : int
+        number of minutes per interval
+
+    Returns
+    --------
+     : dictionary
+        the 'params' of the collection, the number of 'intervals' stored, and
+        the 'sizes' of the csv files and number of aggregate 'rows' after the
+        last stored interval, or None if no collection with these parameters
+        was interrupted
+
+    Raises
+    --------
+
+    """
+
+    filepath = progress_path(json_max, interval_len)
+    if not os.path.exists(filepath):
+        return None
+    with open(filepath, "r", encoding="utf-8") as progressfile:
+        return json.load(progressfile)
+
+
+def can_resume(query, json_max, interval_len, start_t, end_t, new_end_t):
+    """
+    Checks whether an interrupted data collection with the same parameters
+    can be resumed
+
+    Parameters
+    --------
+    same as StreamWriter
+
+    Returns
+    --------
+     : boolean
+        True if some intervals of the collection were already stored
+
+    Raises
+    --------
+
+    """
+
+    progress = load_progress(json_max, interval_len)
+    return progress is not None and progress["params"] == _params(
+        query, start_t, end_t, new_end_t)
+
+
+def _params(query, start_t, end_t, new_end_t):
+    return {
+        "query": query,
+        "start": start_t,
+        "end": end_t,
+        "new_end": new_end_t
+    }
+
+
+class StreamWriter:
+    """
+    Stores each interval of a data collection as soon as both its keyword
+    and baseline tweets have been scored, instead of once the whole
+    collection is complete. Intervals are appended in order, and the number
+    of intervals stored is recorded after each one, so that an interrupted
+    collection with the same parameters resumes after the last stored
+    interval. Any partially written rows of csv files are cut off when
+    resuming.
+
+    Parameters
+    --------
+    query : str
+        Twitter Search API v2 query string of the keyword search
+    json_max : int
+        number of tweets collected per interval
+    interval_len : int
+        number of minutes per interval
+    start_t : string
+        Start date of data collection
+    end_t : string
+        End date of previous data collection file
+    new_end_t : string
+        End date of this data collection
+    backend : str
+        name of the storage backend to store the data with, or None for the
+        backend selected with store_data.use_backend
+
+    Attributes
+    --------
+    done : int
+        number of intervals that are durably stored, which is also the number
+        of intervals that can be skipped when collecting
+
+    Methods
+    --------
+    add(stream, index, tweets, scores, interval_end=None)
+        hands over a scored interval of one stream, storing every interval
+        that is complete in both streams
+    finish()
+        renames the dataset to its new end date and removes the progress file
+    """
+
+    def __init__(self,
+                 query,
+                 json_max,
+                 interval_len,
+                 start_t,
+                 end_t,
+                 new_end_t,
+                 backend=None):
+        self.json_max = json_max
+        self.interval_len = interval_len
+        self.start_t = start_t
+        self.end_t = end_t
+        self.new_end_t = new_end_t
+        self.backend = backend
+        self.query = query
+        self.params = _params(query, start_t, end_t, new_end_t)
+        self.filepath = progress_path(json_max, interval_len)
+
+        self.done = 0
+        #scored intervals that arrived before the matching interval of the other stream
+        self._pending = {stream: {} for stream in STREAMS}
+        self._lock = threading.Lock()
+
+        progress = load_progress(json_max, interval_len)
+        if progress is not None and progress["params"] == self.params:
+            self.done = progress["intervals"]
+            self._truncate(progress["sizes"], progress["rows"])
+        #the aggregates are loaded once and kept in memory while intervals are appended
+        self._aggregates = agg.Aggregates(sd.storage_path(), json_max,
+                                          interval_len)
+
+    def _is_csv(self):
+        name = self.backend if self.backend is not None else sd.backend_name()
+        return name == "csv"
+
+    def _truncate(self, sizes, rows):
+        #rows written after the last recorded interval belong to an interval that was not completed
+        for path, size in sizes.items():
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                with open(path, "r+b") as csvfile:
+                    csvfile.truncate(size)
+        aggregates = agg.Aggregates(sd.storage_path(), self.json_max,
+                                    self.interval_len)
+        if len(aggregates) > rows:
+            aggregates.truncate(rows)
+            aggregates.save()
+
+    def _save_progress(self):
+        sizes = {}
+        if self._is_csv():
+            sizes = {
+                path: os.path.getsize(path)
+                for path in sd.csv_files(self.start_t, self.end_t,
+                                         self.json_max, self.interval_len)
+                if os.path.exists(path)
+            }
+        rows = len(self._aggregates)
+        tmp_path = self.filepath + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as progressfile:
+            json.dump(
+                {
+                    "params": self.params,
+                    "intervals": self.done,
+                    "sizes": sizes,
+                    "rows": rows
+                }, progressfile)
+        os.replace(tmp_path, self.filepath)
+
+    def add(self, stream, index, tweets, scores, interval_end=None):
+        """
+        Hands over one scored interval of a stream. Every interval that has
+        now been scored in both streams is appended to the dataset.
+
+        Parameters
+        --------
+        stream : str
+            'keyword' or 'baseline'
+        index : int
+            position of the interval in reverse chronological order
+        tweets : list of strings
+            cleaned tweet text of the interval
+        scores : list of floats
+            sentiment score of each tweet
+        interval_end : dt.datetime
+            end time of the interval, or None if it is derived from the end
+            date by the backend
+
+        Returns
+        --------
+        None
+
+        Raises
+        --------
+
+        """
+
+        with self._lock:
+            self._pending[stream][index] = (tweets, scores, interval_end)
+            while all(self.done in pending
+                      for pending in self._pending.values()):
+                tweets, scores, interval_end = self._pending["keyword"].pop(
+                    self.done)
+                sample_tweets, sample_scores, sample_end = self._pending[
+                    "baseline"].pop(self.done)
+                interval_ends = None
+                if interval_end is not None or sample_end is not None:
+                    interval_ends = [interval_end or sample_end]
+                #the dataset keeps its previous end date until the whole collection is stored
+                self._aggregates = sd.save_lists(
+                    [tweets], [sample_tweets], [scores], [sample_scores],
+                    self.start_t, self.end_t, self.end_t, self.json_max,
+                    self.interval_len, self.backend, self._aggregates,
+                    self.query, interval_ends)
+                self.done += 1
+                self._save_progress()
+
+    def finish(self):
+        """
+        Renames the dataset to reflect the new end date once every interval
+        is stored, and removes the progress file. No intervals are stored by
+        this call.
+
+        Parameters
+        --------
+
+        Returns
+        --------
+        None
+
+        Raises
+        --------
+
+        """
+
+        sd.save_lists([], [], [], [], self.start_t, self.end_t,
+                      self.new_end_t, self.json_max, self.interval_len,
+                      self.backend, self._aggregates, self.query)
+        if os.path.exists(self.filepath):
+            os.remove(self.filepath)
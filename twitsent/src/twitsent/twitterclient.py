@@ -0,0 +1,142 @@
+import requests
+from requests.adapters import HTTPAdapter
+import twitsent.ratelimit as rl
+
+#Twitter Search API v2 endpoints, selected by whether the user has academic access
+RECENT_URL = "https://api.twitter.com/2/tweets/search/recent"
+ARCHIVE_URL = "https://api.twitter.com/2/tweets/search/all"
+
+
+class TwitterClient:
+    """
+    Reusable HTTP client for the Twitter Search API v2 that keeps a pool of
+    keep-alive connections open so that each page request does not pay for a
+    new TLS handshake
+
+    Parameters
+    --------
+    bearer_token : str
+        Twitter Search API v2 bearer token, attached once to every request
+        made through this client
+    pool_size : int
+        maximum number of connections kept alive for each host
+    connect_timeout : float
+        seconds to wait for a connection to the API to be established
+    read_timeout : float
+        seconds to wait for the API to send a response
+    limiter : rl.RateLimiter
+        rate limiter shared by every request made through this client, a new
+        one is created if None
+
+    Attributes
+    --------
+    session : requests.Session
+        pooled session shared by every request made through this client
+    timeout : tuple
+        (connect_timeout, read_timeout) passed to every request
+    limiter : rl.RateLimiter
+        token buckets that pace requests to each search endpoint
+
+    Methods
+    --------
+    url(acad_access)
+        returns the search endpoint matching the user's access level
+    get(acad_access, params)
+        sends a search request over a pooled connection
+    close()
+        closes every pooled connection
+    """
+
+    def __init__(self,
+                 bearer_token,
+                 pool_size=10,
+                 connect_timeout=5,
+                 read_timeout=30,
+                 limiter=None):
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {bearer_token}"
+        self.session.headers["User-Agent"] = "v2RecentSearchPython"
+        self.session.headers["Connection"] = "keep-alive"
+
+        #only the api.twitter.com host is used, so one pool per mounted adapter is enough
+        adapter = HTTPAdapter(pool_connections=1,
+                              pool_maxsize=pool_size,
+                              pool_block=True)
+        self.session.mount("https://", adapter)
+
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.limiter = limiter if limiter is not None else rl.RateLimiter()
+
+    def url(self, acad_access):
+        """
+        Returns the search endpoint that corresponds to the user's access level
+
+        Parameters
+        --------
+        acad_access : string
+            A string 'y'/'n' that represents whether the user has academic acces and wants to perform a full archive search
+
+        Returns
+        --------
+         : str
+            url of the recent or full archive search endpoint
+
+        Raises
+        --------
+
+        """
+
+        if acad_access == 'n':
+            return RECENT_URL
+        return ARCHIVE_URL
+
+    def get(self, acad_access, params):
+        """
+        Sends a search request to the Twitter API over a pooled connection
+
+        Parameters
+        --------
+        acad_access : string
+            A string 'y'/'n' that represents whether the user has academic acces and wants to perform a full archive search
+        params : dictionary
+            contains the specific details of the request to the API
+
+        Returns
+        --------
+         : requests.Response
+            the raw response from the Twitter API
+
+        Raises
+        --------
+        requests.exceptions.Timeout
+            if the API does not respond within the configured timeouts
+        """
+
+        return self.session.get(self.url(acad_access),
+                                params=params,
+                                timeout=self.timeout)
+
+    def close(self):
+        """
+        Closes every connection held open by the pooled session
+
+        Parameters
+        --------
+
+        Returns
+        --------
+        None
+
+        Raises
+        --------
+
+        """
+
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
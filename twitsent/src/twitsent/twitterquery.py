@@ -1,9 +1,97 @@
-def make_query(keywords_ops, lang):
+import functools
+
+#keywords searched when the default search terms are selected
+DEFAULT_RULE = [["corona virus"], ['coronavirus'], ["corona", "-beer"],
+                ["covid"], ['covid 19'], ['covid19'], ['covid-19'],
+                ['sarscov2'], ['sars cov 2'], ['sars-cov-2'], ['#coronavirus'],
+                ['#corona'], ['#covid'], ['#covid19'], ['#sarscov2']]
+
+#baseline search for random tweets, using the 25 most common english words
+BASELINE_RULE = [['the'], ['i'], ['to'], ['a'], ['and'], ['is'], ['in'],
+                 ['it'], ['you'], ['of'], ['for'], ['on'], ['my'], ['that'],
+                 ['at'], ['with'], ['me'], ['do'], ['have'], ['just'],
+                 ['this'], ['be'], ['so'], ['are'], ['not']]
+
+#legal twitter language abbreviations
+LANGUAGES = frozenset([
+    'en', 'ar', 'bn', 'cs', 'da', 'de', 'el', 'es', 'fa', 'fi', 'fil', 'fr',
+    'he', 'hi', 'hu', 'id', 'it', 'ja', 'ko', 'msa', 'nl', 'no', 'pl', 'pt',
+    'ro', 'ru', 'sv', 'th', 'tr', 'uk', 'ur', 'vi', 'zh-c', 'zh-tw'
+])
+
+#max length of a query string for each access level of the Twitter Search API v2
+QUERY_LIMITS = {'n': 512, 'y': 1024}
+
+
+class QueryLengthError(Exception):
+
+    def __init__(self, message):
+        super().__init__(message)
+
+
+def normalize_rule(keywords_ops):
+    """
+    Removes the terms of a rule that make_query cannot search for
+
+    Parameters
+    --------
+    keywords_ops : list of lists
+        rule in the format accepted by make_query
+
+    Returns
+    --------
+     : list of lists
+        the rule without terms that contain no meaningful characters or
+        contain forbidden characters, and without the sublists left empty
+
+    Raises
+    --------
+
+    """
+
+    #remove list entries that contain no meaningful characters or contain forbidden characters
+    keywords_ops = [[
+        i for i in sublist
+        if i.strip() != '' and "\\" not in i and ":" not in i
+    ] for sublist in keywords_ops]
+    #remove empty sublists
+    return [sublist for sublist in keywords_ops if sublist]
+
+
+def forbidden_terms(keywords_ops):
+    """
+    Returns the terms of a rule that normalize_rule removes because they
+    contain forbidden characters, so that they can be rejected instead of
+    being dropped from the search without notice
+
+    Parameters
+    --------
+    keywords_ops : list of lists
+        rule in the format accepted by make_query
+
+    Returns
+    --------
+     : list of str
+        terms that contain '\\' or ':', in the order they appear
+
+    Raises
+    --------
+
+    """
+
+    return [
+        term for sublist in keywords_ops for term in sublist
+        if "\\" in term or ":" in term
+    ]
+
+
+def make_query(keywords_ops, lang, limit=None):
     """
     This method constructs a query_param string for the Twitter API
 
     The Twitter API requires a special format of request, and this method creates the
-    requisite map with specified parameters
+    requisite map with specified parameters. The query string of each
+    normalized rule and language list is only constructed once.
 
     Parameters
     --------
@@ -16,6 +104,9 @@ def make_query(keywords_ops, lang):
         Stores language abbreviations corresponding to which languages tweets
         requested may be written in, with an empty list representing all
         languages
+    limit : int
+        max length of the query string, see QUERY_LIMITS, or None to not
+        check its length
 
     Return
     --------
@@ -24,60 +115,78 @@ def make_query(keywords_ops, lang):
 
     Raises
     --------
+    QueryLengthError
+        if the query string is longer than limit, in which case split_rule
+        divides the rule into rules that each fit within it
     
     """
 
-    #remove list entries that contain no meaningful characters or contain forbidden characters
-    keywords_ops = [[
-        i for i in sublist
-        if i.strip() != '' and "\\" not in i and ":" not in i
-    ] for sublist in keywords_ops]
-    #remove empty sublists
-    keywords_ops = [sublist for sublist in keywords_ops if sublist]
-    rule_list = []
+    rule = tuple(tuple(sublist) for sublist in normalize_rule(keywords_ops))
+    query = _query_string(rule, tuple(lang))
+    if limit is not None and len(query) > limit:
+        raise QueryLengthError(
+            f"Query of {len(query)} characters exceeds the limit of {limit} characters: {query}"
+        )
+    #each call returns its own dictionary, since callers add request parameters to it
+    return {'query': query}
 
-    #list of legal twitter language abbreviations
-    lang_list = [
-        'en', 'ar', 'bn', 'cs', 'da', 'de', 'el', 'es', 'fa', 'fi', 'fil',
-        'fr', 'he', 'hi', 'hu', 'id', 'it', 'ja', 'ko', 'msa', 'nl', 'no',
-        'pl', 'pt', 'ro', 'ru', 'sv', 'th', 'tr', 'uk', 'ur', 'vi', 'zh-c',
-        'zh-tw'
-    ]
-    temp_string = ""
-    first = True  #boolean that represents whether current sublist is the first in the list
-    first_lang = True  #boolean that represents whether the current language abbr. is the first to be added to the temp_string
+
+@functools.lru_cache(maxsize=1024)
+def _query_string(rule, lang):
+    #the language filter is the same for every sublist
+    langs = [abbr for abbr in lang if abbr in LANGUAGES]
+    lang_filter = ""
+    if langs:
+        lang_filter = " (" + " OR ".join("lang:" + str(abbr)
+                                         for abbr in langs) + ")"
 
     #construct twitter query string in correct syntax
-    for possible_match in keywords_ops:
-        if not first:
-            temp_string += "OR "
-        temp_string += "("
-        for partial_match in possible_match:
-            if temp_string != "(" and temp_string != "OR (":
-                temp_string += " "
-            if not "-" in partial_match:
-                temp_string += "\"" + partial_match + "\""
-            else:
-                temp_string += partial_match
-        for abbr in lang:
-            if abbr in lang_list:
-                if first_lang:
-                    temp_string += " ("
-                if not first_lang:
-                    temp_string += " OR "
-                temp_string += "lang:" + str(abbr)
-                first_lang = False
-        #checks if parenthesis for language filter need to be closed
-        if not first_lang:
-            temp_string += ")"
-        temp_string += ")"
-        rule_list.append(temp_string)
-        temp_string = ""
-        first = False
-        first_lang = True
+    rule_list = []
+    for possible_match in rule:
+        terms = " ".join(
+            partial_match if "-" in partial_match else "\"" + partial_match +
+            "\"" for partial_match in possible_match)
+        rule_list.append("(" + terms + lang_filter + ")")
 
     # construct a ruleset from all rules
-    rules = " ".join(rule_list)
-    query_params = {'query': rules}
+    return " OR ".join(rule_list)
+
+
+def split_rule(keywords_ops, lang, limit):
+    """
+    Divides a rule into as few rules as needed for the query of each to fit
+    within the query length limit. A tweet matches the rule if it matches
+    any of the rules it is divided into, so the tweets of the rule are the
+    tweets of their queries merged together.
+
+    Parameters
+    --------
+    keywords_ops : list of lists
+        rule in the format accepted by make_query
+    lang : list
+        language abbreviations passed to make_query
+    limit : int
+        max length of a query string, see QUERY_LIMITS
+
+    Returns
+    --------
+    rules : list of lists of lists
+        the rules, one if the query of the whole rule fits within the limit
+
+    Raises
+    --------
+    QueryLengthError
+        if the query of a single sublist does not fit within the limit, since
+        its terms must all be searched for in one query
+
+    """
 
-    return query_params
+    rules = []
+    for sublist in normalize_rule(keywords_ops):
+        make_query([sublist], lang, limit)
+        if rules and len(make_query(rules[-1] + [sublist],
+                                    lang)['query']) <= limit:
+            rules[-1].append(sublist)
+        else:
+            rules.append([sublist])
+    return rules
@@ -0,0 +1,65 @@
+import os
+import numpy as np
+import twitsent.aggregates as agg
+
+ROW_BYTES = len(agg.COLUMNS) * len(agg.KINDS) * 8
+
+
+def test_save_appends_only_new_rows(tmp_path):
+    aggregates = agg.Aggregates(str(tmp_path), 10, 60)
+    for i in range(3):
+        aggregates.append([[i / 10]], [[0.0, 0.5]], "8/1/22", "8/1/22",
+                          "8/1/22")
+        aggregates.save()
+        assert os.path.getsize(aggregates.filepath) == (i + 1) * ROW_BYTES
+
+    loaded = agg.Aggregates(str(tmp_path), 10, 60)
+    assert len(loaded) == 3
+    np.testing.assert_allclose(loaded.means("senti"), [0.0, 0.1, 0.2])
+    np.testing.assert_allclose(loaded.means("senti_sample"), [0.25] * 3)
+
+
+def test_rows_of_an_interrupted_save_are_not_read(tmp_path):
+    aggregates = agg.Aggregates(str(tmp_path), 10, 60)
+    aggregates.append([[0.5]], [[0.5]], "8/1/22", "8/1/22", "8/1/22")
+    aggregates.save()
+    with open(aggregates.filepath, "ab") as aggregatefile:
+        aggregatefile.write(b"\0" * ROW_BYTES)
+
+    loaded = agg.Aggregates(str(tmp_path), 10, 60)
+    assert len(loaded) == 1
+    loaded.append([[-0.5]], [[0.0]], "8/1/22", "8/1/22", "8/1/22")
+    loaded.save()
+    np.testing.assert_allclose(
+        agg.Aggregates(str(tmp_path), 10, 60).means("senti"), [0.5, -0.5])
+
+
+def test_truncate_and_new_collection(tmp_path):
+    aggregates = agg.Aggregates(str(tmp_path), 10, 60)
+    aggregates.append([[0.1], [0.2], [0.3]], [[0.0]] * 3, "8/1/22", "8/1/22",
+                      "8/2/22")
+    aggregates.save()
+    aggregates.truncate(1)
+    aggregates.save()
+    assert len(agg.Aggregates(str(tmp_path), 10, 60)) == 1
+
+    #a collection that does not continue the stored end date replaces the aggregates
+    aggregates.append([[0.9]], [[0.9]], "8/5/22", "8/5/22", "8/6/22")
+    aggregates.save()
+    loaded = agg.Aggregates(str(tmp_path), 10, 60)
+    np.testing.assert_allclose(loaded.means("senti"), [0.9])
+    assert (loaded.start, loaded.end) == ("8.5.22", "8.6.22")
+
+
+def test_reads_aggregates_stored_as_npz(tmp_path):
+    legacy = os.path.join(str(tmp_path), "aggregates_10_60.npz")
+    stats = np.array([[2, 1.0, 0.5, 0.4, 0.6]])
+    np.savez(legacy, dates=np.array(["8.1.22", "8.2.22"]), senti=stats,
+             senti_sample=stats)
+    aggregates = agg.Aggregates(str(tmp_path), 10, 60)
+    np.testing.assert_allclose(aggregates.means("senti"), [0.5])
+    assert np.isnan(aggregates.medians("senti")).all()
+
+    aggregates.save()
+    assert not os.path.exists(legacy)
+    assert agg.Aggregates(str(tmp_path), 10, 60).totaltime() == 1440
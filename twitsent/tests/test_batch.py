@@ -0,0 +1,50 @@
+import json
+import pytest
+import twitsent.__main__ as m
+import twitsent.batch as bt
+
+
+def write_config(tmp_path, config):
+    filepath = tmp_path / "jobs.json"
+    filepath.write_text(json.dumps(config), encoding="utf-8")
+    return str(filepath)
+
+
+def test_loads_jobs_with_top_level_defaults(tmp_path):
+    filepath = write_config(
+        tmp_path, {
+            "json_max": 20,
+            "jobs": [{
+                "name": "covid",
+                "keywords": "covid,corona -beer",
+                "end": "2022-08-01"
+            }]
+        })
+
+    specs = bt.load_jobs(filepath)
+
+    assert len(specs) == 1
+    assert specs[0]["json_max"] == 20
+    assert specs[0]["rule"] == [["covid"], ["corona", "-beer"]]
+
+
+def test_missing_config_file_is_a_config_error(tmp_path):
+    with pytest.raises(bt.JobConfigError):
+        bt.load_jobs(str(tmp_path / "missing.json"))
+
+
+def test_job_that_is_not_an_object_is_a_config_error(tmp_path):
+    filepath = write_config(tmp_path, {"jobs": ["covid"]})
+    with pytest.raises(bt.JobConfigError):
+        bt.load_jobs(filepath)
+
+
+def test_cli_reports_unreadable_config(tmp_path, capsys):
+    assert m.cli(["batch", str(tmp_path / "missing.json")]) == 1
+    assert "Could not read job config file" in capsys.readouterr().out
+
+
+def test_resume_flag_is_an_alias_of_the_resume_command():
+    args = m.parse_args(["--resume", "10", "240"])
+    assert args.command == "resume"
+    assert (args.json_max, args.interval_len) == (10, 240)
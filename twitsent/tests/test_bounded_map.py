@@ -0,0 +1,46 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import twitsent.__main__ as m
+
+
+def test_returns_results_in_order():
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(
+            m.bounded_map(executor, lambda i: time.sleep(
+                (10 - i) / 1000) or i * 2, 8, range(10)))
+    assert results == [i * 2 for i in range(10)]
+
+
+def test_limits_calls_waiting_to_be_returned():
+    lock = threading.Lock()
+    started = []
+
+    def call(i):
+        with lock:
+            started.append(i)
+        return i
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = m.bounded_map(executor, call, 6, range(100))
+        assert next(results) == 0
+        #no further call is submitted until the first result has been taken
+        time.sleep(0.05)
+        assert len(started) == 6
+        assert list(results) == list(range(1, 100))
+
+
+def test_raises_the_first_error_and_cancels_the_rest():
+    calls = []
+
+    def call(i):
+        calls.append(i)
+        if i == 2:
+            raise ValueError("interval failed")
+        return i
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with pytest.raises(ValueError):
+            list(m.bounded_map(executor, call, 4, range(100)))
+    assert len(calls) < 10
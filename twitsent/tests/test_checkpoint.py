@@ -0,0 +1,77 @@
+import json
+import os
+import pytest
+import twitsent.checkpoint as cp
+
+JOB = {"json_max": 300, "interval_len": 60}
+
+
+@pytest.fixture
+def filepath(monkeypatch, tmp_path):
+    path = str(tmp_path / "checkpoint_300_60.json")
+    monkeypatch.setattr(cp, "checkpoint_path",
+                        lambda json_max, interval_len: path)
+    return path
+
+
+def page(number):
+    return ["tweet " + str(number) + " " + str(i) for i in range(100)]
+
+
+def test_appends_only_the_new_page(filepath):
+    checkpoint = cp.Checkpoint(JOB)
+    logpath = filepath[:-len(".json")] + ".log"
+    tweets = []
+    sizes = []
+    for number in range(3):
+        tweets.extend(page(number))
+        checkpoint.update("keyword", 0, 0, str(number + 1), tweets)
+        sizes.append(os.path.getsize(logpath))
+    #every page adds about the same number of bytes, however many tweets the interval already has
+    assert sizes[2] - sizes[1] == sizes[1] - sizes[0]
+
+    state = cp.Checkpoint(JOB).resume("keyword", 0)
+    assert state["tweets"] == tweets
+    assert state["next_token"] == "3"
+
+
+def test_ignores_an_incomplete_last_line(filepath):
+    checkpoint = cp.Checkpoint(JOB)
+    checkpoint.update("keyword", 1, 0, "1", page(0))
+    with open(filepath[:-len(".json")] + ".log", "a") as logfile:
+        logfile.write('{"key": "keyword:1", "tweets": ["cut')
+
+    state = cp.Checkpoint(JOB).resume("keyword", 1)
+    assert state["tweets"] == page(0)
+    assert state["request"] == 0
+
+
+def test_discarded_intervals_are_not_resumed(filepath):
+    checkpoint = cp.Checkpoint(JOB)
+    for index in range(4):
+        checkpoint.update("baseline", index, 1, None, page(index))
+    checkpoint.discard(3)
+
+    checkpoint = cp.Checkpoint(JOB)
+    assert checkpoint.resume("baseline", 2) is None
+    assert checkpoint.resume("baseline", 3)["tweets"] == page(3)
+    checkpoint.remove()
+    assert not os.listdir(os.path.dirname(filepath))
+
+
+def test_resumes_a_checkpoint_written_in_one_file(filepath):
+    state = {"index": 0, "request": 2, "next_token": "7", "tweets": ["a"]}
+    with open(filepath, "w") as checkpointfile:
+        json.dump({"job": JOB, "intervals": {"keyword:0": state}},
+                  checkpointfile)
+
+    assert cp.Checkpoint(JOB).resume("keyword", 0) == state
+    #the intervals move from the job file to the log
+    with open(filepath) as checkpointfile:
+        assert json.load(checkpointfile) == {"job": JOB}
+    assert cp.Checkpoint(JOB).resume("keyword", 0) == state
+
+
+def test_other_job_starts_over(filepath):
+    cp.Checkpoint(JOB).update("keyword", 0, 0, "1", page(0))
+    assert cp.Checkpoint(dict(JOB, totaltime=60)).resume("keyword", 0) is None
@@ -0,0 +1,56 @@
+import re
+from cleantext import clean
+import twitsent.clean_tweets as ct
+
+TEXTS = [
+    "RT @user: Loving the new release!!! 😍 https://t.co/abc123",
+    "Price is $4,500 today... call 555-123-4567 or mail me@example.com",
+    "Café crème über alles\nsecond line\r\nthird",
+    "rt RT Rt: art party start",
+    "   spaces   and\ttabs   ",
+    "",
+    "RT @user: Loving the new release!!! 😍 https://t.co/abc123",
+    "#hashtag &amp; émojis 🎉🎉 done",
+]
+
+#output of the per-tweet cleaner that clean_batch replaced
+EXPECTED = [
+    "user loving the new release",
+    "price is today call or mail",
+    "cafe creme uber alles second line third",
+    "art party start",
+    "spaces and tabs",
+    "",
+    "user loving the new release",
+    "hashtag emojis done",
+]
+
+
+def clean_one(text):
+    #the cleaning that fetch_interval applied to each tweet before clean_batch
+    text = clean(text, **ct.CLEAN_OPTIONS)
+    text = re.sub(r"\brt\b", "", text)
+    return str(bytes(text, 'utf-8').decode('utf-8', 'ignore')).strip()
+
+
+def test_matches_pinned_output():
+    assert ct.clean_batch(TEXTS) == EXPECTED
+
+
+def test_matches_cleaning_each_tweet():
+    assert ct.clean_batch(TEXTS) == [clean_one(text) for text in TEXTS]
+
+
+def test_patterns_stop_at_the_end_of_each_tweet():
+    #texts that a pattern could join up with the previous or next tweet
+    page = [
+        "call 555-123-4567", "#12 rocks", "see https://t.co/abc",
+        "@user: thanks", "me@example", ".com", "1,000", "000 people",
+        "plain ascii & more", "a\\nb",
+        "\u201cquoted\u201d \uff2c\uff2f\uff35\uff24"
+    ]
+    assert ct.clean_batch(page) == [clean_one(text) for text in page]
+
+
+def test_empty_page():
+    assert ct.clean_batch([]) == []
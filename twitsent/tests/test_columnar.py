@@ -0,0 +1,39 @@
+import os
+import twitsent.columnar as col
+
+
+def save(backend, tweets, scores, end_t, new_end_t):
+    backend.save_lists([tweets], [["sample"]], [scores], [[0.0]], "8/1/22",
+                       end_t, new_end_t, 10, 60)
+
+
+def test_appends_each_interval_in_place(tmp_path):
+    backend = col.ColumnarBackend(str(tmp_path))
+    save(backend, ["first", "tweet"], [0.1, 0.2], "8/1/22", "8/1/22")
+    values_path = tmp_path / "columnar_10_60" / "senti_values.col"
+    assert os.path.getsize(values_path) == 2 * 8
+    save(backend, ["second"], [0.3], "8/1/22", "8/2/22")
+    assert os.path.getsize(values_path) == 3 * 8
+
+    sentiment_list, tweet_list, _, tweet_sample, totaltime = backend.load_lists(
+        10, 60)
+    assert [list(scores) for scores in sentiment_list] == [[0.1, 0.2], [0.3]]
+    assert list(tweet_list) == [["first", "tweet"], ["second"]]
+    assert list(tweet_sample) == [["sample"], ["sample"]]
+    assert totaltime == 1440
+
+
+def test_ignores_bytes_of_an_interrupted_save(tmp_path):
+    backend = col.ColumnarBackend(str(tmp_path))
+    save(backend, ["kept"], [0.5], "8/1/22", "8/1/22")
+    fullpath = tmp_path / "columnar_10_60"
+    #columns written before the metadata of the save was updated
+    for name in ("senti_values.col", "tweet.bin"):
+        with open(fullpath / name, "ab") as columnfile:
+            columnfile.write(b"partial!")
+    assert list(backend.load_lists(10, 60)[1]) == [["kept"]]
+
+    save(backend, ["next"], [0.25], "8/1/22", "8/1/22")
+    sentiment_list, tweet_list, _, _, _ = backend.load_lists(10, 60)
+    assert [list(scores) for scores in sentiment_list] == [[0.5], [0.25]]
+    assert list(tweet_list) == [["kept"], ["next"]]
@@ -0,0 +1,120 @@
+import datetime as dt
+import pytest
+import twitsent.__main__ as m
+import twitsent.checkpoint as cp
+
+
+class PagedEndpoint:
+    #returns pages of 10 tweets, with the token of the next page in the meta object like the Twitter Search API v2
+
+    def __init__(self, pages, fail_after=None):
+        self.pages = pages
+        self.fail_after = fail_after
+        self.tokens = []
+        self.params = []
+
+    def __call__(self, acad_access, params, client=None, stream=None):
+        if self.fail_after is not None and len(self.tokens) == self.fail_after:
+            raise ConnectionError("connection lost")
+        token = params.get("next_token")
+        self.tokens.append(token)
+        self.params.append(dict(params))
+        page = 0 if token is None else int(token)
+        meta = {"result_count": 10}
+        if page + 1 < self.pages:
+            meta["next_token"] = str(page + 1)
+        #one tweet is posted every minute before the end of the interval
+        tweets = [{
+            "id": str(page * 10 + i),
+            "text": "tweet number " + str(page * 10 + i),
+            "created_at": (END_TIME - dt.timedelta(minutes=page * 10 + i)
+                           ).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        } for i in range(10)]
+        return {"data": tweets, "meta": meta}
+
+
+END_TIME = dt.datetime(2022, 8, 1, tzinfo=dt.timezone.utc)
+REQUEST_DELTA = dt.timedelta(minutes=240)
+
+
+def test_pages_until_json_max(monkeypatch):
+    endpoint = PagedEndpoint(pages=5)
+    monkeypatch.setattr(m, "connect_to_endpoint", endpoint)
+
+    json_interval = m.fetch_interval({"query": "covid"}, 30, END_TIME,
+                                     REQUEST_DELTA, 'n')
+
+    assert len(json_interval) == 30
+    assert endpoint.tokens == [None, "1", "2"]
+
+
+def test_stops_without_next_token(monkeypatch):
+    endpoint = PagedEndpoint(pages=2)
+    monkeypatch.setattr(m, "connect_to_endpoint", endpoint)
+
+    json_interval = m.fetch_interval({"query": "covid"}, 30, END_TIME,
+                                     REQUEST_DELTA, 'n')
+
+    assert len(json_interval) == 20
+    assert endpoint.tokens == [None, "1"]
+
+
+def test_resumes_from_checkpoint(monkeypatch, tmp_path):
+    monkeypatch.setattr(cp, "checkpoint_path",
+                        lambda json_max, interval_len: str(
+                            tmp_path / "checkpoint.json"))
+    job = {"json_max": 30, "interval_len": 240}
+
+    interrupted = PagedEndpoint(pages=5, fail_after=2)
+    monkeypatch.setattr(m, "connect_to_endpoint", interrupted)
+    with pytest.raises(ConnectionError):
+        m.fetch_interval({"query": "covid"}, 30, END_TIME, REQUEST_DELTA,
+                         'n', stream="keyword", checkpoint=cp.Checkpoint(job),
+                         index=0)
+
+    resumed = PagedEndpoint(pages=5)
+    monkeypatch.setattr(m, "connect_to_endpoint", resumed)
+    json_interval = m.fetch_interval({"query": "covid"}, 30, END_TIME,
+                                     REQUEST_DELTA, 'n', stream="keyword",
+                                     checkpoint=cp.Checkpoint(job), index=0)
+
+    #the pages retrieved before the interruption are not requested again
+    assert resumed.tokens == ["2"]
+    assert len(json_interval) == 30
+
+
+def test_records_created_times(monkeypatch):
+    endpoint = PagedEndpoint(pages=5)
+    monkeypatch.setattr(m, "connect_to_endpoint", endpoint)
+
+    created_times = []
+    m.fetch_interval({"query": "covid"}, 30, END_TIME, REQUEST_DELTA, 'n',
+                     created_times=created_times)
+
+    assert all(params["tweet.fields"] == "created_at"
+               for params in endpoint.params)
+    assert len(created_times) == 30
+    assert max(created_times) - min(created_times) == dt.timedelta(
+        minutes=29)
+
+
+def warnings(capsys, tweet_count, span_mins, json_max, interval_len):
+    created_times = [
+        END_TIME - dt.timedelta(minutes=span_mins * i / (tweet_count - 1))
+        for i in range(tweet_count)
+    ]
+    m.warn_density(tweet_count, created_times, json_max, interval_len)
+    return capsys.readouterr().out.count("Warning")
+
+
+def test_no_warning_for_dense_tweets(capsys):
+    #30 tweets were posted within 29 minutes of a 240 minute interval
+    assert warnings(capsys, 30, 29, 30, 240) == 0
+
+
+def test_warns_when_tweets_span_most_of_the_interval(capsys):
+    assert warnings(capsys, 30, 200, 30, 240) == 1
+
+
+def test_warns_when_the_interval_runs_out_of_tweets(capsys):
+    assert warnings(capsys, 12, 10, 30, 240) == 1
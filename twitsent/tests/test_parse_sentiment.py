@@ -0,0 +1,18 @@
+import os
+import subprocess
+import sys
+
+
+def test_import_does_not_load_nltk():
+    #NLTK and its resources are only loaded once the first tweet is scored
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.path.join(os.path.dirname(__file__), "..", "src")
+    result = subprocess.run([
+        sys.executable, "-c",
+        "import sys, twitsent.parse_sentiment; print('nltk' in sys.modules)"
+    ],
+                            env=env,
+                            capture_output=True,
+                            text=True,
+                            check=True)
+    assert result.stdout.strip() == "False"
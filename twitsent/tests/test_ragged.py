@@ -0,0 +1,36 @@
+import math
+import statistics
+import numpy as np
+import twitsent.aggregates as agg
+import twitsent.ragged as ra
+
+INTERVALS = [[0.5, -0.25, 0.75, 0.0], [], [0.1], [-1.0, 1.0], [0.2] * 30]
+
+
+def test_medians_match_statistics_median():
+    medians = ra.RaggedArray.from_lists(INTERVALS).medians()
+    expected = [
+        statistics.median(interval) if interval else math.nan
+        for interval in INTERVALS
+    ]
+    np.testing.assert_allclose(medians, expected)
+
+
+def test_percentiles_match_np_percentile():
+    percentiles = ra.RaggedArray.from_lists(INTERVALS).percentiles([25, 75])
+    for i, interval in enumerate(INTERVALS):
+        if interval:
+            assert list(percentiles[:, i]) == list(
+                np.percentile(interval, [25, 75]))
+        else:
+            assert np.isnan(percentiles[:, i]).all()
+
+
+def test_aggregates_keep_medians_and_quartiles(tmp_path):
+    aggregates = agg.Aggregates(str(tmp_path), 10, 60)
+    aggregates.append(INTERVALS, INTERVALS, "8/1/22", "8/1/22", "8/2/22")
+    np.testing.assert_allclose(aggregates.medians("senti"),
+                               [0.25, math.nan, 0.1, 0.0, 0.2])
+    np.testing.assert_allclose(aggregates.percentiles("senti_sample", 75),
+                               [np.percentile(INTERVALS[0], 75), math.nan,
+                                0.1, 0.5, 0.2])
@@ -0,0 +1,48 @@
+import datetime as dt
+import twitsent.manifest as mf
+import twitsent.sqlstore as sq
+
+END = dt.datetime(2022, 8, 3, tzinfo=dt.timezone.utc)
+
+
+def collect(backend, query, intervals):
+    #saves each interval on its own, the way a streamed collection does
+    for i in range(intervals):
+        backend.save_lists([[query + " tweet"]], [["sample tweet"]],
+                           [[i / 10]], [[0.0]],
+                           "8/1/22",
+                           "8/1/22",
+                           "8/1/22",
+                           10,
+                           240,
+                           query=query,
+                           interval_ends=[END - dt.timedelta(hours=4 * i)])
+    backend.save_lists([], [], [], [], "8/1/22", "8/1/22", "8/3/22", 10, 240,
+                       query=query)
+
+
+def test_collection_is_stored_as_one_run(tmp_path):
+    backend = sq.SQLiteBackend(str(tmp_path))
+    collect(backend, "alpha", 6)
+    with sq.SQLiteStore(str(tmp_path / "twitsent.db")) as store:
+        runs = store.conn.execute("SELECT kind FROM runs").fetchall()
+        assert sorted(runs) == [("sample", ), ("tweet", )]
+        starts, tweets, scores = store.load_range("alpha", "tweet", 10, 240)
+    assert starts == sorted(starts, reverse=True)
+    assert tweets == [["alpha tweet"]] * 6
+    assert scores == [[i / 10] for i in range(6)]
+
+
+def test_dataset_loads_only_its_query(tmp_path):
+    backend = sq.SQLiteBackend(str(tmp_path))
+    collect(backend, "alpha", 3)
+    collect(backend, "beta", 3)
+    manifest = mf.Manifest(str(tmp_path))
+    for prefix in ("tweet", "senti"):
+        for has_sample in (False, True):
+            manifest.record(prefix, 10, 240, has_sample, "twitsent.db",
+                            "8.1.22", "8.3.22", "sqlite", "beta")
+    manifest.save()
+    sentiment_list, tweet_list, _, tweet_sample, _ = backend.load_lists(10, 240)
+    assert tweet_list == [["beta tweet"]] * 3
+    assert len(tweet_sample) == 3
@@ -0,0 +1,56 @@
+import numpy as np
+import pymannkendall as mk
+import twitsent.trend as tr
+
+
+def series():
+    rng = np.random.default_rng(17)
+    #rounded scores give ties between values and between slopes
+    return np.round(np.cumsum(rng.normal(0.01, 0.1, 60)), 1)
+
+
+def assert_matches(state, values):
+    expected = mk.original_test(values)
+    result = state.test()
+    assert result.trend == expected.trend
+    assert result.h == expected.h
+    assert result.s == expected.s
+    for field in ("p", "z", "Tau", "var_s", "slope", "intercept"):
+        assert np.isclose(getattr(result, field), getattr(expected, field),
+                          rtol=1e-12, atol=0)
+
+
+def test_matches_pymannkendall_after_chunked_appends():
+    values = series()
+    state = tr.TrendState()
+    end = 0
+    for chunk in (2, 1, 5, 1, 1, 13, 3, 30, 4):
+        state.append(values[end:end + chunk])
+        end += chunk
+        assert_matches(state, values[:end])
+    #merged runs stay few and sorted
+    assert len(state.runs) <= 7
+    assert all(np.all(np.diff(run) >= 0) for run in state.runs)
+
+
+def test_saved_state_continues_where_it_stopped(tmp_path):
+    values = series()
+    path = str(tmp_path / "trend_10_60")
+    state = tr.TrendState(path)
+    state.update(values[:20])
+    state.save()
+    for end in (21, 22, 40, 41, 60):
+        state = tr.TrendState(path)
+        state.update(values[:end])
+        state.save()
+        assert_matches(tr.TrendState(path), values[:end])
+    assert len(list(tmp_path.joinpath("trend_10_60").glob("slopes_*"))) == len(
+        tr.TrendState(path).runs)
+
+
+def test_rebuilds_when_the_series_is_replaced():
+    values = series()
+    state = tr.TrendState()
+    state.update(values[:30])
+    state.update(values[10:50])
+    assert_matches(state, values[10:50])